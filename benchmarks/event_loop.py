@@ -0,0 +1,158 @@
+"""Benchmark idle CPU use and latency of the Tk/asyncio integration.
+
+Compares TkEventLoop, waiting in Tk from its own asyncio loop, against the
+fixed 20 Hz polling loop it replaced, and prints the results as JSON. Needs
+a display.
+
+    python benchmarks/event_loop.py --seconds 5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tkinter
+from typing import TYPE_CHECKING, Any
+
+from power_comparison.event_loop import TkEventLoop
+
+if TYPE_CHECKING:
+    from collections.abc import Coroutine
+
+
+class PollingLoop:
+    """The previous View.exec loop, for comparison."""
+
+    _root: tkinter.Tk
+    _interval: float
+    _stopped: bool = False
+    _wakeups: int = 0
+
+    def __init__(self, root: tkinter.Tk, interval: float = 1 / 20) -> None:
+        """Initialize the PollingLoop."""
+        self._root = root
+        self._interval = interval
+
+    def stop(self) -> None:
+        """Stop the loop."""
+        self._stopped = True
+
+    def get_wakeups(self) -> int:
+        """Return how many times the loop has polled Tk."""
+        return self._wakeups
+
+    async def run(self) -> None:
+        """Poll Tk until stopped."""
+        while not self._stopped:
+            self._wakeups += 1
+            self._root.update()
+            await asyncio.sleep(self._interval)
+
+
+async def measure_idle(
+    loop: TkEventLoop | PollingLoop, seconds: float
+) -> dict[str, float]:
+    """Return CPU time and wakeups per second while nothing happens."""
+    runner = asyncio.create_task(loop.run())
+    await asyncio.sleep(1)
+    wakeups = loop.get_wakeups()
+    cpu = time.process_time()
+    await asyncio.sleep(seconds)
+    result = {
+        "idle_cpu_percent": 100 * (time.process_time() - cpu) / seconds,
+        "idle_wakeups_per_second": (loop.get_wakeups() - wakeups) / seconds,
+    }
+    loop.stop()
+    await runner
+    return result
+
+
+async def measure_latency(
+    root: tkinter.Tk, loop: TkEventLoop | PollingLoop, samples: int
+) -> dict[str, float]:
+    """Return milliseconds from input or task completion until Tk reacts."""
+    runner = asyncio.create_task(loop.run())
+    input_latencies: list[float] = []
+    task_latencies: list[float] = []
+    sent = 0.0
+
+    def on_input(_: tkinter.Event) -> None:
+        input_latencies.append(1000 * (time.perf_counter() - sent))
+
+    root.bind("<<BenchmarkInput>>", on_input)
+    for _ in range(samples):
+        # Sent from a Tk timer, like input arriving while the loop waits,
+        # after it has backed off as if the user had stopped interacting.
+        # Latency counts from when the timer is due, not when it runs.
+        delay = round(1000 * random.uniform(0.2, 0.5))
+        sent = time.perf_counter() + delay / 1000
+        root.after(
+            delay,
+            lambda: root.event_generate("<<BenchmarkInput>>", when="tail"),
+        )
+        await asyncio.sleep(delay / 1000 + random.uniform(0.2, 0.5))
+
+        drawn = asyncio.get_running_loop().create_future()
+
+        async def task() -> None:
+            # Like a screen's handler: change the UI, then finish.
+            await asyncio.sleep(0)
+            finished = time.perf_counter()
+            root.after_idle(
+                lambda: drawn.set_result(time.perf_counter() - finished)
+            )
+
+        await asyncio.create_task(task())
+        task_latencies.append(1000 * await drawn)
+    loop.stop()
+    await runner
+    return {
+        "input_latency_ms_median": statistics.median(input_latencies),
+        "input_latency_ms_max": max(input_latencies),
+        "task_latency_ms_median": statistics.median(task_latencies),
+        "task_latency_ms_max": max(task_latencies),
+    }
+
+
+def run(
+    loop: TkEventLoop | PollingLoop,
+    measurement: Coroutine[Any, Any, dict[str, float]],
+) -> dict[str, float]:
+    """Run a measurement of loop, in the asyncio loop it provides if any."""
+    event_loop = (
+        loop.new_event_loop()
+        if isinstance(loop, TkEventLoop)
+        else asyncio.new_event_loop()
+    )
+    try:
+        return event_loop.run_until_complete(measurement)
+    finally:
+        event_loop.close()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+    results = {}
+    for name, factory in (
+        ("polling", PollingLoop),
+        ("adaptive", TkEventLoop),
+    ):
+        root = tkinter.Tk()
+        loop = factory(root)
+        result = run(loop, measure_idle(loop, args.seconds))
+        loop = factory(root)
+        result.update(run(loop, measure_latency(root, loop, args.samples)))
+        root.destroy()
+        results[name] = result
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Load test a running power-comparison-service.
+
+Sends comparison requests for random users and date windows from many
+concurrent clients, then prints throughput, client-side latency, and the
+service's own per-route metrics as JSON.
+
+    power-comparison-service --workers 4 &
+    python benchmarks/load_test_service.py Christchurch-Dec-2024
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import aiohttp
+
+
+async def client(
+    session: aiohttp.ClientSession,
+    url: str,
+    users: list[str],
+    args: argparse.Namespace,
+    deadline: float,
+    latencies: list[float],
+    statuses: dict[int, int],
+) -> None:
+    """Send requests one after another until the deadline."""
+    while time.perf_counter() < deadline:
+        end = args.end - timedelta(days=random.randrange(args.windows))
+        params = {
+            "profile_set": args.profile_set,
+            "start": (end - timedelta(days=365)).isoformat(),
+            "end": end.isoformat(),
+            "top": "10",
+        }
+        user = random.choice(users)
+        start = time.perf_counter()
+        async with session.get(
+            f"{url}/users/{user}/comparison", params=params
+        ) as response:
+            await response.read()
+        latencies.append(1000 * (time.perf_counter() - start))
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+
+
+async def load_test(args: argparse.Namespace) -> dict[str, object]:
+    """Run the load test."""
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async with session.get(f"{args.url}/users") as response:
+            users = (await response.json())["users"]
+        if len(users) == 0:
+            msg = "The service has no users to compare"
+            raise SystemExit(msg)
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(
+            *(
+                client(
+                    session,
+                    args.url,
+                    users,
+                    args,
+                    deadline,
+                    latencies,
+                    statuses,
+                )
+                for _ in range(args.concurrency)
+            )
+        )
+        async with session.get(f"{args.url}/metrics") as response:
+            metrics = await response.json()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / args.seconds,
+        "statuses": statuses,
+        "latency_ms_median": statistics.median(latencies),
+        "latency_ms_p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "service_metrics_one_worker": metrics,
+    }
+
+
+def main() -> None:
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("profile_set")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="latest window end date (default: today)",
+    )
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--windows",
+        type=int,
+        default=30,
+        help="number of distinct date windows to request, fewer means more "
+        "cache hits (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(load_test(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Check the app's import time against a startup budget.
+
+Runs ``python -X importtime -c "import power_comparison.app"`` in a fresh
+interpreter, prints the total import time, the slowest imports, and any
+modules that should only be imported after the login screen is shown, as
+JSON. Exits with status 1 if the budget is exceeded or a deferred module
+was imported.
+
+    python benchmarks/startup.py --budget-ms 250
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+DEFERRED_MODULES = (
+    "numpy",
+    "matplotlib",
+    "CTkMessagebox",
+    "aiohttp",
+    "contact_energy_nz",
+    "power_comparison.data",
+    "power_comparison.plan_comparison_screen",
+    "power_comparison.usage_view_screen",
+    "power_comparison.timeline",
+    "power_comparison.timeline_screen",
+)
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Return self and cumulative import microseconds for each module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="power_comparison.app")
+    parser.add_argument("--budget-ms", type=float, default=250)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    totals = [sum(s for s, _ in run.values()) / 1000 for run in runs]
+    slowest = sorted(runs[-1].items(), key=lambda x: x[1][0], reverse=True)
+    deferred = [
+        name
+        for name in DEFERRED_MODULES
+        if any(
+            imported == name or imported.startswith(f"{name}.")
+            for imported in runs[-1]
+        )
+    ]
+    result = {
+        "module": args.module,
+        "budget_ms": args.budget_ms,
+        "import_ms_median": statistics.median(totals),
+        "import_ms_min": min(totals),
+        "slowest_imports_ms": {
+            name: self_us / 1000 for name, (self_us, _) in slowest[: args.top]
+        },
+        "deferred_modules_imported": deferred,
+    }
+    print(json.dumps(result, indent=2))
+    if result["import_ms_median"] > args.budget_ms or deferred:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
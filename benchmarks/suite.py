@@ -0,0 +1,278 @@
+"""Benchmark the data, costing and controller hot paths on synthetic data.
+
+Generates a seeded usage database and tariff set, times each case, and
+writes the results as JSON with the commit they were measured at. Pass an
+earlier result with --compare to print the change in each case's median,
+exiting with status 1 if any case slowed by more than --max-regression.
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --compare before.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from synthetic import generate_tariffs, generate_usage, household_load
+
+from power_comparison.controller import Controller
+from power_comparison.data import Data, Profiles
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_END = date(2024, 12, 31)
+_TARIFF_SET = "Synthetic"
+
+
+def measure(
+    func: Callable[[int], object], repeat: int, items: int = 1
+) -> dict[str, float]:
+    """Time func, passing it the repetition number, after one warm up."""
+    func(-1)
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        "median_ms": 1000 * median,
+        "min_ms": 1000 * min(times),
+        "items_per_s": items / median,
+    }
+
+
+def run_suite(args: argparse.Namespace, directory: Path) -> dict[str, Any]:
+    """Return every case's timings."""
+    data = Data(str(directory / "usage.db"))
+    usernames = generate_usage(data, args.users, args.years, args.seed, _END)
+    generate_tariffs(directory / _TARIFF_SET, args.plans, args.seed)
+    profiles = Profiles(str(directory))
+    results = {}
+
+    year = household_load(np.random.default_rng(args.seed), _END, 365)
+    ingest_db = Data(str(directory / "ingest.db"))
+
+    def ingest(i: int) -> None:
+        ingest_db.initialize_user(f"ingest{i}")
+        ingest_db.ingest_data(
+            [
+                (_END + timedelta(days=day), values.tolist())
+                for day, values in enumerate(year)
+            ]
+        )
+
+    results["Data.ingest_data"] = measure(ingest, args.repeat, 365 * 24)
+    ingest_db.close()
+
+    def select(i: int) -> None:
+        data.select_user(usernames[i % len(usernames)])
+
+    def rebuild_index(i: int) -> None:
+        select(i)
+        data._bump_data_version(data._user_id)
+        data._get_usage_index(data._user_id)
+
+    # Leaves every user's index built, so the cases below read from it.
+    results["Data usage index rebuild"] = measure(
+        rebuild_index, max(args.repeat, len(usernames))
+    )
+    start = _END - timedelta(days=365)
+    results["Data.get_average_usage"] = measure(
+        lambda i: (select(i), data.get_average_usage(start, _END)),
+        args.repeat,
+        365 * 24,
+    )
+    results["Data.get_usage_per_hour"] = measure(
+        lambda i: (select(i), data.get_usage_per_hour(start, _END)),
+        args.repeat,
+        365 * 24,
+    )
+    results["Profiles._get_profile_data_numpy"] = measure(
+        lambda _: profiles._get_profile_data_numpy(_TARIFF_SET),
+        args.repeat,
+        args.plans,
+    )
+    select(0)
+    usage = data.get_average_usage(start, _END)
+    results["Profiles.generate_plan_comparison"] = measure(
+        lambda _: profiles.generate_plan_comparison(usage, _TARIFF_SET),
+        args.repeat,
+        args.plans,
+    )
+    results["Profiles.rank_plans"] = measure(
+        lambda _: profiles.rank_plans([usage], _TARIFF_SET, 10),
+        args.repeat,
+        args.plans,
+    )
+    usages = []
+    for i in range(len(usernames)):
+        select(i)
+        usages.append(data.get_average_usage(start, _END))
+    # Ranking every user's top ten, as the rank command does, against
+    # sorting every plan for every user.
+    results["Profiles.generate_plan_comparisons every user"] = measure(
+        lambda _: profiles.generate_plan_comparisons(usages, _TARIFF_SET),
+        args.repeat,
+        len(usages) * args.plans,
+    )
+    results["Profiles.rank_plans every user"] = measure(
+        lambda _: profiles.rank_plans(usages, _TARIFF_SET, 10),
+        args.repeat,
+        len(usages) * args.plans,
+    )
+    controller = Controller(data, profiles)
+
+    def compare(end: date, compared_by: Controller = controller) -> None:
+        result = compared_by.get_comparison_data(
+            _TARIFF_SET,
+            (end - timedelta(days=365)).strftime("%x"),
+            end.strftime("%x"),
+        )
+        if isinstance(result, tuple):
+            raise RuntimeError(result[1])
+
+    # Each repetition asks for a different window, so misses the cache.
+    results["Controller.get_comparison_data"] = measure(
+        lambda i: compare(_END - timedelta(days=i + 1)), args.repeat
+    )
+    results["Controller.get_comparison_data cached"] = measure(
+        lambda _: compare(_END), args.repeat
+    )
+
+    def compare_months(
+        end: date, compared_by: Controller = controller
+    ) -> None:
+        result = compared_by.compare_plans_over_time(
+            _TARIFF_SET, end - timedelta(days=3 * 365), end
+        )
+        if isinstance(result, tuple):
+            raise RuntimeError(result[1])
+
+    # 36 months, each repetition missing the cache like compare above.
+    results["Controller.compare_plans_over_time"] = measure(
+        lambda i: compare_months(_END - timedelta(days=i + 1)), args.repeat
+    )
+    # The app persists results in the database, which both cases include.
+    persisting = Controller(data, profiles, persist_cache=True)
+    results["Controller.get_comparison_data persisted"] = measure(
+        lambda i: compare(_END - timedelta(days=i + 1), persisting),
+        args.repeat,
+    )
+    results["Controller.compare_plans_over_time persisted"] = measure(
+        lambda i: compare_months(_END - timedelta(days=i + 1), persisting),
+        args.repeat,
+    )
+    persisting.close()
+
+    def compare_peers(i: int) -> None:
+        controller.select_user(usernames[i % len(usernames)])
+        result = controller.compare_with_peers(_TARIFF_SET, start, _END)
+        if isinstance(result, tuple):
+            raise RuntimeError(result[1])
+
+    results["Controller.compare_with_peers"] = measure(
+        compare_peers, args.repeat
+    )
+
+    def compare_peers_after_ingest(i: int) -> None:
+        select(i)
+        data.ingest_data([(_END + timedelta(days=i + 2), [1.0] * 24)])
+        compare_peers(i)
+
+    # Each repetition's new day changes one user, so the group is refreshed.
+    results["Controller.compare_with_peers after an ingest"] = measure(
+        compare_peers_after_ingest, args.repeat
+    )
+    controller.close()
+    data.close()
+    return results
+
+
+def git_commit() -> str | None:
+    """Return the current commit, or None if it can't be found."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(
+    before: dict[str, Any], after: dict[str, Any], max_regression: float
+) -> bool:
+    """Print each case's change in median, returning False on regression."""
+    passed = True
+    for name, result in after["results"].items():
+        previous = before["results"].get(name)
+        if previous is None:
+            continue
+        change = result["median_ms"] / previous["median_ms"] - 1
+        regressed = change > max_regression
+        passed = passed and not regressed
+        print(
+            f"{name:45} {previous['median_ms']:10.3f} ms -> "
+            f"{result['median_ms']:10.3f} ms {change:+8.1%}"
+            + (" REGRESSION" if regressed else ""),
+            file=sys.stderr,
+        )
+    return passed
+
+
+def main() -> None:
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="file to write JSON to")
+    parser.add_argument(
+        "--compare", type=Path, help="earlier JSON result to compare with"
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(args, Path(directory))
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "users": args.users,
+            "years": args.years,
+            "plans": args.plans,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    encoded = json.dumps(report, indent=2)
+    print(encoded)
+    if args.output is not None:
+        args.output.write_text(encoded + "\n", encoding="utf-8")
+    if args.compare is not None:
+        before = json.loads(args.compare.read_text(encoding="utf-8"))
+        if not compare_results(before, report, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
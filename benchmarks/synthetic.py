@@ -0,0 +1,132 @@
+"""Generate seeded synthetic usage databases and tariff sets.
+
+Household loads have a base load, morning and evening peaks at times that
+vary between households, extra daytime load on weekends, more load in
+winter, and multiplicative noise. Tariff sets mix flat, time of use, and
+weekend discount plans, written in the profiles' CSV format.
+
+    python benchmarks/synthetic.py usage usage.db --users 100 --years 2
+    python benchmarks/synthetic.py tariffs profiles/Synthetic --plans 500
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from power_comparison.data import Data
+
+_HOURS = np.arange(24)
+_DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _peak(centre: float, width: float) -> npt.NDArray:
+    """Return a bell shaped load over the day, 1 at its centre."""
+    return np.exp(-0.5 * ((_HOURS - centre) / width) ** 2)
+
+
+def household_load(
+    rng: np.random.Generator, start: date, days: int
+) -> npt.NDArray:
+    """Return a household's hourly usage in kWh, of shape (days, 24)."""
+    shape = (
+        rng.uniform(0.2, 0.6)
+        + rng.uniform(0.3, 1.5) * _peak(rng.normal(7.5, 0.7), 1.2)
+        + rng.uniform(0.8, 2.5) * _peak(rng.normal(18.5, 1), 2)
+    )
+    daytime = rng.uniform(0.2, 0.8) * _peak(13, 3)
+    ordinals = start.toordinal() + np.arange(days)
+    weekend = (ordinals + 6) % 7 >= 5
+    # Heating peaks in mid July, as the profiles are for New Zealand.
+    winter = np.cos(
+        2 * np.pi * (ordinals - date(2000, 7, 15).toordinal()) / 365.25
+    )
+    heating = 1 + rng.uniform(0.1, 0.6) * winter
+    load = (shape + np.outer(weekend, daytime)) * heating[:, None]
+    return np.round(load * rng.lognormal(0, 0.25, (days, 24)), 3)
+
+
+def generate_usage(
+    data: Data, users: int, years: int, seed: int, end: date
+) -> list[str]:
+    """Ingest households' usage for years up to end, returning usernames."""
+    rng = np.random.default_rng(seed)
+    days = round(365.25 * years)
+    start = end - timedelta(days=days - 1)
+    usernames = []
+    for user in range(users):
+        username = f"user{user}@example.com"
+        data.initialize_user(username)
+        load = household_load(rng, start, days)
+        data.ingest_data(
+            [
+                (start + timedelta(days=day), values.tolist())
+                for day, values in enumerate(load)
+            ]
+        )
+        usernames.append(username)
+    return usernames
+
+
+def tariff(rng: np.random.Generator) -> tuple[npt.NDArray, float]:
+    """Return a random plan's hourly charges and daily charge in cents."""
+    kind = rng.choice(["flat", "time of use", "weekend"])
+    rate = rng.uniform(18, 35)
+    charges = np.full((7, 24), rate)
+    if kind == "time of use":
+        off_peak = (_HOURS < rng.integers(5, 9)) | (
+            _HOURS >= rng.integers(20, 24)
+        )
+        charges[:, off_peak] *= rng.uniform(0.4, 0.7)
+        charges[:5, rng.integers(7, 10) : rng.integers(17, 22)] *= 1.2
+    elif kind == "weekend":
+        charges[5:] *= rng.uniform(0.5, 0.8)
+    return np.round(charges, 2), round(float(rng.uniform(30, 250)), 2)
+
+
+def generate_tariffs(directory: Path, plans: int, seed: int) -> None:
+    """Write a set of random plans to directory as profile CSVs."""
+    rng = np.random.default_rng(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    for plan in range(plans):
+        charges, daily_charge = tariff(rng)
+        lines = ["Day," + ",".join(f"{hour:02}" for hour in _HOURS)]
+        lines += [
+            name + "," + ",".join(str(value) for value in row)
+            for name, row in zip(_DAY_NAMES, charges)
+        ]
+        lines.append(f"Daily Charge,{daily_charge}")
+        (directory / f"Plan-{plan:05}.csv").write_text(
+            "\n".join(lines) + "\n", encoding="utf-8"
+        )
+
+
+def main() -> None:
+    """Generate synthetic data."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    usage_parser = subparsers.add_parser("usage")
+    usage_parser.add_argument("db")
+    usage_parser.add_argument("--users", type=int, default=100)
+    usage_parser.add_argument("--years", type=int, default=1)
+    usage_parser.add_argument(
+        "--end", type=date.fromisoformat, default=date(2024, 12, 31)
+    )
+    tariffs_parser = subparsers.add_parser("tariffs")
+    tariffs_parser.add_argument("directory", type=Path)
+    tariffs_parser.add_argument("--plans", type=int, default=100)
+    args = parser.parse_args()
+    if args.command == "usage":
+        data = Data(args.db)
+        generate_usage(data, args.users, args.years, args.seed, args.end)
+        data.close()
+    else:
+        generate_tariffs(args.directory, args.plans, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Detect unusual days of usage as they are ingested.
+
+Each user has a running count, mean and sum of squared deviations of their
+usage for every hour of every weekday, so detection keeps constant state
+however much usage has been ingested. A batch of days is merged into the
+statistics at once with Chan's parallel form of Welford's algorithm, and
+each value is tested against the statistics of every other value, so a
+spike can't hide itself by raising the mean and variance it is tested
+against.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+SPIKE = "spike"
+FLATLINE = "flatline"
+METER_ERROR = "meter error"
+# Usage this many standard deviations above the mean of an hour of a
+# weekday is a spike, if it is also at least _SPIKE_MIN_KWH above it.
+SPIKE_DEVIATIONS = 6.0
+_SPIKE_MIN_KWH = 0.5
+# Other values of an hour of a weekday needed before testing for spikes,
+# about half a year, as fewer give too rough a variance to test against.
+MIN_SAMPLES = 26
+# More than this in an hour is beyond any household connection.
+MAX_HOURLY_KWH = 50.0
+# Statistics are stored as little endian doubles.
+_STATISTICS_DTYPE = np.dtype("<f8")
+# A day's date ordinal, kind, hour or None, value, and score or None.
+Anomaly = tuple[int, str, int | None, float, float | None]
+
+
+def _is_meter_error(usage: npt.NDArray) -> npt.NDArray:
+    """Return where usage is impossible, so must be a meter error."""
+    return (usage < 0) | (usage > MAX_HOURLY_KWH)
+
+
+def _weekdays(ordinals: npt.NDArray) -> npt.NDArray:
+    """Return the weekdays of Gregorian ordinal days, 0 for Monday."""
+    # Ordinal 1 was a Monday.
+    return (ordinals - 1) % 7
+
+
+class UsageStatistics:
+    """Running statistics of usage for every hour of every weekday.
+
+    Meter errors are left out, so they can't skew later detection.
+    """
+
+    count: npt.NDArray
+    mean: npt.NDArray
+    m2: npt.NDArray
+
+    def __init__(
+        self, count: npt.NDArray, mean: npt.NDArray, m2: npt.NDArray
+    ) -> None:
+        """Initialize the UsageStatistics, each of shape (7, 24).
+
+        Args:
+            count: The number of values.
+            mean: The mean of the values.
+            m2: The sum of squared deviations from the mean.
+        """
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def empty(cls) -> Self:
+        """Return statistics of no usage."""
+        return cls(np.zeros((7, 24)), np.zeros((7, 24)), np.zeros((7, 24)))
+
+    @classmethod
+    def from_usage(cls, ordinals: npt.NDArray, usage: npt.NDArray) -> Self:
+        """Return statistics of days of usage.
+
+        Args:
+            ordinals: Each day's Gregorian ordinal, of shape (days,).
+            usage: Hourly usage of shape (days, 24), NaN where unknown.
+        """
+        weekdays = _weekdays(ordinals)
+        known = ~np.isnan(usage) & ~_is_meter_error(usage)
+        values = np.where(known, usage, 0)
+        count = np.zeros((7, 24))
+        total = np.zeros((7, 24))
+        np.add.at(count, weekdays, known)
+        np.add.at(total, weekdays, values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, total / count, 0)
+        m2 = np.zeros((7, 24))
+        np.add.at(
+            m2, weekdays, np.where(known, values - mean[weekdays], 0) ** 2
+        )
+        return cls(count, mean, m2)
+
+    @classmethod
+    def from_bytes(cls, count: bytes, mean: bytes, m2: bytes) -> Self:
+        """Load statistics saved with to_bytes()."""
+        return cls(
+            *(
+                np.frombuffer(array, dtype=_STATISTICS_DTYPE).reshape(7, 24)
+                for array in (count, mean, m2)
+            )
+        )
+
+    def to_bytes(self) -> tuple[bytes, bytes, bytes]:
+        """Return the count, mean and m2, packed for saving."""
+        return tuple(
+            array.astype(_STATISTICS_DTYPE).tobytes()
+            for array in (self.count, self.mean, self.m2)
+        )
+
+    def merged(self, other: UsageStatistics) -> UsageStatistics:
+        """Return the statistics of both sets of values."""
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(count > 0, other.count / count, 0)
+        return UsageStatistics(
+            count,
+            self.mean + delta * weight,
+            self.m2 + other.m2 + delta**2 * self.count * weight,
+        )
+
+    def removed(self, other: UsageStatistics) -> UsageStatistics:
+        """Return the statistics without other's values.
+
+        The inverse of merged(), so other's values must have been merged
+        into these statistics.
+        """
+        count = self.count - other.count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(
+                count > 0,
+                (self.count * self.mean - other.count * other.mean) / count,
+                0,
+            )
+            delta = other.mean - mean
+            m2 = np.where(
+                count > 0,
+                self.m2
+                - other.m2
+                - delta**2 * count * other.count / self.count,
+                0,
+            )
+        return UsageStatistics(count, mean, np.maximum(m2, 0))
+
+
+def detect_anomalies(
+    statistics: UsageStatistics,
+    ordinals: npt.NDArray,
+    usage: npt.NDArray,
+) -> list[Anomaly]:
+    """Return the anomalies in days of usage.
+
+    Hours and days are flagged as:
+        SPIKE: an hour at least SPIKE_DEVIATIONS standard deviations above
+            the mean of every other value of that hour and weekday, scored
+            by its deviations, for every such hour.
+        FLATLINE: every hour of a whole day the same, as when a meter
+            reports an estimate or stops counting, once for the day.
+        METER_ERROR: a negative hour, or one over MAX_HOURLY_KWH, for every
+            such hour.
+
+    Returns:
+        The anomalies, ordered by kind, then day and hour.
+
+    Args:
+        statistics: Statistics including the days, see UsageStatistics.
+        ordinals: Each day's Gregorian ordinal, of shape (days,).
+        usage: Hourly usage of shape (days, 24), NaN where unknown.
+    """
+    weekdays = _weekdays(ordinals)
+    valid = ~np.isnan(usage) & ~_is_meter_error(usage)
+    count = statistics.count[weekdays]
+    mean = statistics.mean[weekdays]
+    # Each value's statistics without it, by removing it from the totals.
+    others = count - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        other_mean = (count * mean - usage) / others
+        other_m2 = statistics.m2[weekdays] - (usage - other_mean) * (
+            usage - mean
+        )
+        deviations = (usage - other_mean) / np.sqrt(
+            np.maximum(other_m2, 0) / (others - 1)
+        )
+    spikes = (
+        valid
+        & (others >= MIN_SAMPLES)
+        & (deviations >= SPIKE_DEVIATIONS)
+        & (usage - other_mean >= _SPIKE_MIN_KWH)
+    )
+    complete = ~np.isnan(usage).any(axis=1)
+    flat = complete & (
+        np.ptp(np.where(complete[:, None], usage, 0), axis=1) == 0
+    )
+    errors = _is_meter_error(np.nan_to_num(usage))
+    anomalies: list[Anomaly] = []
+    for day, hour in zip(*np.nonzero(spikes)):
+        anomalies.append(
+            (
+                int(ordinals[day]),
+                SPIKE,
+                int(hour),
+                float(usage[day, hour]),
+                float(deviations[day, hour]),
+            )
+        )
+    for day in np.flatnonzero(flat):
+        anomalies.append(
+            (int(ordinals[day]), FLATLINE, None, float(usage[day, 0]), None)
+        )
+    for day, hour in zip(*np.nonzero(errors)):
+        anomalies.append(
+            (
+                int(ordinals[day]),
+                METER_ERROR,
+                int(hour),
+                float(usage[day, hour]),
+                None,
+            )
+        )
+    return anomalies
@@ -1,24 +1,52 @@
 """App."""
 
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from power_comparison import instrumentation
 from power_comparison.controller import Controller
-from power_comparison.data import Data, Profiles
 from power_comparison.view import View
 
+if TYPE_CHECKING:
+    from power_comparison.data import Data, Profiles
+
+
+def _load_data() -> Data:
+    """Import and open the Data."""
+    from power_comparison.data import Data
+
+    return Data()
+
+
+def _load_profiles() -> Profiles:
+    """Import and create the Profiles."""
+    from power_comparison.data import Profiles
+
+    return Profiles()
+
 
 class App:
     """App."""
 
     def __init__(self) -> None:
-        """Initialize App."""
-        data = Data()
-        profiles = Profiles()
-        controller = Controller(data, profiles)
-        View(controller)
-        data.close()
+        """Initialize App.
+
+        Data and Profiles load in the background while the view starts.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            data = executor.submit(_load_data)
+            profiles = executor.submit(_load_profiles)
+            controller = Controller(data, profiles, persist_cache=True)
+            View(controller)
+            controller.close()
+            data.result().close()
 
 
 def main() -> None:
     """Entry point for application."""
+    instrumentation.enable_from_environment()
     App()
 
 
@@ -0,0 +1,71 @@
+"""Define the ResultCache class."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+
+class ResultCache:
+    """A thread safe least recently used cache of computed results.
+
+    The cache is bounded by both its number of entries and the total size of
+    its entries, as given by the caller when they are added.
+    """
+
+    _entries: OrderedDict[Hashable, tuple[Any, int]]
+    _max_entries: int
+    _max_bytes: int
+    _bytes: int = 0
+    _lock: threading.Lock
+
+    def __init__(
+        self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024
+    ) -> None:
+        """Initialize an empty ResultCache."""
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the value for key, or None if it isn't cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """Cache value for key, evicting the least recently used entries.
+
+        Args:
+            key: The key to cache value under.
+            value: The value to cache, which must not be mutated afterwards.
+            size: The approximate size of value in bytes.
+        """
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while (
+                len(self._entries) > self._max_entries
+                or self._bytes > self._max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
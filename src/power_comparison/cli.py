@@ -0,0 +1,882 @@
+"""Compare plans and manage usage data from the command line."""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, TextIO
+
+import numpy as np
+
+from power_comparison import instrumentation
+from power_comparison.data import Data, Profiles
+from power_comparison.default_values_utility import DefaultValuesUtility as DVU
+from power_comparison.forecast import forecast_average_usage, history_start
+from power_comparison.peers import PeerGroup
+from power_comparison.plan_catalog import PlanCatalog, PlanSelection
+from power_comparison.ranking import rank_all_users
+from power_comparison.retention import RetentionPolicy
+from power_comparison.simulation import (
+    POLICIES,
+    SELF_CONSUMPTION,
+    Battery,
+    load_solar_profile,
+    simulate_plans,
+    solar_generation,
+    solar_profile,
+)
+from power_comparison.sync import main as sync_main
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    import numpy.typing as npt
+
+# Histories forecast at once by compare --forecast.
+_FORECAST_BATCH = 256
+
+
+class RecordWriter:
+    """Stream records to a file as JSON lines or CSV."""
+
+    _file: TextIO
+    _format: str
+    _fields: list[str]
+    _csv_writer: Any = None
+
+    def __init__(
+        self, file: TextIO, output_format: str, fields: list[str]
+    ) -> None:
+        """Initialize the RecordWriter.
+
+        Args:
+            file: The file to write to.
+            output_format: Either "jsonl" or "csv".
+            fields: The fields of every record, in CSV column order.
+        """
+        self._file = file
+        self._format = output_format
+        self._fields = fields
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Write a record."""
+        if self._format == "jsonl":
+            self._file.write(json.dumps(record) + "\n")
+            return
+        if self._csv_writer is None:
+            self._csv_writer = csv.DictWriter(self._file, self._fields)
+            self._csv_writer.writeheader()
+        self._csv_writer.writerow(record)
+
+
+def parse_window(value: str) -> tuple[date, date]:
+    """Parse a START:END window of ISO dates."""
+    try:
+        start, end = value.split(":")
+        return date.fromisoformat(start), date.fromisoformat(end)
+    except ValueError as e:
+        msg = f"invalid window {value!r}, expected YYYY-MM-DD:YYYY-MM-DD"
+        raise argparse.ArgumentTypeError(msg) from e
+
+
+def parse_date(value: str) -> date:
+    """Parse an ISO date."""
+    try:
+        return date.fromisoformat(value)
+    except ValueError as e:
+        msg = f"invalid date {value!r}, expected YYYY-MM-DD"
+        raise argparse.ArgumentTypeError(msg) from e
+
+
+def select_users(data: Data, usernames: list[str] | None) -> Iterator[str]:
+    """Select each user in turn, yielding their username.
+
+    Defaults to every user in the database. Unknown users are reported on
+    stderr and skipped.
+    """
+    for username in usernames or data.get_usernames():
+        if not data.select_user(username):
+            print(f"Unknown user: {username}", file=sys.stderr)
+            continue
+        yield username
+
+
+def default_windows(data: Data) -> list[tuple[date, date]]:
+    """Return the year up to the selected user's last date."""
+    last_date = data.get_last_date() or date.today()
+    return [(last_date - timedelta(days=365), last_date)]
+
+
+def write_ranking(
+    writer: RecordWriter,
+    username: str,
+    window: tuple[date, date],
+    ranking: list[tuple[str, float]],
+    top: int | None,
+) -> None:
+    """Write a user's plan ranking for a window."""
+    start, end = window
+    for rank, (plan, cost) in enumerate(ranking[:top], 1):
+        writer.write(
+            {
+                "user": username,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "rank": rank,
+                "plan": plan,
+                "cost": round(cost, 2),
+            }
+        )
+
+
+def rank_usages(
+    profiles: Profiles, usages: npt.NDArray, args: argparse.Namespace
+) -> list[list[tuple[str, float]]] | None:
+    """Return plans ranked for each usage, only the top if one is given.
+
+    Prints an error if the profile set can't be loaded.
+    """
+    if args.top is None:
+        rankings = profiles.generate_plan_comparisons(usages, args.profile_set)
+    else:
+        rankings = profiles.rank_plans(usages, args.profile_set, args.top)
+    if rankings is None:
+        print(f"Invalid profile set: {args.profile_set}", file=sys.stderr)
+    return rankings
+
+
+def compare_forecasts(
+    args: argparse.Namespace,
+    data: Data,
+    profiles: Profiles,
+    writer: RecordWriter,
+) -> int:
+    """Write every user's plan ranking for the year after every window.
+
+    Users are forecast in batches of _FORECAST_BATCH histories.
+    """
+    batch: list[tuple[str, tuple[date, date], date, npt.NDArray]] = []
+
+    def flush() -> bool:
+        if len(batch) == 0:
+            return True
+        days = max(len(matrix) for _, _, _, matrix in batch)
+        # Histories are padded at the front, so each forecast starts after
+        # its own window.
+        usage = np.full((len(batch), days, 24), np.nan)
+        first_dates = []
+        for i, (_, _, first_date, matrix) in enumerate(batch):
+            usage[i, days - len(matrix) :] = matrix
+            first_dates.append(first_date - timedelta(days=days - len(matrix)))
+        averages = forecast_average_usage(first_dates, usage)
+        enough = ~np.isnan(averages).any(axis=(1, 2))
+        rankings = rank_usages(profiles, averages[enough], args)
+        if rankings is None:
+            return False
+        ranked = iter(rankings)
+        for (username, window, _, _), has_enough in zip(batch, enough):
+            if not has_enough:
+                print(
+                    f"Not enough data to forecast {username} after "
+                    f"{window[1]}",
+                    file=sys.stderr,
+                )
+                continue
+            write_ranking(writer, username, window, next(ranked), args.top)
+        batch.clear()
+        return True
+
+    for username in select_users(data, args.user):
+        for start, end in args.window or default_windows(data):
+            history = data.get_hourly_usage(
+                history_start(start, end),
+                end,
+                exclude_anomalies=args.exclude_anomalies,
+            )
+            if history is None:
+                print(
+                    f"No data for {username} from {start} to {end}",
+                    file=sys.stderr,
+                )
+                continue
+            batch.append((username, (start, end), *history))
+            if len(batch) == _FORECAST_BATCH and not flush():
+                return 1
+    return 0 if flush() else 1
+
+
+def compare(args: argparse.Namespace, data: Data, profiles: Profiles) -> int:
+    """Write every user's plan ranking for every window."""
+    if args.profile_set not in profiles.get_profile_set_names():
+        print(f"Unknown profile set: {args.profile_set}", file=sys.stderr)
+        return 1
+    writer = RecordWriter(
+        sys.stdout,
+        args.format,
+        ["user", "start", "end", "rank", "plan", "cost"],
+    )
+    if args.forecast:
+        return compare_forecasts(args, data, profiles, writer)
+    for username in select_users(data, args.user):
+        windows: list[tuple[date, date]] = []
+        usages: list[list[list[float]]] = []
+        for start, end in args.window or default_windows(data):
+            usage_data = data.get_average_usage(
+                start, end, exclude_anomalies=args.exclude_anomalies
+            )
+            if usage_data is None:
+                print(
+                    f"No data for {username} from {start} to {end}",
+                    file=sys.stderr,
+                )
+                continue
+            windows.append((start, end))
+            usages.append(usage_data)
+        if len(usages) == 0:
+            continue
+        rankings = rank_usages(profiles, np.array(usages), args)
+        if rankings is None:
+            return 1
+        if profiles.has_spot_plans(args.profile_set):
+            for i, (start, end) in enumerate(windows):
+                hourly_usage = data.get_hourly_usage(
+                    start, end, exclude_anomalies=args.exclude_anomalies
+                )
+                if hourly_usage is not None:
+                    rankings[i] = profiles.add_spot_plans(
+                        rankings[i], *hourly_usage, args.profile_set
+                    )
+        for window, ranking in zip(windows, rankings):
+            write_ranking(writer, username, window, ranking, args.top)
+    return 0
+
+
+def rank(args: argparse.Namespace, data: Data, profiles: Profiles) -> int:
+    """Store and write every user's best plan, ranked in one batch."""
+    start, end = args.window or (None, None)
+    rankings = rank_all_users(data, profiles, args.profile_set, start, end)
+    if rankings is None:
+        print(f"Unknown profile set: {args.profile_set}", file=sys.stderr)
+        return 1
+    writer = RecordWriter(
+        sys.stdout, args.format, ["user", "plan", "cost", "savings"]
+    )
+    for username, plan, cost, savings in rankings:
+        writer.write(
+            {
+                "user": username,
+                "plan": plan,
+                "cost": round(cost, 2),
+                "savings": round(savings, 2),
+            }
+        )
+    print(f"Ranked plans for {len(rankings)} user(s)", file=sys.stderr)
+    return 0
+
+
+def peers(args: argparse.Namespace, data: Data, profiles: Profiles) -> int:
+    """Write where every user's usage and best plan cost place them."""
+    end = args.window[1] if args.window else date.today()
+    start = args.window[0] if args.window else end - timedelta(days=365)
+    group = PeerGroup.build(data, profiles, args.profile_set, start, end)
+    if group is None:
+        print(f"Unknown profile set: {args.profile_set}", file=sys.stderr)
+        return 1
+    writer = RecordWriter(
+        sys.stdout,
+        args.format,
+        [
+            "user",
+            "yearly_usage",
+            "yearly_usage_percentile",
+            "best_cost",
+            "best_cost_percentile",
+        ],
+    )
+    for username in args.user or group.usernames:
+        result = group.get_percentiles(username)
+        if result is None:
+            print(f"Not enough data for {username}", file=sys.stderr)
+            continue
+        writer.write(
+            {
+                "user": username,
+                "yearly_usage": round(result["yearly_usage_value"], 1),
+                "yearly_usage_percentile": round(result["yearly_usage"], 1),
+                "best_cost": round(result["best_cost_value"], 2),
+                "best_cost_percentile": round(result["best_cost"], 1),
+            }
+        )
+    print(f"Compared {len(group)} user(s)", file=sys.stderr)
+    return 0
+
+
+def parse_battery(value: str) -> Battery:
+    """Parse a KWH:KW battery capacity and power."""
+    try:
+        capacity, power = value.split(":")
+        return Battery(float(capacity), float(power))
+    except ValueError as e:
+        msg = f"invalid battery {value!r}, expected KWH:KW"
+        raise argparse.ArgumentTypeError(msg) from e
+
+
+def parse_hours(value: str) -> range:
+    """Parse a START-END range of hours, END exclusive."""
+    try:
+        start, end = (int(hour) for hour in value.split("-"))
+    except ValueError as e:
+        msg = f"invalid hours {value!r}, expected START-END"
+        raise argparse.ArgumentTypeError(msg) from e
+    return range(start, end)
+
+
+def simulate(args: argparse.Namespace, data: Data, profiles: Profiles) -> int:
+    """Write every plan's cost for each user with solar and batteries."""
+    if args.profile_set not in profiles.get_profile_set_names():
+        print(f"Unknown profile set: {args.profile_set}", file=sys.stderr)
+        return 1
+    profile = (
+        solar_profile()
+        if args.solar_profile is None
+        else load_solar_profile(args.solar_profile)
+    )
+    batteries = args.battery or [Battery(0, 0)]
+    writer = RecordWriter(
+        sys.stdout,
+        args.format,
+        ["user", "battery_kwh", "battery_kw", "rank", "plan", "cost"],
+    )
+    for username in select_users(data, args.user):
+        start, end = args.window or default_windows(data)[0]
+        hourly_usage = data.get_hourly_usage(start, end)
+        if hourly_usage is None:
+            print(
+                f"No data for {username} from {start} to {end}",
+                file=sys.stderr,
+            )
+            continue
+        first_date, usage_matrix = hourly_usage
+        result = simulate_plans(
+            profiles,
+            args.profile_set,
+            first_date,
+            usage_matrix,
+            solar_generation(
+                profile, first_date, len(usage_matrix), args.solar_kw
+            ),
+            batteries,
+            args.policy,
+            args.charge_hours,
+        )
+        if result is None:
+            print(
+                f"Not enough complete days for {username} from {start} "
+                f"to {end}",
+                file=sys.stderr,
+            )
+            continue
+        names, costs = result
+        for battery, battery_costs in zip(batteries, costs):
+            order = np.argsort(battery_costs, kind="stable")
+            for rank, i in enumerate(order[: args.top], 1):
+                writer.write(
+                    {
+                        "user": username,
+                        "battery_kwh": battery.capacity_kwh,
+                        "battery_kw": battery.power_kw,
+                        "rank": rank,
+                        "plan": names[i],
+                        "cost": round(float(battery_costs[i]), 2),
+                    }
+                )
+    return 0
+
+
+def report(args: argparse.Namespace, data: Data, profiles: Profiles) -> int:
+    """Render every user's usage and plan comparison report to a file."""
+    # Imported here as matplotlib is slow to import.
+    from power_comparison.report import render_reports
+
+    if args.profile_set not in profiles.get_profile_set_names():
+        print(f"Unknown profile set: {args.profile_set}", file=sys.stderr)
+        return 1
+    rendered = 0
+    for username, path in render_reports(
+        args.user or data.get_usernames(),
+        args.profile_set,
+        args.output_dir,
+        db_filepath=args.db,
+        profiles_dir=args.profiles_dir,
+        catalog_filepath=args.catalog,
+        selection=plan_selection(args),
+        window=args.window,
+        output_format=args.format,
+        workers=args.workers,
+    ):
+        if path is None:
+            print(f"No data for {username}", file=sys.stderr)
+            continue
+        rendered += 1
+        print(path)
+    print(f"Rendered {rendered} report(s)", file=sys.stderr)
+    return 0
+
+
+def usage(args: argparse.Namespace, data: Data, _: Profiles) -> int:
+    """Write every user's average usage per hour for every window."""
+    writer = RecordWriter(
+        sys.stdout, args.format, ["user", "start", "end", "hour", "usage"]
+    )
+    for username in select_users(data, args.user):
+        for start, end in args.window or default_windows(data):
+            result = data.get_usage_per_hour(start, end)
+            if result is None:
+                print(
+                    f"No data for {username} from {start} to {end}",
+                    file=sys.stderr,
+                )
+                continue
+            for hour, value in enumerate(result):
+                writer.write(
+                    {
+                        "user": username,
+                        "start": start.isoformat(),
+                        "end": end.isoformat(),
+                        "hour": hour,
+                        "usage": value,
+                    }
+                )
+    return 0
+
+
+def anomalies(args: argparse.Namespace, data: Data, _: Profiles) -> int:
+    """Write every user's anomalies found as their usage was ingested."""
+    writer = RecordWriter(
+        sys.stdout,
+        args.format,
+        ["user", "date", "kind", "hour", "value", "score"],
+    )
+    for username in select_users(data, args.user):
+        for start, end in args.window or default_windows(data):
+            for day, kind, hour, value, score in data.get_anomalies(
+                start, end
+            ):
+                writer.write(
+                    {
+                        "user": username,
+                        "date": day.isoformat(),
+                        "kind": kind,
+                        "hour": hour,
+                        "value": value,
+                        "score": None if score is None else round(score, 1),
+                    }
+                )
+    return 0
+
+
+def import_usage(args: argparse.Namespace, data: Data, _: Profiles) -> int:
+    """Import a user's usage from a CSV of dates and 24 hourly values.
+
+    Dates the user already has data for are skipped.
+    """
+    data.initialize_user(args.user)
+    existing = set(data.get_dates())
+    rows: list[tuple[date, list[float]]] = []
+    with open(args.file, newline="", encoding="utf-8") as file:
+        for line, row in enumerate(csv.reader(file), 1):
+            if len(row) == 0 or row[0].strip().lower() == "date":
+                continue
+            try:
+                row_date = date.fromisoformat(row[0].strip())
+                values = [float(value) for value in row[1:]]
+            except ValueError:
+                print(f"{args.file}:{line}: invalid row", file=sys.stderr)
+                return 1
+            if len(values) != 24:
+                print(
+                    f"{args.file}:{line}: expected 24 hourly values",
+                    file=sys.stderr,
+                )
+                return 1
+            if row_date not in existing:
+                existing.add(row_date)
+                rows.append((row_date, values))
+    # Ingesting nothing would still bump the data version, clearing the
+    # user's cached results.
+    if len(rows) > 0:
+        data.ingest_data(rows)
+    print(f"Imported {len(rows)} day(s) for {args.user}", file=sys.stderr)
+    return 0
+
+
+def retain(args: argparse.Namespace, data: Data, _: Profiles) -> int:
+    """Roll up usage older than the retention period, and compact."""
+    rows = RetentionPolicy(args.keep_years).apply(data)
+    print(f"Rolled up {rows} hourly row(s)", file=sys.stderr)
+    return 0
+
+
+def import_plans(args: argparse.Namespace) -> int:
+    """Import every profile set in a directory into the plan catalog."""
+    if args.catalog is None:
+        print("--catalog is required to import plans", file=sys.stderr)
+        return 1
+    catalog = PlanCatalog(args.catalog)
+    try:
+        plans = catalog.import_profiles(
+            args.directory or args.profiles_dir or DVU.get_profiles_dir()
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        catalog.close()
+    print(f"Imported {plans} plan(s) into {args.catalog}", file=sys.stderr)
+    return 0
+
+
+def plan_selection(args: argparse.Namespace) -> PlanSelection:
+    """Return the catalog plans selected by the command line."""
+    return PlanSelection(args.retailer, args.region, args.on)
+
+
+def sync(args: argparse.Namespace) -> int:
+    """Download new usage data for every account once."""
+    argv = ["--once"]
+    if args.accounts is not None:
+        argv += ["--accounts", args.accounts]
+    if args.db is not None:
+        argv += ["--db", args.db]
+    sync_main(argv)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="power-comparison-cli", description=__doc__
+    )
+    parser.add_argument("--db", help="path to the usage database")
+    parser.add_argument(
+        "--profiles-dir", help="path to the directory of profile sets"
+    )
+    parser.add_argument(
+        "--catalog",
+        metavar="FILE",
+        help="read plans from this plan catalog database, see import-plans",
+    )
+    parser.add_argument(
+        "--retailer", help="only use catalog plans from this retailer"
+    )
+    parser.add_argument(
+        "--region", help="only use catalog plans for this region"
+    )
+    parser.add_argument(
+        "--on",
+        type=parse_date,
+        metavar="DATE",
+        help="use catalog plans' pricing in effect on DATE "
+        "(default: their latest pricing)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="time spans of work and write them as JSON to FILE, "
+        "or - for stderr",
+    )
+    parser.add_argument(
+        "--slow-query-ms",
+        type=float,
+        metavar="MS",
+        help="log SQL statements taking at least MS milliseconds, with "
+        "their query plans, to stderr",
+    )
+    parser.add_argument(
+        "--trace-sql",
+        action="store_true",
+        help="log every SQL statement and its duration to stderr",
+    )
+    subparsers = parser.add_subparsers(required=True, metavar="command")
+
+    def add_query_arguments(
+        subparser: argparse.ArgumentParser,
+        user_help: str | None = "user to include",
+        repeat_window: bool = True,
+        window_default: str = "the year up to each user's last date",
+    ) -> None:
+        """Add the --user, --window and --format arguments to a subcommand.
+
+        Args:
+            subparser: The subcommand's parser.
+            user_help: What --user does, or None to not add it.
+            repeat_window: Whether --window may be given more than once.
+            window_default: The date range used without --window.
+        """
+        if user_help is not None:
+            subparser.add_argument(
+                "--user",
+                action="append",
+                help=f"{user_help}, may be repeated (default: every user)",
+            )
+        subparser.add_argument(
+            "--window",
+            action="append" if repeat_window else "store",
+            type=parse_window,
+            metavar="START:END",
+            help="date range to include"
+            + (", may be repeated" if repeat_window else "")
+            + f" (default: {window_default})",
+        )
+        subparser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            default="jsonl",
+            help="output format (default: %(default)s)",
+        )
+
+    compare_parser = subparsers.add_parser(
+        "compare",
+        help="rank plans by yearly cost, over the year up to each user's "
+        "last date unless given a window",
+    )
+    compare_parser.add_argument("profile_set", help="profile set to compare")
+    compare_parser.add_argument(
+        "--top", type=int, help="only output this many of the cheapest plans"
+    )
+    compare_parser.add_argument(
+        "--forecast",
+        action="store_true",
+        help="cost the year after each window, forecast from up to three "
+        "years of hourly usage before its end",
+    )
+    compare_parser.add_argument(
+        "--exclude-anomalies",
+        action="store_true",
+        help="leave out days with anomalies, see the anomalies command",
+    )
+    add_query_arguments(compare_parser)
+    compare_parser.set_defaults(func=compare)
+
+    # Users ranked or placed among each other are all read over one window,
+    # unlike compare's, which ends at each user's last date.
+    cohort_window = "the year up to today, for every user"
+    rank_parser = subparsers.add_parser(
+        "rank",
+        help="store every user's best plan and savings against their median "
+        "plan, in one batch, over the year up to today unless given a "
+        "window",
+    )
+    rank_parser.add_argument("profile_set", help="profile set to rank")
+    add_query_arguments(
+        rank_parser,
+        user_help=None,
+        repeat_window=False,
+        window_default=cohort_window,
+    )
+    rank_parser.set_defaults(func=rank)
+
+    peers_parser = subparsers.add_parser(
+        "peers",
+        help="place every user's yearly usage and best plan cost among "
+        "every other user's, as percentiles, over the year up to today "
+        "unless given a window",
+    )
+    peers_parser.add_argument("profile_set", help="profile set to cost")
+    add_query_arguments(
+        peers_parser,
+        user_help="user to write",
+        repeat_window=False,
+        window_default=cohort_window,
+    )
+    peers_parser.set_defaults(func=peers)
+
+    report_parser = subparsers.add_parser(
+        "report", help="render usage and plan comparison reports"
+    )
+    report_parser.add_argument("profile_set", help="profile set to compare")
+    report_parser.add_argument(
+        "output_dir", help="directory to write one report per user to"
+    )
+    report_parser.add_argument(
+        "--user",
+        action="append",
+        help="user to include, may be repeated (default: every user)",
+    )
+    report_parser.add_argument(
+        "--window",
+        type=parse_window,
+        metavar="START:END",
+        help="date range to include "
+        "(default: the year up to each user's last date)",
+    )
+    report_parser.add_argument(
+        "--format",
+        choices=["pdf", "png"],
+        default="pdf",
+        help="report file format (default: %(default)s)",
+    )
+    report_parser.add_argument(
+        "--workers",
+        type=int,
+        help="processes to render with (default: one per processor)",
+    )
+    report_parser.set_defaults(func=report)
+
+    simulate_parser = subparsers.add_parser(
+        "simulate",
+        help="rank plans by yearly cost with rooftop solar and batteries",
+    )
+    simulate_parser.add_argument("profile_set", help="profile set to compare")
+    simulate_parser.add_argument(
+        "--user",
+        action="append",
+        help="user to include, may be repeated (default: every user)",
+    )
+    simulate_parser.add_argument(
+        "--window",
+        type=parse_window,
+        metavar="START:END",
+        help="date range to simulate "
+        "(default: the year up to each user's last date)",
+    )
+    simulate_parser.add_argument(
+        "--solar-kw",
+        type=float,
+        default=0,
+        help="size of the solar panels (default: %(default)s)",
+    )
+    simulate_parser.add_argument(
+        "--solar-profile",
+        metavar="FILE",
+        help="CSV of kWh generated per kW of panels, 12 rows of 24 hours "
+        "(default: typical for Christchurch)",
+    )
+    simulate_parser.add_argument(
+        "--battery",
+        action="append",
+        type=parse_battery,
+        metavar="KWH:KW",
+        help="battery capacity and power, may be repeated to compare sizes "
+        "(default: no battery)",
+    )
+    simulate_parser.add_argument(
+        "--policy",
+        choices=POLICIES,
+        default=SELF_CONSUMPTION,
+        help="how batteries are charged (default: %(default)s)",
+    )
+    simulate_parser.add_argument(
+        "--charge-hours",
+        type=parse_hours,
+        default=range(0),
+        metavar="START-END",
+        help="hours to charge batteries from the grid in, with the "
+        "grid-charge policy",
+    )
+    simulate_parser.add_argument(
+        "--top", type=int, help="only output this many of the cheapest plans"
+    )
+    simulate_parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv"],
+        default="jsonl",
+        help="output format (default: %(default)s)",
+    )
+    simulate_parser.set_defaults(func=simulate)
+
+    usage_parser = subparsers.add_parser(
+        "usage", help="output average usage per hour"
+    )
+    add_query_arguments(usage_parser)
+    usage_parser.set_defaults(func=usage)
+
+    anomalies_parser = subparsers.add_parser(
+        "anomalies",
+        help="output days with spikes, flatlines or meter errors, found as "
+        "usage was ingested",
+    )
+    add_query_arguments(anomalies_parser)
+    anomalies_parser.set_defaults(func=anomalies)
+
+    sync_parser = subparsers.add_parser(
+        "sync", help="download new usage data for every account once"
+    )
+    sync_parser.add_argument("--accounts", help="JSON file of accounts")
+    sync_parser.set_defaults(func=sync)
+
+    import_parser = subparsers.add_parser(
+        "import", help="import usage from a CSV file"
+    )
+    import_parser.add_argument("user", help="user to import usage for")
+    import_parser.add_argument(
+        "file", help="CSV of an ISO date and 24 hourly values per row"
+    )
+    import_parser.set_defaults(func=import_usage)
+
+    retain_parser = subparsers.add_parser(
+        "retain", help="roll up old hourly usage and compact the database"
+    )
+    retain_parser.add_argument(
+        "--keep-years",
+        type=int,
+        help="years of hourly usage to keep, rolling up older usage into "
+        "monthly averages (default: keep all, only compact)",
+    )
+    retain_parser.set_defaults(func=retain)
+
+    import_plans_parser = subparsers.add_parser(
+        "import-plans",
+        help="import or update profile sets in the plan catalog given by "
+        "--catalog",
+    )
+    import_plans_parser.add_argument(
+        "directory",
+        nargs="?",
+        help="directory of profile sets (default: --profiles-dir)",
+    )
+    import_plans_parser.set_defaults(func=import_plans)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for the command line interface."""
+    args = build_parser().parse_args(argv)
+    if args.profile is not None:
+        instrumentation.enable(args.profile)
+    else:
+        instrumentation.enable_from_environment()
+    if args.func in (sync, import_plans):
+        sys.exit(args.func(args))
+    slow_query_ms = args.slow_query_ms
+    if args.trace_sql or slow_query_ms is not None:
+        logging.basicConfig(
+            level=logging.DEBUG if args.trace_sql else logging.WARNING,
+            format="%(asctime)s %(levelname)s %(message)s",
+        )
+        if slow_query_ms is None:
+            slow_query_ms = float("inf")
+    data = Data(args.db, slow_query_ms=slow_query_ms)
+    try:
+        profiles = Profiles(
+            args.profiles_dir,
+            catalog_filepath=args.catalog,
+            selection=plan_selection(args),
+        )
+        status = args.func(args, data, profiles)
+    except BrokenPipeError:
+        # Output was piped to a command that exited, like head. Standard
+        # output is pointed at devnull so flushing it on exit doesn't fail.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 1
+    finally:
+        data.close()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,45 @@
 """Define an Enum of Connectors"""
 
+from __future__ import annotations
+
 from enum import Enum
-from .connector import Connector
-from .contact_energy_connector import ContactEnergyConnector
-from .blank import BlankEnergyConnector
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .connector import Connector
 
 
 class Connectors(Enum):
-    """An Enum of Connectors."""
+    """An Enum of Connectors.
+
+    Each value is a connector's name, module, and class name, so a
+    connector's dependencies are only imported once it is used. This is the
+    one place names are defined, which each connector's get_name() reads.
+    """
+
+    CONTACT_ENERGY = (
+        "Contact Energy",
+        ".contact_energy_connector",
+        "ContactEnergyConnector",
+    )
+    BLANK_ENERGY = (
+        "Sign into deactivated accounts",
+        ".blank",
+        "BlankEnergyConnector",
+    )
+
+    @property
+    def display_name(self) -> str:
+        """Return the name of the power utility the connector connects to."""
+        return self.value[0]
 
-    CONTACT_ENERGY = ContactEnergyConnector
-    BLANK_ENERGY = BlankEnergyConnector
+    def load(self) -> type[Connector]:
+        """Import and return the connector class."""
+        _, module, class_name = self.value
+        return getattr(import_module(module, __package__), class_name)
 
     @staticmethod
-    def get_names() -> dict[str, Connector]:
+    def get_names() -> dict[str, Connectors]:
         """Return a map of names of connectors with connectors."""
-        return {
-            connector.value.get_name(): connector.value
-            for connector in Connectors
-        }
+        return {connector.display_name: connector for connector in Connectors}
@@ -6,15 +6,13 @@ from collections.abc import Callable
 from datetime import date
 from typing import Self
 
-
+from power_comparison.connectors import Connectors
 from power_comparison.connectors.connector import Connector
 
 
 class BlankEnergyConnector(Connector):
     """Implement Connector for signing into old accounts."""
 
-    _UTILITY_NAME = "Sign into deactivated accounts"
-
     @classmethod
     async def create(
         cls, username: str, password: str, timeout: int = 60
@@ -47,4 +45,4 @@ class BlankEnergyConnector(Connector):
     @staticmethod
     def get_name() -> str:
         """Return the name of the power utility this connector connects to."""
-        return BlankEnergyConnector._UTILITY_NAME
+        return Connectors.BLANK_ENERGY.display_name
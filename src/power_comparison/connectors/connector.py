@@ -5,7 +5,7 @@ from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Self
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import AsyncIterator, Callable
     from datetime import date
 
 
@@ -62,6 +62,32 @@ class Connector(ABC):
             AuthException when token becomes stale.
         """
 
+    async def stream_usage(
+        self,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        callback: Callable[[int], None] | None = None,
+    ) -> AsyncIterator[list[tuple[date, list[float]]]]:
+        """Retrieve usage data in batches of days, as it is downloaded.
+
+        Connectors that download a day at a time should override this, so
+        batches can be saved while later ones download. By default, yields
+        everything retrieve_usage() returns as one batch.
+
+        Args:
+            start_date: See retrieve_usage().
+            end_date: See retrieve_usage().
+            callback: See retrieve_usage().
+
+        Yields:
+            Lists of dates with corresponding usage values.
+
+        Raises:
+            asyncio.TimeoutError
+            AuthException when token becomes stale.
+        """
+        yield await self.retrieve_usage(start_date, end_date, callback)
+
     @staticmethod
     @abstractmethod
     def get_name() -> str:
@@ -1,7 +1,7 @@
 """Implement Connector for the Contact Energy API."""
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable
 from datetime import date, timedelta
 from typing import Self
 
@@ -9,7 +9,7 @@ import async_timeout
 import contact_energy_nz
 from contact_energy_nz import ContactEnergyApi, UsageDatum
 
-from power_comparison.connectors import connector
+from power_comparison.connectors import Connectors, connector
 from power_comparison.connectors.connector import Connector
 
 
@@ -19,7 +19,8 @@ class ContactEnergyConnector(Connector):
     _token: str
     _connector: ContactEnergyApi
     _timeout: int
-    _UTILITY_NAME = "Contact Energy"
+    # Days of usage to download before yielding them to be saved.
+    _BATCH_DAYS = 7
 
     @classmethod
     async def create(
@@ -70,11 +71,29 @@ class ContactEnergyConnector(Connector):
         Throws:
             asyncio.TimeoutError
         """
+        return [
+            day
+            async for batch in self.stream_usage(
+                start_date, end_date, callback
+            )
+            for day in batch
+        ]
+
+    async def stream_usage(
+        self,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        callback: Callable[[int], None] | None = None,
+    ) -> AsyncIterator[list[tuple[date, list[float]]]]:
+        """Retrieve usage data in batches of days, newest first.
+
+        See Connector.stream_usage().
+        """
         end_date = end_date if end_date else date.today()
         start_date = (
             start_date if start_date else end_date - timedelta(days=365)
         )
-        data: list[list[UsageDatum]] = []
+        batch: list[tuple[date, list[float]]] = []
         valid_data = False
         day = end_date
         while day >= start_date:
@@ -82,22 +101,28 @@ class ContactEnergyConnector(Connector):
                 callback(day.toordinal())
             async with async_timeout.timeout(self._timeout):
                 day_data = await self._connector.get_hourly_usage(day)
-                if day_data is None or len(day_data) == 0:
-                    if valid_data:
-                        break
-                else:
-                    data.append(day_data)
-                    valid_data = True
+            if day_data is None or len(day_data) == 0:
+                if valid_data:
+                    break
+            else:
+                batch.append(self._to_day(day_data))
+                valid_data = True
+                if len(batch) == self._BATCH_DAYS:
+                    yield batch
+                    batch = []
             day -= timedelta(days=1)
-        return [
-            (
-                usage_datums[0].date.date(),
-                [usage_datum.value for usage_datum in usage_datums],
-            )
-            for usage_datums in data
-        ]
+        if len(batch) > 0:
+            yield batch
+
+    @staticmethod
+    def _to_day(usage_datums: list[UsageDatum]) -> tuple[date, list[float]]:
+        """Convert a day of usage from the API."""
+        return (
+            usage_datums[0].date.date(),
+            [usage_datum.value for usage_datum in usage_datums],
+        )
 
     @staticmethod
     def get_name() -> str:
         """Return the name of the power utility this connector connects to."""
-        return ContactEnergyConnector._UTILITY_NAME
+        return Connectors.CONTACT_ENERGY.display_name
@@ -2,33 +2,193 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import date, datetime, timedelta
-from typing import TYPE_CHECKING
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Any, TypeVar
 
+from power_comparison.cache import ResultCache
 from power_comparison.connectors import Connectors
 from power_comparison.connectors.connector import AuthException
 from power_comparison.default_values_utility import DefaultValuesUtility as DVU
+from power_comparison.instrumentation import span, timed
 
 if TYPE_CHECKING:
     from collections.abc import Callable
 
+    import numpy.typing as npt
+
     from power_comparison.connectors.connector import Connector
     from power_comparison.data import Data, Profiles
+    from power_comparison.timeline import TimelineTiles
+
+T = TypeVar("T")
+# The first date of each window as "windows", plan names as "plans", and
+# each window's yearly cost of each plan as "costs".
+WindowedComparison = dict[str, list[Any]]
 
 
 class Controller:
     """A class to control the application."""
 
     _connector: Connector | None = None
-    _data: Data
-    _profiles: Profiles
+    _data_source: Data | Future[Data]
+    _profiles_source: Profiles | Future[Profiles]
     _callback: Callable[[str], None] | None = None
     _username: str | None = None
+    _cache: ResultCache
+    _persist_cache: bool
+    _executor: ThreadPoolExecutor
+    _owns_executor: bool
+    _requests: dict[str, asyncio.Future[Any]]
+    _timeline: tuple[tuple[str | None, int], date, TimelineTiles] | None = None
+    _FRESH_DATA_AGE = timedelta(hours=12)
+    _EXECUTOR_WORKERS = 2
+
+    def __init__(
+        self,
+        data: Data | Future[Data],
+        profiles: Profiles | Future[Profiles],
+        cache: ResultCache | None = None,
+        *,
+        persist_cache: bool = False,
+        executor: ThreadPoolExecutor | None = None,
+    ) -> None:
+        """Initialize the controller.
+
+        Args:
+            data:
+                May be a future, so it can load in the background while the
+                view starts. It is waited on when first used.
+            profiles:
+                May be a future, like data.
+            cache:
+                Defaults to a new ResultCache. May be shared between
+                controllers.
+            persist_cache:
+                Defaults to False. Whether to also cache results in the
+                user's database, so they are reused between sessions.
+            executor:
+                Runs background work. Defaults to a new executor, which
+                close() shuts down. May be shared between controllers, and
+                is then left for its owner to shut down.
+        """
+        self._data_source = data
+        self._profiles_source = profiles
+        self._cache = ResultCache() if cache is None else cache
+        self._persist_cache = persist_cache
+        self._owns_executor = executor is None
+        self._executor = (
+            self.create_executor() if executor is None else executor
+        )
+        self._requests = {}
+
+    @property
+    def _data(self) -> Data:
+        """Return the Data, waiting for it to load if needed."""
+        if isinstance(self._data_source, Future):
+            self._data_source = self._data_source.result()
+        return self._data_source
+
+    async def _load_data(self) -> Data:
+        """Return the Data, awaiting it without blocking if still loading."""
+        if isinstance(self._data_source, Future):
+            self._data_source = await asyncio.wrap_future(self._data_source)
+        return self._data_source
+
+    @property
+    def _profiles(self) -> Profiles:
+        """Return the Profiles, waiting for them to load if needed."""
+        if isinstance(self._profiles_source, Future):
+            self._profiles_source = self._profiles_source.result()
+        return self._profiles_source
+
+    def _cached(
+        self,
+        kind: str,
+        parts: tuple[str, ...],
+        compute: Callable[[], T | tuple[str, str]],
+        decode: Callable[[Any], T],
+        size: Callable[[T], int] | None = None,
+    ) -> T | tuple[str, str]:
+        """Return compute(), cached by kind, user, data version, and parts.
+
+        Results are kept in memory, and in the user's database if the cache
+        is persistent. Cached results are shared, so must not be mutated.
+
+        Args:
+            kind: The kind of result, e.g. "usage".
+            parts: Strings that together with kind identify the result.
+            compute: Returns the result, or an error title and message,
+                which aren't cached.
+            decode: Converts a JSON decoded result back to its type.
+            size: Returns a result's approximate size in bytes. If given,
+                the result is only kept in memory, even if the cache is
+                persistent, for results slower to encode than to compute
+                again. Defaults to the length of the result as JSON.
+        """
+        version = self._data.get_data_version()
+        key = (kind, self._data.get_username(), version, *parts)
+        result = self._cache.get(key)
+        if result is not None:
+            return result
+        persist = self._persist_cache and size is None
+        stored_key = json.dumps([kind, version, *parts])
+        if persist:
+            stored = self._data.get_cached_result(stored_key)
+            if stored is not None:
+                result = decode(json.loads(stored))
+                self._cache.put(key, result, len(stored))
+                return result
+        result = compute()
+        if isinstance(result, tuple):
+            return result
+        if size is not None:
+            self._cache.put(key, result, size(result))
+            return result
+        encoded = json.dumps(result)
+        self._cache.put(key, result, len(encoded))
+        if persist:
+            self._data.set_cached_result(stored_key, encoded)
+        return result
+
+    @classmethod
+    def create_executor(cls) -> ThreadPoolExecutor:
+        """Return an executor for controllers' background work."""
+        return ThreadPoolExecutor(
+            max_workers=cls._EXECUTOR_WORKERS,
+            thread_name_prefix="controller",
+        )
 
-    def __init__(self, data: Data, profiles: Profiles) -> None:
-        """Initialize the controller."""
-        self._data = data
-        self._profiles = profiles
+    def close(self) -> None:
+        """Stop background work, abandoning any queued requests.
+
+        A shared executor is left running.
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_latest(
+        self, key: str, func: Callable[..., T], *args: Any
+    ) -> T:
+        """Run func in the executor, superseding the last request for key.
+
+        Raises:
+            asyncio.CancelledError when a newer request for key supersedes
+            this one before it finishes.
+        """
+        previous = self._requests.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+        self._requests[key] = future
+        try:
+            return await future
+        finally:
+            if self._requests.get(key) is future:
+                del self._requests[key]
 
     def get_icon_path(self) -> str:
         """Return the path to the app's icon."""
@@ -78,10 +238,12 @@ class Controller:
             )
         if password.strip() == "":
             return "No password", "You haven't entered a password."
+        connector = await asyncio.get_running_loop().run_in_executor(
+            self._executor, Connectors.get_names()[connector_name].load
+        )
         try:
-            self._connector = await Connectors.get_names()[
-                connector_name
-            ].create(username, password)
+            with span("connector.create"):
+                self._connector = await connector.create(username, password)
         except AuthException:
             return (
                 "Invalid login",
@@ -99,7 +261,7 @@ make sure your internet is working.",
                 "We encountered an error trying to retrieve your information, \
 please try again later.",
             )
-        self._data.initialize_user(username)
+        (await self._load_data()).initialize_user(username)
         return None
 
     def download_data(
@@ -116,27 +278,55 @@ please try again later.",
     async def data_download_call(
         self, finished_callback: Callable[[], None]
     ) -> None:
-        """Call and await's connectors retrieve usage."""
+        """Download usage from the connector, saving it as it arrives.
+
+        Batches are written by an IngestWriter on its own thread, so the
+        download continues while earlier batches are committed. If the
+        download fails, what was saved is deleted, so the next download
+        starts from the same date.
+        """
         if self._connector is None:
             msg = "Controller._connector not set"
             raise ValueError(msg)
-        start_date = self._data.get_last_date()
+        data = await self._load_data()
+        start_date = data.get_last_date()
         if start_date:
             start_date += timedelta(days=1)
+        writer = data.ingest_writer()
         try:
-            data = await self._connector.retrieve_usage(
-                start_date=start_date,
-                callback=self.user_feedback_callback,
-            )
+            with span("connector.stream_usage"):
+                async for batch in self._connector.stream_usage(
+                    start_date=start_date,
+                    callback=self.user_feedback_callback,
+                ):
+                    await writer.put_async(batch)
+            if self._callback is not None:
+                self._callback("Saving downloaded data")
+            await asyncio.to_thread(writer.close)
         except asyncio.TimeoutError:
+            await asyncio.to_thread(writer.abort)
             if self._callback:
                 self._callback("Error: Downloading data timed out")
             return
-        if self._callback is not None:
-            self._callback("Saving downloaded data")
-        self._data.ingest_data(data)
+        except BaseException:
+            await asyncio.shield(asyncio.to_thread(writer.abort))
+            raise
+        data.set_last_sync()
         finished_callback()
 
+    def is_data_fresh(self, max_age: timedelta | None = None) -> bool:
+        """Return whether the user's data was synced within `max_age`.
+
+        Args:
+            max_age:
+                Defaults to Controller._FRESH_DATA_AGE.
+        """
+        max_age = self._FRESH_DATA_AGE if max_age is None else max_age
+        last_sync = self._data.get_last_sync()
+        if last_sync is None:
+            return False
+        return datetime.now() - last_sync < max_age
+
     def user_feedback_callback(self, date_ordinal: int) -> None:
         """Accept a date ordinal to callback stored callback with str."""
         if self._callback is None:
@@ -144,6 +334,14 @@ please try again later.",
         display_date = date.fromordinal(date_ordinal).strftime("%Y-%m-%d")
         self._callback(f"Retrieving usage data for date: {display_date}")
 
+    def get_usernames(self) -> list[str]:
+        """Return the usernames of every user with stored data."""
+        return self._data.get_usernames()
+
+    def select_user(self, username: str) -> bool:
+        """Select an existing user, returning False if they don't exist."""
+        return self._data.select_user(username)
+
     def get_last_date(self) -> date:
         """Return default end date."""
         result = self._data.get_last_date()
@@ -156,6 +354,66 @@ please try again later.",
             days=365
         )
 
+    def get_timeline_range(self) -> tuple[datetime, datetime] | None:
+        """Return when the user's usage starts and ends, or None if no data."""
+        first_date = self._data.get_first_date()
+        last_date = self._data.get_last_date()
+        if first_date is None or last_date is None:
+            return None
+        return datetime.combine(first_date, time()), datetime.combine(
+            last_date + timedelta(days=1), time()
+        )
+
+    @timed("Controller.get_timeline")
+    def get_timeline(
+        self, start: datetime, end: datetime, width: int
+    ) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray] | tuple[str, str]:
+        """Return hourly usage between two times decimated to width buckets.
+
+        Returns:
+            An error title and message, or arrays of each bucket's start as
+            a datetime64, and its minimum and maximum usage.
+        """
+        # Imported here as numpy is slow to import.
+        import numpy as np
+
+        key = (self._data.get_username(), self._data.get_data_version())
+        if self._timeline is None or self._timeline[0] != key:
+            from power_comparison.timeline import TimelineTiles
+
+            first_date = self._data.get_first_date()
+            last_date = self._data.get_last_date()
+            if first_date is None or last_date is None:
+                return "No Data", "Error no data was found for this range."
+            self._timeline = (
+                key,
+                first_date,
+                TimelineTiles(
+                    self._data.get_usage_matrix, first_date, last_date
+                ),
+            )
+        _, first_date, tiles = self._timeline
+        origin = datetime.combine(first_date, time())
+        hours, low, high = tiles.get_range(
+            (start - origin) / timedelta(hours=1),
+            (end - origin) / timedelta(hours=1),
+            width,
+        )
+        starts = np.datetime64(origin, "h") + hours.astype("timedelta64[h]")
+        return starts, low, high
+
+    async def get_timeline_async(
+        self, start: datetime, end: datetime, width: int
+    ) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray] | tuple[str, str]:
+        """Return get_timeline(), off the UI thread.
+
+        Raises:
+            asyncio.CancelledError when superseded by a newer call.
+        """
+        return await self._run_latest(
+            "timeline", self.get_timeline, start, end, width
+        )
+
     def get_usage_data(
         self, start_date: str, end_date: str
     ) -> list[float] | tuple[str, str]:
@@ -168,28 +426,192 @@ please try again later.",
                 "Error parsing dates",
                 f"Your dates must be in the format: {date.today().strftime('%x')}",
             )
-        result = self._data.get_usage_per_hour(start, end)
-        if result is None:
-            return "No Data", "Error no data was found for this range."
-        return result
+        return self.get_usage_for_range(start, end)
+
+    @timed("Controller.get_usage_for_range")
+    def get_usage_for_range(
+        self, start: date, end: date
+    ) -> list[float] | tuple[str, str]:
+        """Return Usage Data between dates or Error title and message."""
+
+        def compute() -> list[float] | tuple[str, str]:
+            result = self._data.get_usage_per_hour(start, end)
+            if result is None:
+                return "No Data", "Error no data was found for this range."
+            return result
+
+        return self._cached(
+            "usage", (start.isoformat(), end.isoformat()), compute, list
+        )
+
+    async def get_usage_data_async(
+        self, start_date: str, end_date: str
+    ) -> list[float] | tuple[str, str]:
+        """Return Usage Data or Error title and message, off the UI thread.
+
+        Raises:
+            asyncio.CancelledError when superseded by a newer call.
+        """
+        return await self._run_latest(
+            "usage", self.get_usage_data, start_date, end_date
+        )
+
+    async def get_comparison_data_async(
+        self,
+        plan_set_name: str,
+        start_date: str,
+        end_date: str,
+        forecast: bool = False,
+        exclude_anomalies: bool = False,
+    ) -> list[tuple[str, float]] | tuple[str, str]:
+        """Return comparison data or error messages, off the UI thread.
+
+        Raises:
+            asyncio.CancelledError when superseded by a newer call.
+        """
+        return await self._run_latest(
+            "comparison",
+            self.get_comparison_data,
+            plan_set_name,
+            start_date,
+            end_date,
+            forecast,
+            exclude_anomalies,
+        )
 
     def get_comparison_data(
-        self, plan_set_name: str, start_date: str, end_date: str
+        self,
+        plan_set_name: str,
+        start_date: str,
+        end_date: str,
+        forecast: bool = False,
+        exclude_anomalies: bool = False,
     ) -> list[tuple[str, float]] | tuple[str, str]:
         """Show comparison data in matplotlib display.
 
-        Returns None on success or error messages on failure.
+        Returns None on success or error messages on failure. See
+        compare_plans() for forecast and exclude_anomalies.
         """
         if plan_set_name == "":
             return (
                 "No Profile Set Selected",
                 "You haven't selected a set of plans to compare.",
             )
+        try:
+            start = datetime.strptime(start_date, "%x").date()
+            end = datetime.strptime(end_date, "%x").date()
+        except ValueError:
+            return (
+                "Error parsing dates",
+                f"Your dates must be in the format: {date.today().strftime('%x')}",
+            )
+        return self.compare_plans(
+            plan_set_name, start, end, forecast, exclude_anomalies
+        )
+
+    @timed("Controller.compare_plans")
+    def compare_plans(
+        self,
+        plan_set_name: str,
+        start: date,
+        end: date,
+        forecast: bool = False,
+        exclude_anomalies: bool = False,
+    ) -> list[tuple[str, float]] | tuple[str, str]:
+        """Return plans sorted by yearly cost, or error title and message.
+
+        Costs are estimated from the average usage between dates, or if
+        forecast, from the year after end, forecast from the hourly usage
+        before it. Forecasts fit to several years of history when there is
+        that much, so a short window in winter isn't costed as a year of
+        winter. Spot price plans aren't forecast, as future prices aren't
+        known. If exclude_anomalies, days with anomalies found when they
+        were ingested are left out, see Data.get_anomalies().
+        """
         if plan_set_name not in self._profiles.get_profile_set_names():
             return (
                 "Invalid Profile Set Selected",
                 "You haven't selected a valid set of plans to compare.",
             )
+        fingerprint = self._profiles.get_profile_set_fingerprint(plan_set_name)
+
+        def compute() -> list[tuple[str, float]] | tuple[str, str]:
+            if forecast:
+                usage_data = self._forecast_average_usage(
+                    start, end, exclude_anomalies
+                )
+                if isinstance(usage_data, tuple):
+                    return usage_data
+                hourly_usage = None
+            else:
+                usage_data = self._data.get_average_usage(
+                    start, end, exclude_anomalies=exclude_anomalies
+                )
+                if usage_data is None:
+                    return "No Data", "Error no data was found for this range."
+                hourly_usage = (
+                    self._data.get_hourly_usage(
+                        start, end, exclude_anomalies=exclude_anomalies
+                    )
+                    if self._profiles.has_spot_plans(plan_set_name)
+                    else None
+                )
+            data = self._profiles.generate_plan_comparison(
+                usage_data,
+                plan_set_name,
+                hourly_usage,
+                fingerprint=fingerprint,
+            )
+            if data is None:
+                return (
+                    "Error Fetching Profile Set",
+                    "We encountered an error fetching this profile set, \
+and it is not available for comparison at this time.",
+                )
+            return [(name, float(cost)) for name, cost in data]
+
+        return self._cached(
+            "comparison",
+            (
+                plan_set_name,
+                str(fingerprint),
+                start.isoformat(),
+                end.isoformat(),
+                "forecast" if forecast else "average",
+                "excluding anomalies" if exclude_anomalies else "all days",
+            ),
+            compute,
+            lambda result: [(name, cost) for name, cost in result],
+        )
+
+    async def get_comparison_over_time_data_async(
+        self, plan_set_name: str, start_date: str, end_date: str
+    ) -> WindowedComparison | tuple[str, str]:
+        """Return comparisons per month or error messages, off the UI thread.
+
+        Raises:
+            asyncio.CancelledError when superseded by a newer call.
+        """
+        return await self._run_latest(
+            "comparison",
+            self.get_comparison_over_time_data,
+            plan_set_name,
+            start_date,
+            end_date,
+        )
+
+    def get_comparison_over_time_data(
+        self, plan_set_name: str, start_date: str, end_date: str
+    ) -> WindowedComparison | tuple[str, str]:
+        """Return comparisons per month or error title and message.
+
+        See compare_plans_over_time().
+        """
+        if plan_set_name == "":
+            return (
+                "No Profile Set Selected",
+                "You haven't selected a set of plans to compare.",
+            )
         try:
             start = datetime.strptime(start_date, "%x").date()
             end = datetime.strptime(end_date, "%x").date()
@@ -198,16 +620,170 @@ please try again later.",
                 "Error parsing dates",
                 f"Your dates must be in the format: {date.today().strftime('%x')}",
             )
-        usage_data = self._data.get_average_usage(start, end)
-        if usage_data is None:
-            return "No Data", "Error no data was found for this range."
-        data = self._profiles.generate_plan_comparison(
-            usage_data, plan_set_name
+        return self.compare_plans_over_time(plan_set_name, start, end)
+
+    @timed("Controller.compare_plans_over_time")
+    def compare_plans_over_time(
+        self, plan_set_name: str, start: date, end: date
+    ) -> WindowedComparison | tuple[str, str]:
+        """Return every plan's yearly cost for each month between dates.
+
+        Every month is costed from its average usage, like compare_plans(),
+        read from the usage index. Months without usage for every
+        hour of every weekday, and rolled up months, are left out. Spot
+        price plans aren't included.
+
+        Returns:
+            An error title and message, or the first date of each month, the
+            plan names, and each month's yearly cost of each plan, see
+            WindowedComparison.
+        """
+        if plan_set_name not in self._profiles.get_profile_set_names():
+            return (
+                "Invalid Profile Set Selected",
+                "You haven't selected a valid set of plans to compare.",
+            )
+        fingerprint = self._profiles.get_profile_set_fingerprint(plan_set_name)
+
+        def compute() -> WindowedComparison | tuple[str, str]:
+            # Imported here as numpy is slow to import.
+            import numpy as np
+
+            from power_comparison.rolling import month_windows
+
+            windows = month_windows(start, end)
+            usage = self._data.get_window_average_usage(windows)
+            if usage is None:
+                return "No Data", "Error no data was found for this range."
+            result = self._profiles.get_plan_costs(
+                usage, plan_set_name, fingerprint=fingerprint
+            )
+            if result is None:
+                return (
+                    "Error Fetching Profile Set",
+                    "We encountered an error fetching this profile set, \
+and it is not available for comparison at this time.",
+                )
+            names, costs = result
+            complete = ~np.isnan(costs).any(axis=1)
+            if not complete.any():
+                return (
+                    "Not Enough Data",
+                    "No month in this range has usage for every hour of "
+                    "every weekday.",
+                )
+            return {
+                "windows": [
+                    (window_start + timedelta(days=1)).isoformat()
+                    for (window_start, _), has_usage in zip(windows, complete)
+                    if has_usage
+                ],
+                "plans": names,
+                "costs": costs[complete].tolist(),
+            }
+
+        return self._cached(
+            "comparison over time",
+            (
+                plan_set_name,
+                str(fingerprint),
+                start.isoformat(),
+                end.isoformat(),
+            ),
+            compute,
+            dict,
+            # Roughly each cost's length as JSON. Encoding every month's
+            # cost of every plan takes as long as costing them from the
+            # usage index, so they aren't persisted.
+            lambda result: 20 * len(result["windows"]) * len(result["plans"]),
+        )
+
+    @timed("Controller.compare_with_peers")
+    def compare_with_peers(
+        self, plan_set_name: str, start: date, end: date
+    ) -> dict[str, Any] | tuple[str, str]:
+        """Return where the user's usage and best plan cost place them.
+
+        Every user is placed in one PeerGroup per profile set and dates,
+        shared through the cache. It is rebuilt only for users whose data
+        changed since, so a lookup is usually a binary search per value.
+        Spot price plans aren't included.
+
+        Returns:
+            An error title and message, or the user's percentiles, see
+            PeerGroup.get_percentiles().
+        """
+        if plan_set_name not in self._profiles.get_profile_set_names():
+            return (
+                "Invalid Profile Set Selected",
+                "You haven't selected a valid set of plans to compare.",
+            )
+        # Imported here as numpy is slow to import.
+        from power_comparison.peers import PeerGroup
+
+        fingerprint = self._profiles.get_profile_set_fingerprint(plan_set_name)
+        key = (
+            "peers",
+            plan_set_name,
+            str(fingerprint),
+            start.isoformat(),
+            end.isoformat(),
         )
-        if data is None:
+        previous = self._cache.get(key)
+        group = PeerGroup.build(
+            self._data,
+            self._profiles,
+            plan_set_name,
+            start,
+            end,
+            previous,
+            fingerprint=fingerprint,
+        )
+        if group is None:
             return (
                 "Error Fetching Profile Set",
                 "We encountered an error fetching this profile set, \
 and it is not available for comparison at this time.",
             )
-        return data
+        if group is not previous:
+            self._cache.put(key, group, group.usage.nbytes)
+        result = group.get_percentiles(self._data.get_username())
+        if result is None:
+            return (
+                "No Data",
+                "Error not enough data was found for this range to compare "
+                "with other users.",
+            )
+        return result
+
+    def _forecast_average_usage(
+        self, start: date, end: date, exclude_anomalies: bool = False
+    ) -> list[list[float]] | tuple[str, str]:
+        """Return the forecast year after end as average weekly usage.
+
+        Returns an error title and message if there isn't enough data. See
+        compare_plans() for exclude_anomalies.
+        """
+        # Imported here as numpy is slow to import.
+        import numpy as np
+
+        from power_comparison.forecast import (
+            MIN_DAYS,
+            forecast_average_usage,
+            history_start,
+        )
+
+        history = self._data.get_hourly_usage(
+            history_start(start, end), end, exclude_anomalies=exclude_anomalies
+        )
+        if history is None:
+            return "No Data", "Error no data was found for this range."
+        first_date, usage_matrix = history
+        usage = forecast_average_usage([first_date], usage_matrix[None])[0]
+        if np.isnan(usage).any():
+            return (
+                "Not Enough Data",
+                f"At least {MIN_DAYS} days of usage are needed to forecast "
+                "a year.",
+            )
+        return usage.tolist()
@@ -1,15 +1,489 @@
 """Define the Data class."""
 from __future__ import annotations
 
+import asyncio
+import csv
+import functools
+import hashlib
+import itertools
+import queue
 import sqlite3
-from datetime import date, timedelta
+import threading
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Self
+from typing import TYPE_CHECKING, ParamSpec, Self, TypeVar
 
 import numpy as np
 import numpy.typing as npt
 
+from power_comparison.anomalies import UsageStatistics, detect_anomalies
+from power_comparison.cache import ResultCache
 from power_comparison.default_values_utility import DefaultValuesUtility as DVU
+from power_comparison.instrumentation import span, timed
+from power_comparison.plan_catalog import PlanCatalog, PlanSelection
+from power_comparison.query_log import QueryLog
+from power_comparison.spot_prices import PriceSeries
+from power_comparison.usage_index import UsageIndex
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+P = ParamSpec("P")
+T = TypeVar("T")
+ProfileTensor = tuple[list[str], npt.NDArray, npt.NDArray]
+SpotPlan = tuple[str, float, float, PriceSeries]
+PlanBounds = tuple[npt.NDArray, npt.NDArray]
+SPOT_PLAN_SUFFIX = ".spot"
+# The most results cached per user in the database, past which the oldest
+# are deleted, as a user whose data doesn't change never has them cleared.
+_MAX_CACHED_RESULTS = 256
+# The most users whose usage is summed by one query, under SQLite's oldest
+# limit of 999 parameters.
+_MAX_QUERY_USERS = 500
+# Plans are bounded by their cheapest and dearest rates in blocks of this
+# many hours, with weekdays and weekends apart, for ranking.
+_BOUND_BLOCK_HOURS = 4
+_BOUND_BLOCKS = (
+    (np.arange(7) >= 5)[:, None] * (24 // _BOUND_BLOCK_HOURS)
+    + np.arange(24) // _BOUND_BLOCK_HOURS
+).reshape(7 * 24)
+# Sums each block's hours of usages of shape (usages, 7 * 24) by product.
+_BOUND_BLOCK_SUMS = (
+    _BOUND_BLOCKS[:, None] == np.arange(_BOUND_BLOCKS.max() + 1)
+).astype(float)
+
+# Hourly usage between :start and :end, exclusive, as totals and counts.
+_HOURLY_USAGE = """SELECT user_id, day, hour, value AS total, 1 AS count
+    FROM usage_data
+    WHERE date > :start
+    AND date < :end"""
+# As above, with monthly rollups, which count as their month's first day.
+_HOURLY_AND_ROLLED_UP_USAGE = f"""{_HOURLY_USAGE}
+    UNION ALL
+    SELECT user_id, day, hour, total, count
+    FROM usage_rollups
+    WHERE date > :start
+    AND date < :end"""
+# Converts a Gregorian ordinal column to the ordinal of its month's start.
+_MONTH_START = "date + 1 - CAST(strftime('%d', date + 1721424.5) AS INTEGER)"
+
+
+def _synchronized(method: Callable[P, T]) -> Callable[P, T]:
+    """Serialize calls to a Data method, as they share one connection.
+
+    Calls are timed as spans named after the method, if enabled, and the
+    query log, if any, is flushed once the method has fetched its results.
+    """
+    name = f"Data.{method.__name__}"
+
+    @functools.wraps(method)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        self = args[0]
+        with self._lock, span(name):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if self._query_log is not None:
+                    self._query_log.finish()
+
+    return wrapper
+
+
+def _write_usage(
+    cursor: sqlite3.Cursor,
+    user_id: int,
+    data: list[tuple[date, list[float]]],
+    rolled_up_until: date | None,
+) -> list[tuple[date, list[float]]]:
+    """Insert a user's days of hourly usage, returning the days written.
+
+    Days before rolled_up_until are skipped, as they are already counted in
+    the user's rollups.
+    """
+    written = []
+    for data_date, values in data:
+        if rolled_up_until is not None and data_date < rolled_up_until:
+            continue
+        data_date_ord = data_date.toordinal()
+        day = data_date.weekday()
+        cursor.executemany(
+            """INSERT INTO usage_data VALUES(?, ?, ?, ?, ?)""",
+            (
+                (user_id, data_date_ord, day, hour, value)
+                for hour, value in enumerate(values)
+            ),
+        )
+        written.append((data_date, values))
+    return written
+
+
+def _get_data_version(cursor: sqlite3.Cursor, user_id: int) -> int:
+    """Return a user's data version, see Data.get_data_version()."""
+    row = cursor.execute(
+        "SELECT version FROM data_version WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    return 0 if row is None else row[0]
+
+
+def _load_usage_index(
+    cursor: sqlite3.Cursor, user_id: int
+) -> UsageIndex | None:
+    """Return a user's saved usage index, or None, however out of date."""
+    row = cursor.execute(
+        """SELECT first_date, version, totals, counts
+        FROM usage_index
+        WHERE user_id = ?""",
+        (user_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    first_date, version, totals, counts = row
+    return UsageIndex.from_bytes(
+        date.fromordinal(first_date), version, totals, counts
+    )
+
+
+def _save_usage_index(
+    cursor: sqlite3.Cursor, user_id: int, index: UsageIndex
+) -> None:
+    """Save a user's usage index, replacing any earlier one."""
+    cursor.execute(
+        "INSERT OR REPLACE INTO usage_index VALUES(?, ?, ?, ?, ?)",
+        (
+            user_id,
+            index.version,
+            index.first_date.toordinal(),
+            *index.to_bytes(),
+        ),
+    )
+
+
+def _extend_usage_index(
+    cursor: sqlite3.Cursor,
+    user_id: int,
+    previous_version: int,
+    data: list[tuple[date, list[float]]],
+) -> UsageIndex | None:
+    """Add newly written days to a user's saved usage index.
+
+    The index is only extended if it was up to date before the days were
+    written, at previous_version, and every day is after its last.
+    Otherwise it is left to be rebuilt when next read.
+
+    Returns:
+        The extended index, or None if it wasn't extended.
+    """
+    index = _load_usage_index(cursor, user_id)
+    if index is None or index.version != previous_version or len(data) == 0:
+        return None
+    first_date = min(data_date for data_date, _ in data)
+    if first_date < index.end_date:
+        return None
+    days = (max(data_date for data_date, _ in data) - first_date).days + 1
+    usage_matrix = np.full((days, 24), np.nan)
+    for data_date, values in data:
+        usage_matrix[(data_date - first_date).days, : len(values)] = values
+    index = index.extend(
+        first_date, _get_data_version(cursor, user_id), usage_matrix
+    )
+    _save_usage_index(cursor, user_id, index)
+    return index
+
+
+def _usage_batch(
+    data: list[tuple[date, list[float]]],
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """Return days of usage as date ordinals and an array of (days, 24)."""
+    ordinals = np.array([data_date.toordinal() for data_date, _ in data])
+    usage = np.full((len(data), 24), np.nan)
+    for row, (_, values) in enumerate(data):
+        usage[row, : len(values)] = values
+    return ordinals, usage
+
+
+def _load_usage_statistics(
+    cursor: sqlite3.Cursor, user_id: int
+) -> UsageStatistics | None:
+    """Return a user's saved usage statistics, or None."""
+    row = cursor.execute(
+        "SELECT count, mean, m2 FROM usage_statistics WHERE user_id = ?",
+        (user_id,),
+    ).fetchone()
+    return None if row is None else UsageStatistics.from_bytes(*row)
+
+
+def _save_usage_statistics(
+    cursor: sqlite3.Cursor, user_id: int, statistics: UsageStatistics
+) -> None:
+    """Save a user's usage statistics, replacing any earlier ones."""
+    cursor.execute(
+        "INSERT OR REPLACE INTO usage_statistics VALUES(?, ?, ?, ?)",
+        (user_id, *statistics.to_bytes()),
+    )
+
+
+def _detect_anomalies(
+    cursor: sqlite3.Cursor,
+    user_id: int,
+    data: list[tuple[date, list[float]]],
+) -> None:
+    """Record the anomalies in newly written days, and learn from them.
+
+    A user without statistics, such as one whose usage was ingested before
+    anomalies were detected, has them started from all of their hourly
+    usage, which is checked too.
+    """
+    if len(data) == 0:
+        return
+    statistics = _load_usage_statistics(cursor, user_id)
+    ordinals, usage = _usage_batch(data)
+    if statistics is None:
+        statistics = UsageStatistics.empty()
+        (stored,) = cursor.execute(
+            "SELECT COUNT(*) FROM usage_data WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        # A new user's only usage is the batch, which needn't be read back.
+        if stored > np.count_nonzero(~np.isnan(usage)):
+            rows = cursor.execute(
+                "SELECT date, hour, value FROM usage_data WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+            values = np.array(rows, dtype=float).reshape(-1, 3)
+            ordinals, days = np.unique(
+                values[:, 0].astype(int), return_inverse=True
+            )
+            usage = np.full((len(ordinals), 24), np.nan)
+            usage[days, values[:, 1].astype(int)] = values[:, 2]
+    statistics = statistics.merged(UsageStatistics.from_usage(ordinals, usage))
+    _save_usage_statistics(cursor, user_id, statistics)
+    # Days checked again, as when statistics are started from stored usage,
+    # have their anomalies replaced, as whole days' have no hour to key on.
+    cursor.executemany(
+        "DELETE FROM anomalies WHERE user_id = ? AND date = ?",
+        ((user_id, int(ordinal)) for ordinal in ordinals),
+    )
+    cursor.executemany(
+        "INSERT INTO anomalies VALUES(?, ?, ?, ?, ?, ?)",
+        (
+            (user_id, *anomaly)
+            for anomaly in detect_anomalies(statistics, ordinals, usage)
+        ),
+    )
+
+
+def _forget_anomalies(
+    cursor: sqlite3.Cursor,
+    user_id: int,
+    data: list[tuple[date, list[float]]],
+) -> None:
+    """Undo _detect_anomalies() for days that are being deleted."""
+    statistics = _load_usage_statistics(cursor, user_id)
+    if statistics is not None:
+        statistics = statistics.removed(
+            UsageStatistics.from_usage(*_usage_batch(data))
+        )
+        _save_usage_statistics(cursor, user_id, statistics)
+    cursor.executemany(
+        "DELETE FROM anomalies WHERE user_id = ? AND date = ?",
+        ((user_id, data_date.toordinal()) for data_date, _ in data),
+    )
+
+
+def _bump_data_version(cursor: sqlite3.Cursor, user_id: int) -> None:
+    """Mark a user's data as changed, dropping their cached results."""
+    cursor.execute(
+        """INSERT INTO data_version VALUES(?, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1""",
+        (user_id,),
+    )
+    cursor.execute("DELETE FROM result_cache WHERE user_id = ?", (user_id,))
+
+
+class IngestWriter:
+    """Write batches of a user's usage on a thread with its own connection.
+
+    Batches are queued, and each is committed in its own transaction, so
+    other connections only wait for one batch at a time. The queue is
+    bounded, so a producer faster than the disk is slowed to its pace.
+    Errors writing are raised by the next put() or by close(), after which
+    batches are no longer written. Create with Data.ingest_writer().
+    """
+
+    _STOP = None
+    _queue: queue.Queue[list[tuple[date, list[float]]] | None]
+    _thread: threading.Thread
+    _db_filepath: str
+    _user_id: int
+    _rolled_up_until: date | None
+    _written: list[tuple[date, list[float]]]
+    _previous_version: int | None = None
+    _batches: int = 0
+    _error: BaseException | None = None
+    _closed: bool = False
+
+    def __init__(
+        self,
+        db_filepath: str,
+        user_id: int,
+        rolled_up_until: date | None,
+        max_batches: int,
+    ) -> None:
+        """Start the writer's thread. See Data.ingest_writer()."""
+        self._db_filepath = db_filepath
+        self._user_id = user_id
+        self._rolled_up_until = rolled_up_until
+        self._written = []
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._thread = threading.Thread(
+            target=self._run, name="ingest-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Write batches until stopped."""
+        connection = sqlite3.connect(self._db_filepath, timeout=30)
+        try:
+            while True:
+                batch = self._queue.get()
+                if batch is self._STOP:
+                    if self._error is None:
+                        self._index_written(connection)
+                    return
+                if self._error is not None:
+                    continue
+                try:
+                    self._write_batch(connection, batch)
+                except Exception as e:  # noqa: BLE001
+                    connection.rollback()
+                    self._error = e
+        finally:
+            connection.close()
+
+    def _write_batch(
+        self,
+        connection: sqlite3.Connection,
+        batch: list[tuple[date, list[float]]],
+    ) -> None:
+        """Write and commit a batch."""
+        with span("IngestWriter.write_batch"):
+            cursor = connection.cursor()
+            written = _write_usage(
+                cursor, self._user_id, batch, self._rolled_up_until
+            )
+            _detect_anomalies(cursor, self._user_id, written)
+            if self._previous_version is None:
+                self._previous_version = _get_data_version(
+                    cursor, self._user_id
+                )
+            _bump_data_version(cursor, self._user_id)
+            connection.commit()
+            self._written += written
+            self._batches += 1
+
+    def _index_written(self, connection: sqlite3.Connection) -> None:
+        """Add every written day to the user's usage index, if up to date.
+
+        Batches can be in any order, such as newest first, so the index is
+        only extended once they are all written, and only if no other
+        connection changed the user's data meanwhile.
+        """
+        if self._previous_version is None:
+            return
+        try:
+            # Locks the database first, so the version can't change.
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.cursor()
+            version = _get_data_version(cursor, self._user_id)
+            if version == self._previous_version + self._batches:
+                _extend_usage_index(
+                    cursor,
+                    self._user_id,
+                    self._previous_version,
+                    self._written,
+                )
+            connection.commit()
+        except sqlite3.Error:
+            # The index is rebuilt when next read instead.
+            connection.rollback()
+
+    def _check_open(self) -> None:
+        """Raise the error writing a batch, if any, or if closed."""
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            msg = "IngestWriter: put after close"
+            raise ValueError(msg)
+
+    def put(self, batch: list[tuple[date, list[float]]]) -> None:
+        """Queue a batch of days, waiting while the queue is full.
+
+        Raises:
+            The error writing an earlier batch, if any.
+            ValueError if the writer is closed.
+        """
+        self._check_open()
+        if len(batch) > 0:
+            self._queue.put(batch)
+
+    def put_nowait(self, batch: list[tuple[date, list[float]]]) -> None:
+        """Queue a batch like put(), raising queue.Full if the queue is full."""
+        self._check_open()
+        if len(batch) > 0:
+            self._queue.put_nowait(batch)
+
+    async def put_async(self, batch: list[tuple[date, list[float]]]) -> None:
+        """Queue a batch like put(), waiting in a thread if the queue is full.
+
+        The event loop keeps running while the writer catches up.
+        """
+        try:
+            self.put_nowait(batch)
+        except queue.Full:
+            await asyncio.to_thread(self.put, batch)
+
+    def _stop(self) -> None:
+        """Stop the thread once it has written every queued batch."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def close(self) -> None:
+        """Wait for every queued batch to be written, and stop the thread.
+
+        Raises:
+            The error writing a batch, if any.
+        """
+        self._stop()
+        if self._error is not None:
+            raise self._error
+
+    def abort(self) -> None:
+        """Stop the thread, and delete every batch the writer wrote.
+
+        Queued batches are written before being deleted, so this waits for
+        them. Use when a download fails partway, so it can be retried from
+        the same date.
+        """
+        self._stop()
+        if len(self._written) == 0:
+            return
+        connection = sqlite3.connect(self._db_filepath, timeout=30)
+        try:
+            cursor = connection.cursor()
+            cursor.executemany(
+                "DELETE FROM usage_data WHERE user_id = ? AND date = ?",
+                (
+                    (self._user_id, data_date.toordinal())
+                    for data_date, _ in self._written
+                ),
+            )
+            _forget_anomalies(cursor, self._user_id, self._written)
+            _bump_data_version(cursor, self._user_id)
+            connection.commit()
+        finally:
+            connection.close()
+        self._written = []
 
 
 class Data:
@@ -17,17 +491,47 @@ class Data:
 
     _username: str | None = None
     _user_id: int | None = None
+    _db_filepath: str
+    _lock: threading.RLock
+    _query_log: QueryLog | None = None
+    _usage_indexes: ResultCache
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        db_filepath: str | None = None,
+        *,
+        slow_query_ms: float | None = None,
+        initialize: bool = True,
+    ) -> None:
         """Initialize the Data object without a user.
 
         To properly initialize with a user, call initialize_user().
+        Data is safe to share between threads, calls are serialized.
+
+        Args:
+            db_filepath:
+                Defaults to the user's data directory.
+            slow_query_ms: If given, log every statement and its duration
+                to the power_comparison.query_log logger at debug level, and
+                log statements taking at least this long, with their query
+                plans, as warnings.
+            initialize: Defaults to True. Whether to create and migrate the
+                database's tables. Pass False when another connection has
+                already, so many processes opening the database at once
+                don't all run the migrations.
         """
-        db_filepath = DVU.get_db_file_path()
+        if db_filepath is None:
+            db_filepath = DVU.get_db_file_path()
         DVU.create_dirs(db_filepath)
-        self.connection = sqlite3.connect(db_filepath)
+        self._db_filepath = db_filepath
+        self._lock = threading.RLock()
+        self._usage_indexes = ResultCache(64, 64 * 1024 * 1024)
+        self.connection = sqlite3.connect(db_filepath, check_same_thread=False)
         self.cursor = self.connection.cursor()
-        self.initialize_database()
+        if slow_query_ms is not None:
+            self._query_log = QueryLog(self.connection, slow_query_ms)
+        if initialize:
+            self.initialize_database()
 
     @classmethod
     def from_username(cls, username: str) -> Self:
@@ -36,6 +540,7 @@ class Data:
         self.initialize_user(username)
         return self
 
+    @_synchronized
     def initialize_user(self, username: str) -> None:
         """Ensure the user `username` is initialized."""
         self._username = username
@@ -59,37 +564,186 @@ class Data:
         self._user_id = result.fetchone()[0]
         self.connection.commit()
 
+    @_synchronized
+    def select_user(self, username: str) -> bool:
+        """Select an existing user, returning False if they don't exist.
+
+        Unlike initialize_user(), this never creates the user.
+        """
+        result = self.cursor.execute(
+            "SELECT user_id FROM user_data WHERE username_email=?",
+            (username,),
+        )
+        row = result.fetchone()
+        if row is None:
+            return False
+        self._username = username
+        self._user_id = row[0]
+        return True
+
+    def get_username(self) -> str | None:
+        """Return the current user's username, or None."""
+        return self._username
+
+    @_synchronized
     def initialize_database(self) -> None:
-        """Ensure database is initialized and table and user exist."""
+        """Ensure database is initialized and tables exist."""
         try:
             result = self.cursor.execute(
                 "SELECT name FROM sqlite_master WHERE name='usage_data'"
             )
-            if result.fetchone() is not None:
-                return
+            if result.fetchone() is None:
+                # Only takes effect before the first table is created, so
+                # compact() can return free pages to the filesystem.
+                self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self.cursor.execute(
+                    """CREATE TABLE
+                    user_data(
+                    user_id INTEGER PRIMARY KEY,
+                    username_email TEXT
+                    )"""
+                )
+                self.cursor.execute(
+                    """CREATE TABLE
+                    usage_data(
+                        user_id INTEGER NOT NULL,
+                        date INTEGER NOT NULL, -- Gregorian Ordinal day
+                        day INTEGER NOT NULL, -- 0 index day of week
+                        hour INTEGER NOT NULL, -- 0 index hour of day
+                        value REAL NOT NULL,
+                        PRIMARY KEY (user_id, date, hour),
+                        FOREIGN KEY (user_id)
+                            REFERENCES user_data (user_id)
+                    )"""
+                )
+            # Users are looked up by username on every request, which
+            # otherwise scans user_data.
+            self.cursor.execute(
+                """CREATE INDEX IF NOT EXISTS
+                user_data_username ON user_data (username_email)"""
+            )
             self.cursor.execute(
-                """CREATE TABLE
-                user_data(
-                user_id INTEGER PRIMARY KEY,
-                username_email TEXT
+                """CREATE TABLE IF NOT EXISTS
+                sync_status(
+                    user_id INTEGER PRIMARY KEY,
+                    last_sync REAL NOT NULL, -- POSIX timestamp
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
                 )"""
             )
             self.cursor.execute(
-                """CREATE TABLE
-                usage_data(
+                """CREATE TABLE IF NOT EXISTS
+                data_version(
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL, -- Bumped on every ingest
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
+                )"""
+            )
+            self.cursor.execute(
+                """CREATE TABLE IF NOT EXISTS
+                result_cache(
                     user_id INTEGER NOT NULL,
-                    date INTEGER NOT NULL, -- Gregorian Ordinal day
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL, -- JSON
+                    PRIMARY KEY (user_id, key),
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
+                )"""
+            )
+            self.cursor.execute(
+                """CREATE TABLE IF NOT EXISTS
+                plan_rankings(
+                    user_id INTEGER NOT NULL,
+                    profile_set TEXT NOT NULL,
+                    start_date INTEGER NOT NULL, -- Gregorian Ordinal day
+                    end_date INTEGER NOT NULL, -- Gregorian Ordinal day
+                    best_plan TEXT NOT NULL,
+                    cost REAL NOT NULL, -- Yearly, in dollars
+                    savings REAL NOT NULL, -- Yearly, against the median plan
+                    ranked_at REAL NOT NULL, -- POSIX timestamp
+                    PRIMARY KEY (user_id, profile_set),
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
+                )"""
+            )
+            self.cursor.execute(
+                """CREATE TABLE IF NOT EXISTS
+                usage_rollups(
+                    user_id INTEGER NOT NULL,
+                    date INTEGER NOT NULL, -- Gregorian Ordinal month start
                     day INTEGER NOT NULL, -- 0 index day of week
                     hour INTEGER NOT NULL, -- 0 index hour of day
-                    value REAL NOT NULL,
-                    PRIMARY KEY (user_id, date, hour),
+                    total REAL NOT NULL, -- Sum of the month's values
+                    count INTEGER NOT NULL, -- Number of values summed
+                    PRIMARY KEY (user_id, date, day, hour),
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
+                )"""
+            )
+            self.cursor.execute(
+                """CREATE TABLE IF NOT EXISTS
+                usage_index(
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL, -- The data_version indexed
+                    first_date INTEGER NOT NULL, -- Gregorian Ordinal day
+                    totals BLOB NOT NULL, -- See UsageIndex.to_bytes()
+                    counts BLOB NOT NULL,
                     FOREIGN KEY (user_id)
                         REFERENCES user_data (user_id)
                 )"""
             )
+            self.cursor.execute(
+                """CREATE TABLE IF NOT EXISTS
+                usage_statistics(
+                    user_id INTEGER PRIMARY KEY,
+                    count BLOB NOT NULL, -- See UsageStatistics.to_bytes()
+                    mean BLOB NOT NULL,
+                    m2 BLOB NOT NULL,
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
+                )"""
+            )
+            # Anomalies were once keyed by day and kind, keeping only one
+            # hour of each, so are moved to a table keyed by hour too.
+            migrate_anomalies = any(
+                name == "hour" and pk == 0
+                for _, name, _, _, _, pk in self.cursor.execute(
+                    "PRAGMA table_info(anomalies)"
+                )
+            )
+            if migrate_anomalies:
+                self.cursor.execute(
+                    "ALTER TABLE anomalies RENAME TO anomalies_by_day"
+                )
+            self.cursor.execute(
+                """CREATE TABLE IF NOT EXISTS
+                anomalies(
+                    user_id INTEGER NOT NULL,
+                    date INTEGER NOT NULL, -- Gregorian Ordinal day
+                    kind TEXT NOT NULL, -- See the anomalies module
+                    hour INTEGER, -- 0 index hour of day, NULL for whole days
+                    value REAL NOT NULL, -- The value at hour, or every hour
+                    score REAL, -- Standard deviations above mean, for spikes
+                    PRIMARY KEY (user_id, date, kind, hour),
+                    FOREIGN KEY (user_id)
+                        REFERENCES user_data (user_id)
+                )"""
+            )
+            if migrate_anomalies:
+                self.cursor.execute(
+                    "INSERT INTO anomalies SELECT * FROM anomalies_by_day"
+                )
+                self.cursor.execute("DROP TABLE anomalies_by_day")
+            # For checking whether any user's rollups are in a window.
+            self.cursor.execute(
+                """CREATE INDEX IF NOT EXISTS
+                usage_rollups_date ON usage_rollups (date)"""
+            )
         finally:
             self.connection.commit()
 
+    @_synchronized
     def get_last_date(self) -> date | None:
         """Return usage data date, or None."""
         if self._user_id is None:
@@ -100,7 +754,7 @@ class Data:
             FROM usage_data
             WHERE user_id = ?
             ORDER BY date DESC
-            """,
+            LIMIT 1""",
             (self._user_id,),
         )
         row = result.fetchone()
@@ -108,28 +762,361 @@ class Data:
             return None
         return date.fromordinal(row[0])
 
+    @_synchronized
+    def get_first_date(self) -> date | None:
+        """Return the first usage data date, or None."""
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        result = self.cursor.execute(
+            """SELECT date
+            FROM usage_data
+            WHERE user_id = ?
+            ORDER BY date ASC
+            LIMIT 1""",
+            (self._user_id,),
+        )
+        row = result.fetchone()
+        if row is None:
+            return None
+        return date.fromordinal(row[0])
+
+    @_synchronized
+    def get_usernames(self) -> list[str]:
+        """Return the usernames of every user in the database."""
+        result = self.cursor.execute(
+            "SELECT username_email FROM user_data ORDER BY user_id ASC"
+        )
+        return [row[0] for row in result.fetchall()]
+
+    @_synchronized
+    def get_last_sync(self) -> datetime | None:
+        """Return when the user's data was last synced, or None."""
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        result = self.cursor.execute(
+            "SELECT last_sync FROM sync_status WHERE user_id = ?",
+            (self._user_id,),
+        )
+        row = result.fetchone()
+        if row is None:
+            return None
+        return datetime.fromtimestamp(row[0])
+
+    @_synchronized
+    def set_last_sync(self, when: datetime | None = None) -> None:
+        """Record that the user's data was synced at `when`.
+
+        Args:
+            when:
+                Defaults to now.
+        """
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        when = datetime.now() if when is None else when
+        self.cursor.execute(
+            """INSERT OR REPLACE INTO sync_status VALUES(?, ?)""",
+            (self._user_id, when.timestamp()),
+        )
+        self.connection.commit()
+
+    @_synchronized
+    def get_dates(self) -> list[date]:
+        """Return every date the user has usage data for, in order."""
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        result = self.cursor.execute(
+            """SELECT DISTINCT date
+            FROM usage_data
+            WHERE user_id = ?
+            ORDER BY date ASC""",
+            (self._user_id,),
+        )
+        return [date.fromordinal(row[0]) for row in result.fetchall()]
+
+    @_synchronized
     def ingest_data(self, data: list[tuple[date, list[float]]]) -> None:
-        """Ingest data."""
+        """Ingest data, recording any anomalies in it."""
         if self._user_id is None:
             msg = "Data: _user_id not set"
             raise ValueError(msg)
-        for data_date, values in data:
-            data_date_ord = data_date.toordinal()
-            day = data_date.weekday()
-            self.cursor.executemany(
-                """INSERT INTO usage_data VALUES(?, ?, ?, ?, ?)""",
-                (
-                    (self._user_id, data_date_ord, day, hour, value)
-                    for hour, value in enumerate(values)
-                ),
-            )
+        written = _write_usage(
+            self.cursor, self._user_id, data, self._get_rolled_up_until()
+        )
+        _detect_anomalies(self.cursor, self._user_id, written)
+        previous_version = _get_data_version(self.cursor, self._user_id)
+        self._bump_data_version(self._user_id)
+        index = _extend_usage_index(
+            self.cursor, self._user_id, previous_version, written
+        )
         self.connection.commit()
+        if index is not None:
+            self._cache_usage_index(self._user_id, index)
+
+    def ingest_writer(self, max_batches: int = 4) -> IngestWriter:
+        """Return a writer that ingests the current user's data in batches.
+
+        The writer commits batches on its own thread and connection, so
+        callers can keep downloading while earlier batches are written.
+
+        Args:
+            max_batches: How many batches can wait to be written before
+                IngestWriter.put() blocks.
+        """
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        return IngestWriter(
+            self._db_filepath,
+            self._user_id,
+            self._get_rolled_up_until(),
+            max_batches,
+        )
+
+    def _bump_data_version(self, user_id: int) -> None:
+        """Mark a user's data as changed, dropping their cached results."""
+        _bump_data_version(self.cursor, user_id)
+
+    @_synchronized
+    def get_data_version(self) -> int:
+        """Return a number that changes whenever the user's data changes."""
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        return _get_data_version(self.cursor, self._user_id)
+
+    @_synchronized
+    def get_cached_result(self, key: str) -> str | None:
+        """Return the user's cached result for key, or None."""
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        result = self.cursor.execute(
+            "SELECT value FROM result_cache WHERE user_id = ? AND key = ?",
+            (self._user_id, key),
+        )
+        row = result.fetchone()
+        return None if row is None else row[0]
+
+    @_synchronized
+    def set_cached_result(self, key: str, value: str) -> None:
+        """Cache a result for the user.
+
+        Cached results are deleted whenever the user's data changes, and
+        the oldest once the user has more than _MAX_CACHED_RESULTS.
+        """
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO result_cache VALUES(?, ?, ?)",
+            (self._user_id, key, value),
+        )
+        # Replacing a row gives it a new rowid, so rowids order rows by
+        # when they were cached.
+        self.cursor.execute(
+            """DELETE FROM result_cache
+            WHERE user_id = :user_id
+            AND rowid <= (
+                SELECT rowid
+                FROM result_cache
+                WHERE user_id = :user_id
+                ORDER BY rowid DESC
+                LIMIT 1 OFFSET :limit
+            )""",
+            {"user_id": self._user_id, "limit": _MAX_CACHED_RESULTS},
+        )
+        self.connection.commit()
+
+    def _has_rollups(self, parameters: dict[str, int]) -> bool:
+        """Return whether any rollups are in a window.
+
+        Args:
+            parameters: The window's "start" and "end", and optionally a
+                "user_id" to only check their rollups.
+        """
+        user_clause = (
+            "user_id = :user_id AND" if "user_id" in parameters else ""
+        )
+        row = self.cursor.execute(
+            f"""SELECT EXISTS (
+                SELECT 1
+                FROM usage_rollups
+                WHERE {user_clause} date > :start
+                AND date < :end
+            )""",
+            parameters,
+        ).fetchone()
+        return bool(row[0])
+
+    def _usage_source(self, parameters: dict[str, int]) -> str:
+        """Return a query for usage totals and counts in a window.
+
+        Rollups are only read if some are in the window, as reading them
+        through a union costs a fifth more than reading hourly usage alone.
+
+        Args:
+            parameters: See _has_rollups().
+        """
+        if self._has_rollups(parameters):
+            return _HOURLY_AND_ROLLED_UP_USAGE
+        return _HOURLY_USAGE
+
+    def _cache_usage_index(self, user_id: int, index: UsageIndex) -> None:
+        """Keep a user's usage index in memory."""
+        self._usage_indexes.put(
+            user_id, index, index.totals.nbytes + index.counts.nbytes
+        )
+
+    @_synchronized
+    def _get_usage_index(self, user_id: int) -> UsageIndex | None:
+        """Return a user's usage index, rebuilding it if stale.
+
+        The index is kept in memory, and saved unless the database is
+        locked. It is rebuilt from one read of the user's hourly usage
+        whenever their data version changes other than by ingest_data() or
+        an IngestWriter adding later days. It only indexes hourly usage,
+        not rollups.
+
+        Returns:
+            None if the user has no hourly usage, else their index.
+        """
+        version = _get_data_version(self.cursor, user_id)
+        index = self._usage_indexes.get(user_id)
+        if index is None or index.version != version:
+            index = _load_usage_index(self.cursor, user_id)
+        if index is None or index.version != version:
+            first, last = self.cursor.execute(
+                """SELECT MIN(date), MAX(date)
+                FROM usage_data
+                WHERE user_id = ?""",
+                (user_id,),
+            ).fetchone()
+            if first is None:
+                return None
+            first_date = date.fromordinal(first)
+            usage_matrix = self._get_usage_matrix(
+                user_id, first_date, date.fromordinal(last)
+            )
+            index = UsageIndex.from_usage_matrix(
+                first_date, version, usage_matrix
+            )
+            # Reads mustn't fail or wait because another connection, such as
+            # an IngestWriter or the sync daemon, holds the write lock, so
+            # the index is then only kept in memory.
+            (timeout,) = self.cursor.execute("PRAGMA busy_timeout").fetchone()
+            self.cursor.execute("PRAGMA busy_timeout = 0")
+            try:
+                _save_usage_index(self.cursor, user_id, index)
+                self.connection.commit()
+            except sqlite3.OperationalError:
+                self.connection.rollback()
+            finally:
+                self.cursor.execute(f"PRAGMA busy_timeout = {int(timeout)}")
+        self._cache_usage_index(user_id, index)
+        return index
+
+    @_synchronized
+    def _get_usage_sums(
+        self,
+        user_id: int,
+        start_date: date,
+        end_date: date,
+        exclude_anomalies: bool = False,
+    ) -> tuple[npt.NDArray, npt.NDArray]:
+        """Return a user's usage totals and counts between dates.
+
+        Windows without rollups are read from the user's usage index, in
+        the same time however long they are. Rollups aren't indexed, so
+        windows with them are summed by a grouped query.
 
+        Args:
+            user_id: The user to sum usage of.
+            start_date: The day before the first day to include.
+            end_date: The day after the last day to include.
+            exclude_anomalies: Whether to subtract the hourly usage of days
+                with anomalies, see get_anomalies(). Rolled up days are
+                already summed, so are kept.
+
+        Returns:
+            Totals and counts of shape (7, 24).
+        """
+        parameters = {
+            "user_id": user_id,
+            "start": start_date.toordinal(),
+            "end": end_date.toordinal(),
+        }
+        if not self._has_rollups(parameters):
+            index = self._get_usage_index(user_id)
+            if index is None:
+                return np.zeros((7, 24)), np.zeros((7, 24))
+            totals, counts = (
+                sums[0] for sums in index.window_sums([(start_date, end_date)])
+            )
+        else:
+            totals, counts = self._query_usage_sums(
+                _HOURLY_AND_ROLLED_UP_USAGE, parameters
+            )
+        if exclude_anomalies:
+            anomalous_totals, anomalous_counts = self._query_usage_sums(
+                f"""SELECT user_id, day, hour, value AS total, 1 AS count
+                FROM usage_data
+                WHERE user_id = :user_id
+                AND date IN (
+                    SELECT date
+                    FROM anomalies
+                    WHERE user_id = :user_id
+                    AND date > :start
+                    AND date < :end
+                )""",
+                parameters,
+            )
+            totals = totals - anomalous_totals
+            counts = counts - anomalous_counts
+        return totals, counts
+
+    def _query_usage_sums(
+        self, source: str, parameters: dict[str, int]
+    ) -> tuple[npt.NDArray, npt.NDArray]:
+        """Return a user's usage totals and counts from a usage query.
+
+        Args:
+            source: A query for user_id, day, hour, total and count, like
+                _HOURLY_USAGE.
+            parameters: The query's parameters, with the "user_id".
+
+        Returns:
+            Totals and counts of shape (7, 24).
+        """
+        result = self.cursor.execute(
+            f"""SELECT day * 24 + hour, SUM(total), SUM(count)
+            FROM ({source})
+            WHERE user_id = :user_id
+            GROUP BY day, hour""",
+            parameters,
+        )
+        sums = np.zeros((2, 7 * 24))
+        for slot, total, count in result.fetchall():
+            sums[:, slot] = total, count
+        totals, counts = sums.reshape(2, 7, 24)
+        return totals, counts
+
+    @_synchronized
     def get_average_usage(
-        self, start_date: date | None = None, end_date: date | None = None
+        self,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        *,
+        exclude_anomalies: bool = False,
     ) -> list[list[float]] | None:
         """Get average of usage data for every hour of every weekday.
 
+        See _get_usage_sums() for how usage is read, and for
+        exclude_anomalies, which defaults to False.
+
         Returns:
             None if there is no or not enough data for the user, else returns
             a list (size seven, ordered by day) of lists
@@ -151,23 +1138,322 @@ class Data:
             end_date = date.today()
         if start_date is None:
             start_date = end_date - timedelta(days=365)
+        totals, counts = self._get_usage_sums(
+            self._user_id, start_date, end_date, exclude_anomalies
+        )
+        if (counts == 0).any():
+            return None
+        return (totals / counts).tolist()
+
+    @_synchronized
+    def get_window_average_usage(
+        self, windows: list[tuple[date, date]]
+    ) -> npt.NDArray | None:
+        """Get average usage for every hour of every weekday in windows.
+
+        Each window is read from the usage index, like get_average_usage(),
+        but rollups are left out.
+
+        Args:
+            windows: Pairs of dates, excluded, like get_average_usage().
+
+        Returns:
+            None if the user has no hourly usage in any window, else an
+            array of shape (windows, 7, 24), NaN for hours of weekdays
+            without usage in a window.
+
+        Raises:
+            ValueError if initialize_user hasn't been called.
+        """
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        index = self._get_usage_index(self._user_id)
+        if index is None:
+            return None
+        totals, counts = index.window_sums(windows)
+        if not counts.any():
+            return None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts
+
+    @_synchronized
+    def get_all_average_usage(
+        self, start_date: date | None = None, end_date: date | None = None
+    ) -> tuple[list[str], npt.NDArray]:
+        """Get every user's average usage for every hour of every weekday.
+
+        Reads all users in one grouped scan, unlike get_average_usage(),
+        which needs a user to be selected.
+
+        Returns:
+            A list of usernames and an array of shape (users, 7, 24) of
+            their average usage. Users without data for every hour of every
+            weekday are left out.
+
+        Args:
+            start_date:
+                Defaults to one year ago. The first date to include.
+            end_date:
+                Defaults to today. The last date to include.
+        """
+        if end_date is None:
+            end_date = date.today()
+        if start_date is None:
+            start_date = end_date - timedelta(days=365)
+        parameters = {
+            "start": start_date.toordinal(),
+            "end": end_date.toordinal(),
+        }
+        result = self.cursor.execute(
+            f"""SELECT user_id, SUM(total) / SUM(count)
+            FROM ({self._usage_source(parameters)})
+            GROUP BY user_id, day, hour
+            ORDER BY user_id ASC, day ASC, hour ASC""",
+            parameters,
+        )
+        rows = np.array(result.fetchall(), dtype=float).reshape(-1, 2)
+        user_ids = rows[:, 0].astype(int)
+        unique_ids, counts = np.unique(user_ids, return_counts=True)
+        complete = np.isin(user_ids, unique_ids[counts == 7 * 24])
+        usernames = dict(
+            self.cursor.execute(
+                "SELECT user_id, username_email FROM user_data"
+            ).fetchall()
+        )
+        return (
+            [usernames[user_id] for user_id in unique_ids[counts == 7 * 24]],
+            rows[complete, 1].reshape(-1, 7, 24),
+        )
+
+    @_synchronized
+    def get_data_versions(self) -> dict[str, int]:
+        """Return every user's data version, by username.
+
+        See get_data_version().
+        """
         result = self.cursor.execute(
-            """SELECT AVG(value), day, hour
+            """SELECT username_email, COALESCE(version, 0)
+            FROM user_data
+            LEFT JOIN data_version USING (user_id)
+            ORDER BY user_id ASC"""
+        )
+        return dict(result.fetchall())
+
+    @_synchronized
+    def get_users_average_usage(
+        self, usernames: list[str], start_date: date, end_date: date
+    ) -> npt.NDArray:
+        """Get some users' average usage for every hour of every weekday.
+
+        The users are summed together by grouped scans of their usage
+        between the dates, including rollups, of up to
+        _MAX_QUERY_USERS users each, without selecting them.
+
+        Returns:
+            An array of shape (users, 7, 24), NaN for hours of weekdays
+            without usage, and for users that don't exist.
+        """
+        user_ids = dict(
+            self.cursor.execute(
+                "SELECT username_email, user_id FROM user_data"
+            ).fetchall()
+        )
+        ids = np.array(
+            [user_ids.get(username, -1) for username in usernames], dtype=int
+        )
+        order = np.argsort(ids)
+        parameters = {
+            "start": start_date.toordinal(),
+            "end": end_date.toordinal(),
+        }
+        source = self._usage_source(parameters)
+        sums = np.zeros((2, len(usernames), 7 * 24))
+        existing = ids[ids >= 0].tolist()
+        for first in range(0, len(existing), _MAX_QUERY_USERS):
+            batch = existing[first : first + _MAX_QUERY_USERS]
+            users = {f"user{i}": user_id for i, user_id in enumerate(batch)}
+            placeholders = ", ".join(f":{name}" for name in users)
+            result = self.cursor.execute(
+                f"""SELECT user_id, day * 24 + hour, SUM(total), SUM(count)
+                FROM ({source})
+                WHERE user_id IN ({placeholders})
+                GROUP BY user_id, day, hour""",
+                {**parameters, **users},
+            )
+            rows = np.array(result.fetchall(), dtype=float).reshape(-1, 4)
+            positions = order[
+                np.searchsorted(ids[order], rows[:, 0].astype(int))
+            ]
+            sums[:, positions, rows[:, 1].astype(int)] = rows[:, 2:].T
+        totals, counts = sums.reshape(2, len(usernames), 7, 24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts
+
+    @_synchronized
+    def set_plan_rankings(
+        self,
+        profile_set: str,
+        start_date: date,
+        end_date: date,
+        rankings: list[tuple[str, str, float, float]],
+    ) -> None:
+        """Store users' best plans, replacing their previous ones.
+
+        Args:
+            profile_set: The profile set the plans were ranked from.
+            start_date: The first date of usage the ranking used.
+            end_date: The last date of usage the ranking used.
+            rankings: Tuples of username, best plan, its yearly cost, and
+                its yearly savings, all monetary values in dollars.
+        """
+        user_ids = dict(
+            self.cursor.execute(
+                "SELECT username_email, user_id FROM user_data"
+            ).fetchall()
+        )
+        ranked_at = datetime.now().timestamp()
+        self.cursor.executemany(
+            """INSERT OR REPLACE INTO plan_rankings
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                (
+                    user_ids[username],
+                    profile_set,
+                    start_date.toordinal(),
+                    end_date.toordinal(),
+                    plan,
+                    cost,
+                    savings,
+                    ranked_at,
+                )
+                for username, plan, cost, savings in rankings
+            ),
+        )
+        self.connection.commit()
+
+    @_synchronized
+    def get_usage_matrix(
+        self, start_date: date, end_date: date
+    ) -> npt.NDArray | None:
+        """Get every hourly usage value between two dates.
+
+        Unlike the averaging methods, both dates are included.
+
+        Returns:
+            None if there is no data for the user in the range, else an array
+            of shape (days, 24), with a row for every day from start_date to
+            end_date. Hours without data are NaN.
+
+        Raises:
+            ValueError if initialize_user hasn't been called.
+        """
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        return self._get_usage_matrix(self._user_id, start_date, end_date)
+
+    @_synchronized
+    def _get_usage_matrix(
+        self, user_id: int, start_date: date, end_date: date
+    ) -> npt.NDArray | None:
+        """Return a user's get_usage_matrix()."""
+        # Hours are fetched as an index into the matrix, as fetching fewer
+        # columns is faster.
+        result = self.cursor.execute(
+            """SELECT (date - :start) * 24 + hour, value
             FROM usage_data
+            WHERE user_id = :user_id
+            AND date >= :start
+            AND date <= :end""",
+            {
+                "user_id": user_id,
+                "start": start_date.toordinal(),
+                "end": end_date.toordinal(),
+            },
+        )
+        rows = result.fetchall()
+        if len(rows) == 0:
+            return None
+        data = np.fromiter(
+            itertools.chain.from_iterable(rows),
+            dtype=float,
+            count=2 * len(rows),
+        ).reshape(len(rows), 2)
+        matrix = np.full(
+            ((end_date - start_date).days + 1) * 24, np.nan, dtype=float
+        )
+        matrix[data[:, 0].astype(int)] = data[:, 1]
+        return matrix.reshape(-1, 24)
+
+    def get_hourly_usage(
+        self,
+        start_date: date,
+        end_date: date,
+        *,
+        exclude_anomalies: bool = False,
+    ) -> tuple[date, npt.NDArray] | None:
+        """Get hourly usage between the dates the averaging methods use.
+
+        Args:
+            start_date: The day before the first day to include.
+            end_date: The day after the last day to include.
+            exclude_anomalies: Defaults to False. Whether to leave out days
+                with anomalies, as if their usage were unknown.
+
+        Returns:
+            None if there is no hourly data for the user in the range, else
+            the first date, the day after start_date, and the
+            get_usage_matrix() of the days up to the day before end_date.
+        """
+        first_date = start_date + timedelta(days=1)
+        last_date = end_date - timedelta(days=1)
+        if last_date < first_date:
+            return None
+        matrix = self.get_usage_matrix(first_date, last_date)
+        if matrix is None:
+            return None
+        if exclude_anomalies:
+            for anomaly_date, *_ in self.get_anomalies(start_date, end_date):
+                matrix[(anomaly_date - first_date).days] = np.nan
+        return first_date, matrix
+
+    @_synchronized
+    def get_anomalies(
+        self, start_date: date, end_date: date
+    ) -> list[tuple[date, str, int | None, float, float | None]]:
+        """Get the anomalies found in the user's usage as it was ingested.
+
+        Args:
+            start_date: The day before the first day to include.
+            end_date: The day after the last day to include.
+
+        Returns:
+            Tuples of the day, the kind of anomaly, the hour it is at or
+            None for the whole day, the usage there, and for spikes, how
+            many standard deviations above the mean it is, ordered by day,
+            kind and hour. See the anomalies module.
+
+        Raises:
+            ValueError if initialize_user hasn't been called.
+        """
+        if self._user_id is None:
+            msg = "Data: _user_id not set"
+            raise ValueError(msg)
+        result = self.cursor.execute(
+            """SELECT date, kind, hour, value, score
+            FROM anomalies
             WHERE user_id = ?
             AND date > ?
             AND date < ?
-            GROUP BY day, hour
-            ORDER BY day ASC, hour ASC""",
+            ORDER BY date ASC, kind ASC, hour ASC""",
             (self._user_id, start_date.toordinal(), end_date.toordinal()),
         )
-        data = result.fetchall()
-        if len(data) != 7 * 24:
-            return None
         return [
-            [row[0] for row in data[i * 24 : (i + 1) * 24]] for i in range(7)
+            (date.fromordinal(row[0]), *row[1:]) for row in result.fetchall()
         ]
 
+    @_synchronized
     def get_usage_per_hour(
         self, start_date: date | None = None, end_date: date | None = None
     ) -> list[float] | None:
@@ -188,41 +1474,249 @@ class Data:
             end_date = date.today()
         if start_date is None:
             start_date = end_date - timedelta(days=365)
-        result = self.cursor.execute(
-            """SELECT AVG(value), hour
+        totals, counts = (
+            sums.sum(axis=0)
+            for sums in self._get_usage_sums(
+                self._user_id, start_date, end_date
+            )
+        )
+        known = counts > 0
+        if not known.any():
+            return None
+        return (totals[known] / counts[known]).tolist()
+
+    @_synchronized
+    def _get_rolled_up_until(self) -> date | None:
+        """Return the day after the current user's rollups end, or None."""
+        row = self.cursor.execute(
+            "SELECT MAX(date) FROM usage_rollups WHERE user_id = ?",
+            (self._user_id,),
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return (date.fromordinal(row[0]) + timedelta(days=31)).replace(day=1)
+
+    def rollup_usage(self, before: date) -> int:
+        """Collapse every user's hourly usage before a month into rollups.
+
+        Usage is summed per user, month, weekday and hour, which is still
+        valid input for get_average_usage() and get_usage_per_hour(), with
+        rolled up months counting as their first day. Hourly views, like
+        get_usage_matrix(), only see usage that hasn't been rolled up. Each
+        user is rolled up in its own transaction, so other calls wait for
+        one user at most.
+
+        Args:
+            before: Usage before the start of this date's month is rolled
+                up, so months are never split.
+
+        Returns:
+            The number of hourly rows rolled up.
+        """
+        cutoff = before.replace(day=1).toordinal()
+        with self._lock:
+            user_ids = [
+                row[0]
+                for row in self.cursor.execute(
+                    "SELECT user_id FROM user_data"
+                ).fetchall()
+            ]
+        return sum(self._rollup_user(user_id, cutoff) for user_id in user_ids)
+
+    @_synchronized
+    def _rollup_user(self, user_id: int, cutoff: int) -> int:
+        """Roll up a user's usage before an ordinal date."""
+        self.cursor.execute(
+            f"""INSERT INTO usage_rollups
+            SELECT user_id, {_MONTH_START} AS month, day, hour,
+                SUM(value), COUNT(*)
             FROM usage_data
             WHERE user_id = ?
-            AND date > ?
             AND date < ?
-            GROUP BY hour
-            ORDER BY hour ASC""",
-            (self._user_id, start_date.toordinal(), end_date.toordinal()),
+            GROUP BY month, day, hour
+            ON CONFLICT (user_id, date, day, hour) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + excluded.count""",
+            (user_id, cutoff),
         )
-        data = result.fetchall()
-        if len(data) == 0:
-            return None
-        return [row[0] for row in data]
+        rows = self.cursor.execute(
+            "DELETE FROM usage_data WHERE user_id = ? AND date < ?",
+            (user_id, cutoff),
+        ).rowcount
+        if rows > 0:
+            self._bump_data_version(user_id)
+        self.connection.commit()
+        return rows
+
+    @_synchronized
+    def compact(self, pages: int = 4096, *, convert: bool = True) -> None:
+        """Return free pages to the filesystem, and refresh statistics.
+
+        Databases created before incremental auto vacuum was enabled are
+        converted by one full VACUUM, which rewrites the whole file.
+
+        Args:
+            pages: The most free pages to return at once.
+            convert: Defaults to True. Whether to convert a database without
+                incremental auto vacuum. If not, its free pages are kept,
+                and only statistics are refreshed.
+        """
+        self.connection.commit()
+        auto_vacuum = self.cursor.execute("PRAGMA auto_vacuum").fetchone()
+        if convert and auto_vacuum[0] != 2:  # INCREMENTAL
+            self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.cursor.execute("VACUUM")
+        # Frees a page per step, so has to be stepped to completion.
+        self.cursor.execute(
+            f"PRAGMA incremental_vacuum({int(pages)})"
+        ).fetchall()
+        # Sample each index rather than reading it all.
+        self.cursor.execute("PRAGMA analysis_limit = 1000")
+        self.cursor.execute("ANALYZE")
+        self.connection.commit()
 
+    @_synchronized
     def close(self) -> None:
         """Close Data."""
         self.connection.commit()
+        if self._query_log is not None:
+            self._query_log.finish()
+            self._query_log = None
         self.connection.close()
 
 
 class Profiles:
     """Hold profile data and tools."""
 
-    def __init__(self) -> None:
-        """Initialize a Profiles."""
+    _profiles_dir: str
+    _catalog: PlanCatalog | None = None
+    _selection: PlanSelection
+    _tensors: dict[str, tuple[str, ProfileTensor]]
+    _bounds: dict[str, tuple[ProfileTensor, PlanBounds]]
+    # Each profile set directory's modification time, with its files'
+    # fingerprint and whether it has spot price plans.
+    _listings: dict[Path, tuple[int, tuple[str, bool]]]
+    # The profile set names, with the profiles directory's modification
+    # time, or the catalog's version, when they were read.
+    _names: tuple[int, list[str]] | None = None
+    # Held while loading a profile set, so threads sharing the Profiles
+    # don't each load it.
+    _load_lock: threading.Lock
+    _price_series: dict[Path, tuple[int, PriceSeries]]
+
+    def __init__(
+        self,
+        profiles_dir: str | None = None,
+        *,
+        catalog_filepath: str | None = None,
+        selection: PlanSelection | None = None,
+    ) -> None:
+        """Initialize a Profiles.
+
+        Args:
+            profiles_dir:
+                Defaults to the profiles shipped with the app.
+            catalog_filepath: If given, read plans from this PlanCatalog
+                rather than profiles_dir. Spot price plans are still read
+                from profiles_dir.
+            selection: Which of the catalog's plans to use. Defaults to
+                every plan's latest pricing.
+        """
+        self._profiles_dir = (
+            DVU.get_profiles_dir() if profiles_dir is None else profiles_dir
+        )
+        if catalog_filepath is not None:
+            self._catalog = PlanCatalog(catalog_filepath)
+        self._selection = PlanSelection() if selection is None else selection
+        self._tensors = {}
+        self._bounds = {}
+        self._listings = {}
+        self._load_lock = threading.Lock()
+        self._price_series = {}
 
     def get_profile_set_names(self) -> list[str]:
-        """Return a list of names of profile sets."""
-        return [
-            x.name
-            for x in Path(DVU.get_profiles_dir()).iterdir()
-            if x.is_dir()
-        ]
+        """Return a list of names of profile sets.
 
+        The names are kept until the profiles directory is modified, or
+        plans are imported into the catalog.
+        """
+        if self._catalog is not None:
+            version = self._catalog.get_version()
+        else:
+            version = Path(self._profiles_dir).stat().st_mtime_ns
+        if self._names is None or self._names[0] != version:
+            if self._catalog is not None:
+                names = self._catalog.get_profile_set_names(self._selection)
+            else:
+                names = [
+                    x.name
+                    for x in Path(self._profiles_dir).iterdir()
+                    if x.is_dir()
+                ]
+            self._names = (version, names)
+        return list(self._names[1])
+
+    def get_profile_set_fingerprint(self, profile: str) -> str | None:
+        """Return a string that changes when a profile set's files change.
+
+        With a catalog, the string changes when plans are imported into it.
+        A profile set's files are only read again once its directory is
+        modified, as it is when a file is added, removed or replaced, so
+        call invalidate() after editing a file in place.
+        Returns None if profile is not valid.
+        """
+        listing = self._get_listing(Path(self._profiles_dir) / profile)
+        if self._catalog is not None:
+            if not self._catalog.has_profile_set(profile, self._selection):
+                return None
+            catalog = f"{self._catalog.get_version()}:{self._selection!r}"
+            # Only spot price plans are read from files.
+            if listing is None or not listing[1]:
+                return catalog
+            return f"{catalog}:{listing[0]}"
+        return None if listing is None else listing[0]
+
+    def invalidate(self) -> None:
+        """Read every profile set's files again when next used.
+
+        See get_profile_set_fingerprint().
+        """
+        self._listings.clear()
+        self._names = None
+
+    def _get_listing(self, path: Path) -> tuple[str, bool] | None:
+        """Return a fingerprint of a directory's files, and any spot plans.
+
+        The fingerprint changes when files in the directory change, and the
+        bool is whether it has spot price plans. Both are kept until the
+        directory is modified. Returns None if the directory doesn't exist.
+        """
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._listings.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        digest = hashlib.sha1(usedforsecurity=False)
+        spot_plans = False
+        for data_path in sorted(path.rglob("*")):
+            if not data_path.is_file():
+                continue
+            stat = data_path.stat()
+            name = data_path.relative_to(path).as_posix()
+            digest.update(
+                f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+            )
+            spot_plans = spot_plans or (
+                data_path.parent == path
+                and data_path.suffix == SPOT_PLAN_SUFFIX
+            )
+        listing = (digest.hexdigest(), spot_plans)
+        self._listings[path] = (mtime, listing)
+        return listing
+
+    @timed("Profiles.load")
     def _get_profile_data_numpy(
         self, profile: str
     ) -> list[tuple[str, float, npt.NDArray]] | None:
@@ -231,7 +1725,16 @@ class Profiles:
         Returns a profile data list of containing tuples of names,
         daily charges, and numpy arrays of shape (7,24).
         """
-        path = Path(DVU.get_profiles_dir()) / profile
+        if self._catalog is not None:
+            if not self._catalog.has_profile_set(profile, self._selection):
+                return None
+            return [
+                (name, daily_charge, charges)
+                for name, daily_charge, _, charges in self._catalog.get_plans(
+                    profile, self._selection
+                )
+            ]
+        path = Path(self._profiles_dir) / profile
         if not path.exists():
             return None
         return [
@@ -244,6 +1747,7 @@ class Profiles:
                         delimiter=",",
                         skiprows=8,
                         usecols=1,
+                        max_rows=1,
                     )
                 ),
                 np.loadtxt(
@@ -256,9 +1760,38 @@ class Profiles:
                 ),
             )
             for data_path in path.iterdir()
-            if data_path.is_file()
+            if data_path.is_file() and data_path.suffix != SPOT_PLAN_SUFFIX
         ]
 
+    def get_buy_back_rates(self, profile: str) -> dict[str, float] | None:
+        """Return each plan's buy back rate, or None if profile not valid.
+
+        The rate, in cents per kWh exported, is read from an optional
+        "Buy Back" row after the Daily Charge row, and defaults to 0.
+        """
+        if self._catalog is not None:
+            if not self._catalog.has_profile_set(profile, self._selection):
+                return None
+            return {
+                name: buy_back
+                for name, _, buy_back, _ in self._catalog.get_plans(
+                    profile, self._selection
+                )
+            }
+        path = Path(self._profiles_dir) / profile
+        if not path.exists():
+            return None
+        rates = {}
+        for data_path in path.iterdir():
+            if not data_path.is_file() or data_path.suffix == SPOT_PLAN_SUFFIX:
+                continue
+            rates[data_path.stem] = 0.0
+            with data_path.open(newline="", encoding="utf-8") as file:
+                for row in csv.reader(file):
+                    if len(row) >= 2 and row[0].strip().lower() == "buy back":
+                        rates[data_path.stem] = float(row[1])
+        return rates
+
     def get_profile_data(
         self, profile: str
     ) -> list[tuple[str, float, list[list[float]]]] | None:
@@ -279,24 +1812,325 @@ class Profiles:
             ]
         )
 
+    def _get_profile_tensor(
+        self, profile: str, fingerprint: str | None = None
+    ) -> ProfileTensor | None:
+        """Return a profile set's plans stacked into arrays.
+
+        Returns None if profile is not valid, else a list of plan names,
+        an array of daily charges of shape (plans,), and an array of
+        hourly charges of shape (plans, 7, 24). The arrays are cached until
+        the profile set's files change, so must not be mutated.
+        fingerprint:
+            The profile set's fingerprint, if already found, see
+            get_profile_set_fingerprint().
+        """
+        if fingerprint is None:
+            fingerprint = self.get_profile_set_fingerprint(profile)
+        if fingerprint is None:
+            return None
+        cached = self._tensors.get(profile)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        with self._load_lock:
+            cached = self._tensors.get(profile)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+            profile_data = self._get_profile_data_numpy(profile)
+            if profile_data is None:
+                return None
+            names = [name for name, _, _ in profile_data]
+            daily_charges = np.array(
+                [daily_charge for _, daily_charge, _ in profile_data],
+                dtype=float,
+            ).reshape(len(profile_data))
+            charges = np.array(
+                [data for _, _, data in profile_data], dtype=float
+            ).reshape(len(profile_data), 7, 24)
+            tensor = (names, daily_charges, charges)
+            self._tensors[profile] = (fingerprint, tensor)
+        return tensor
+
+    @timed("Profiles.get_plan_costs")
+    def get_plan_costs(
+        self,
+        usages: npt.ArrayLike,
+        profile: str,
+        *,
+        fingerprint: str | None = None,
+    ) -> tuple[list[str], npt.NDArray] | None:
+        """Return every plan's yearly cost for many usages at once.
+
+        Args:
+            usages: Average usages of shape (usages, 7, 24).
+            profile: The profile set to cost.
+            fingerprint: The profile set's fingerprint, if already found,
+                so it isn't found again. See get_profile_set_fingerprint().
+
+        Returns:
+            None if profile is not valid, else a list of plan names and an
+            array of yearly costs in dollars of shape (usages, plans).
+        """
+        tensor = self._get_profile_tensor(profile, fingerprint)
+        if tensor is None:
+            return None
+        names, daily_charges, charges = tensor
+        usages_np = np.asarray(usages, dtype=float)
+        costs = np.einsum("udh,pdh->up", usages_np, charges) * (
+            (365 / 100) / 7
+        ) + daily_charges * (365 / 100)
+        return names, costs
+
+    def _get_plan_bounds(
+        self, profile: str, tensor: ProfileTensor
+    ) -> PlanBounds:
+        """Return each plan's cheapest and dearest rate in every block.
+
+        Returns arrays of shape (blocks, plans), as yearly dollars per kWh
+        of average weekly usage, cached with the profile tensor they were
+        computed from. See _BOUND_BLOCKS.
+        """
+        cached = self._bounds.get(profile)
+        if cached is not None and cached[0] is tensor:
+            return cached[1]
+        charges = tensor[2].reshape(len(tensor[0]), 7 * 24)
+        blocks = _BOUND_BLOCK_SUMS.shape[1]
+        low = np.empty((blocks, len(charges)))
+        high = np.empty((blocks, len(charges)))
+        for block in range(blocks):
+            in_block = charges[:, _BOUND_BLOCKS == block]
+            low[block] = in_block.min(axis=1, initial=np.inf)
+            high[block] = in_block.max(axis=1, initial=-np.inf)
+        bounds = (low * ((365 / 100) / 7), high * ((365 / 100) / 7))
+        self._bounds[profile] = (tensor, bounds)
+        return bounds
+
+    @timed("Profiles.rank_plans")
+    def rank_plans(
+        self,
+        usages: npt.ArrayLike,
+        profile: str,
+        top: int,
+        *,
+        fingerprint: str | None = None,
+    ) -> list[list[tuple[str, float]]] | None:
+        """Return the cheapest plans for many usages at once.
+
+        Gives the same result as generate_plan_comparisons() cut to top
+        plans, but only plans that could be among them are costed in full.
+        A plan's cost is bounded by costing a usage's total in each block of
+        hours at the plan's cheapest and dearest rate in the block. Plans
+        whose cheapest cost is above the top-th lowest dearest cost, for
+        every usage, are skipped.
+
+        Args:
+            usages: Average usages of shape (usages, 7, 24), not negative.
+            profile: The profile set to rank.
+            top: How many of the cheapest plans to return for each usage.
+            fingerprint: See get_plan_costs().
+
+        Returns:
+            None if profile is not valid, else for each usage, a list of up
+            to top plan names and yearly costs sorted by cost.
+        """
+        tensor = self._get_profile_tensor(profile, fingerprint)
+        if tensor is None:
+            return None
+        names, daily_charges, charges = tensor
+        usages_np = np.asarray(usages, dtype=float).reshape(-1, 7 * 24)
+        if top < 1:
+            return [[] for _ in usages_np]
+        candidates = np.arange(len(names))
+        if top < len(names) and not np.any(usages_np < 0):
+            low, high = self._get_plan_bounds(profile, tensor)
+            blocks = usages_np @ _BOUND_BLOCK_SUMS
+            daily = daily_charges * (365 / 100)
+            lowest = blocks @ low + daily
+            highest = blocks @ high + daily
+            threshold = np.partition(highest, top - 1, axis=1)[:, top - 1]
+            # Allows for rounding, so plans tied with the top-th survive.
+            threshold += 1e-9 * (1 + np.abs(threshold))
+            candidates = np.flatnonzero(
+                ~(lowest > threshold[:, None]).all(axis=0)
+            )
+        costs = np.einsum(
+            "uh,ph->up",
+            usages_np,
+            charges.reshape(len(names), 7 * 24)[candidates],
+        ) * ((365 / 100) / 7) + daily_charges[candidates] * (365 / 100)
+        order = np.argsort(costs, axis=1, kind="stable")[:, :top]
+        return [
+            [(names[candidates[i]], float(row[i])) for i in row_order]
+            for row, row_order in zip(costs, order)
+        ]
+
+    def _get_price_series(self, path: Path) -> PriceSeries:
+        """Return a price history, mapped once until its CSV changes."""
+        mtime = path.stat().st_mtime_ns
+        cached = self._price_series.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        series = PriceSeries(path)
+        self._price_series[path] = (mtime, series)
+        return series
+
+    def _get_spot_plans(self, profile: str) -> list[SpotPlan] | None:
+        """Return a profile set's spot price plans, or None if not valid.
+
+        A spot price plan is a .spot file of "Prices", the path of a price
+        history CSV relative to the profile set (see PriceSeries), "Margin",
+        added to every hour's price, and "Daily Charge" rows, in the same
+        format as the Daily Charge row of other plans. Returns a list of
+        plan names, daily charges, margins, and price series, all monetary
+        values in cents.
+        """
+        path = Path(self._profiles_dir) / profile
+        if not path.exists():
+            return None
+        plans = []
+        for data_path in sorted(path.glob(f"*{SPOT_PLAN_SUFFIX}")):
+            with data_path.open(newline="", encoding="utf-8") as file:
+                fields = {
+                    row[0].strip().lower(): row[1].strip()
+                    for row in csv.reader(file)
+                    if len(row) >= 2
+                }
+            plans.append(
+                (
+                    data_path.stem,
+                    float(fields["daily charge"]),
+                    float(fields.get("margin", 0)),
+                    self._get_price_series(path / fields["prices"]),
+                )
+            )
+        return plans
+
+    def has_spot_plans(self, profile: str) -> bool:
+        """Return whether a profile set has spot price plans."""
+        listing = self._get_listing(Path(self._profiles_dir) / profile)
+        return listing is not None and listing[1]
+
+    @timed("Profiles.get_spot_plan_costs")
+    def get_spot_plan_costs(
+        self, first_date: date, usage_matrix: npt.ArrayLike, profile: str
+    ) -> tuple[list[str], npt.NDArray] | None:
+        """Return every spot price plan's yearly cost for hourly usage.
+
+        Each plan's price for every hour is multiplied with that hour's
+        usage, over the hours both are known, then scaled to a year.
+
+        Args:
+            first_date: The date of the first row of usage_matrix.
+            usage_matrix: Hourly usage of shape (days, 24), NaN where
+                unknown, as returned by Data.get_usage_matrix().
+            profile: The profile set to cost.
+
+        Returns:
+            None if profile is not valid, else a list of plan names and an
+            array of yearly costs in dollars of shape (plans,), NaN for
+            plans without prices for any hour of usage.
+        """
+        plans = self._get_spot_plans(profile)
+        if plans is None:
+            return None
+        usage = np.asarray(usage_matrix, dtype=float)
+        # Plans often share a price history, so each is only read once.
+        totals: dict[int, tuple[float, float, int]] = {}
+        costs = np.full(len(plans), np.nan)
+        for i, (_, daily_charge, margin, series) in enumerate(plans):
+            if id(series) not in totals:
+                prices = series.get_range(first_date, len(usage))
+                known = ~(np.isnan(usage) | np.isnan(prices))
+                totals[id(series)] = (
+                    float(np.dot(usage[known], prices[known])),
+                    float(usage[known].sum()),
+                    int(np.count_nonzero(known)),
+                )
+            priced, used, hours = totals[id(series)]
+            if hours == 0:
+                continue
+            daily = (priced + margin * used) / hours * 24
+            costs[i] = (daily + daily_charge) * (365 / 100)
+        return [name for name, _, _, _ in plans], costs
+
+    def add_spot_plans(
+        self,
+        comparison: list[tuple[str, float]],
+        first_date: date,
+        usage_matrix: npt.ArrayLike,
+        profile: str,
+    ) -> list[tuple[str, float]]:
+        """Return a comparison with the profile set's spot price plans added.
+
+        See get_spot_plan_costs() for arguments. Plans without prices for
+        any hour of usage are left out.
+        """
+        spot_costs = self.get_spot_plan_costs(
+            first_date, usage_matrix, profile
+        )
+        if spot_costs is None:
+            return comparison
+        names, costs = spot_costs
+        return sorted(
+            comparison
+            + [
+                (name, float(cost))
+                for name, cost in zip(names, costs)
+                if not np.isnan(cost)
+            ],
+            key=lambda plan: plan[1],
+        )
+
     def generate_plan_comparison(
-        self, usage: list[list[float]], profile: str
+        self,
+        usage: list[list[float]],
+        profile: str,
+        hourly_usage: tuple[date, npt.NDArray] | None = None,
+        *,
+        fingerprint: str | None = None,
     ) -> list[tuple[str, float]] | None:
         """Returns sorted comparison name and cost for year.
 
+        Spot price plans are only included if hourly_usage, the first date
+        and matrix of the same usage, is given. See add_spot_plans() and,
+        for fingerprint, get_plan_costs().
         Returns None if profile is not valid.
         """
-        profile_data = self._get_profile_data_numpy(profile)
-        if profile_data is None:
+        result = self.generate_plan_comparisons(
+            np.array([usage], dtype=float), profile, fingerprint=fingerprint
+        )
+        if result is None:
             return None
-        usage_np = np.array(usage, dtype=float)
-        result = [
-            (
-                name,
-                (usage_np * data).sum() * ((365 / 100) / 7)
-                + daily_charge * (365 / 100),
-            )
-            for name, daily_charge, data in profile_data
+        if hourly_usage is None:
+            return result[0]
+        return self.add_spot_plans(result[0], *hourly_usage, profile)
+
+    def generate_plan_comparisons(
+        self,
+        usages: npt.ArrayLike,
+        profile: str,
+        *,
+        fingerprint: str | None = None,
+    ) -> list[list[tuple[str, float]]] | None:
+        """Return sorted comparison names and costs for many usages at once.
+
+        Args:
+            usages: Average usages of shape (usages, 7, 24).
+            profile: The profile set to compare.
+            fingerprint: See get_plan_costs().
+
+        Returns:
+            None if profile is not valid, else for each usage, a list of
+            plan names and yearly costs sorted by cost.
+        """
+        plan_costs = self.get_plan_costs(
+            usages, profile, fingerprint=fingerprint
+        )
+        if plan_costs is None:
+            return None
+        names, costs = plan_costs
+        order = np.argsort(costs, axis=1, kind="stable")
+        return [
+            [(names[i], float(row[i])) for i in row_order]
+            for row, row_order in zip(costs, order)
         ]
-        result.sort(key=lambda x: x[1])
-        return result
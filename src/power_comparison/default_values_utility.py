@@ -10,6 +10,9 @@ class DefaultValuesUtility:
 
     _PROFILES_DIR = "profiles"
     _DB_FILE_PATH = "data/user_data.db"
+    _SYNC_LOCK_PATH = "data/sync.lock"
+    _SYNC_ACCOUNTS_PATH = "sync_accounts.json"
+    _SPOT_PRICE_CACHE_DIR = "data/spot_prices"
     _APP_NAME = "Power Comparison"
     _ICON_ICO_PATH = "img/power_compare.ico"
     _ICON_PNG_PATH = "img/power_compare.png"
@@ -65,3 +68,39 @@ class DefaultValuesUtility:
             )
             / DefaultValuesUtility._DB_FILE_PATH
         )
+
+    @staticmethod
+    def get_sync_lock_path() -> str:
+        """Return a path to the sync daemon's lock file."""
+        return str(
+            Path(
+                platformdirs.user_data_dir(
+                    DefaultValuesUtility._APP_NAME, roaming=True
+                )
+            )
+            / DefaultValuesUtility._SYNC_LOCK_PATH
+        )
+
+    @staticmethod
+    def get_spot_price_cache_dir() -> str:
+        """Return a path to the directory of spot price caches."""
+        return str(
+            Path(
+                platformdirs.user_data_dir(
+                    DefaultValuesUtility._APP_NAME, roaming=True
+                )
+            )
+            / DefaultValuesUtility._SPOT_PRICE_CACHE_DIR
+        )
+
+    @staticmethod
+    def get_sync_accounts_path() -> str:
+        """Return a path to the sync daemon's accounts file."""
+        return str(
+            Path(
+                platformdirs.user_config_dir(
+                    DefaultValuesUtility._APP_NAME, roaming=True
+                )
+            )
+            / DefaultValuesUtility._SYNC_ACCOUNTS_PATH
+        )
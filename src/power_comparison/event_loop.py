@@ -0,0 +1,232 @@
+"""Drive a Tk window from an asyncio event loop."""
+from __future__ import annotations
+
+import _tkinter
+import asyncio
+import math
+import selectors
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import tkinter
+    from collections.abc import Coroutine, Mapping
+
+
+def _process_events(root: tkinter.Misc) -> bool:
+    """Handle every pending Tk event, returning whether there were any."""
+    handled = False
+    while root.tk.dooneevent(_tkinter.ALL_EVENTS | _tkinter.DONT_WAIT):
+        handled = True
+    return handled
+
+
+class TkSelector(selectors.BaseSelector):
+    """A selector that handles a Tk root's events while it waits.
+
+    Wraps a selector with a file descriptor, like epoll or kqueue, which Tk
+    watches while it waits for input. An asyncio loop using it sleeps until
+    input arrives, a registered file is ready, another thread schedules a
+    callback, or the loop's next timer is due, instead of polling. Tk
+    callbacks run inside select(), so they can create asyncio tasks.
+    """
+
+    _root: tkinter.Misc
+    _selector: selectors.BaseSelector
+    _wakeups: int = 0
+
+    def __init__(
+        self, root: tkinter.Misc, selector: selectors.BaseSelector
+    ) -> None:
+        """Initialize the TkSelector.
+
+        Args:
+            root: The Tk root whose events to handle.
+            selector: The selector to wrap, which must have a fileno().
+        """
+        self._root = root
+        self._selector = selector
+
+    def register(
+        self, fileobj: Any, events: int, data: Any = None
+    ) -> selectors.SelectorKey:
+        """Register a file object, see selectors.BaseSelector."""
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj: Any) -> selectors.SelectorKey:
+        """Unregister a file object, see selectors.BaseSelector."""
+        return self._selector.unregister(fileobj)
+
+    def modify(
+        self, fileobj: Any, events: int, data: Any = None
+    ) -> selectors.SelectorKey:
+        """Change a file object's events, see selectors.BaseSelector."""
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self) -> Mapping[Any, selectors.SelectorKey]:
+        """Return the registered file objects, see selectors.BaseSelector."""
+        return self._selector.get_map()
+
+    def get_wakeups(self) -> int:
+        """Return how many times select() has handled Tk events."""
+        return self._wakeups
+
+    def select(
+        self, timeout: float | None = None
+    ) -> list[tuple[selectors.SelectorKey, int]]:
+        """Handle Tk events, waiting in Tk until something is ready.
+
+        Returns as soon as any Tk event is handled, so the loop can run the
+        callbacks it scheduled.
+        """
+        self._wakeups += 1
+        handled = _process_events(self._root)
+        ready = self._selector.select(0)
+        if handled or ready or (timeout is not None and timeout <= 0):
+            return ready
+        fileno = self._selector.fileno()  # type: ignore[attr-defined]
+        tk = self._root.tk
+        tk.createfilehandler(fileno, _tkinter.READABLE, lambda *_: None)
+        timer = (
+            None
+            if timeout is None
+            else self._root.after(math.ceil(1000 * timeout), lambda: None)
+        )
+        try:
+            # Blocks until Tk handles an event: input, the wrapped selector
+            # being ready, or the timer.
+            tk.dooneevent(_tkinter.ALL_EVENTS)
+        finally:
+            # The handler fires for as long as the selector is ready.
+            tk.deletefilehandler(fileno)
+            if timer is not None:
+                self._root.after_cancel(timer)
+        _process_events(self._root)
+        return self._selector.select(0)
+
+    def close(self) -> None:
+        """Close the wrapped selector."""
+        self._selector.close()
+
+
+class TkEventLoop:
+    """Process a Tk root's events from inside an asyncio event loop.
+
+    Where Tk can watch files, everywhere but Windows, new_event_loop()
+    returns a loop whose TkSelector handles Tk events while it waits, so
+    input and finished tasks are handled at once, and an idle window doesn't
+    wake at all. Otherwise run() polls Tk, handling pending events whenever
+    there are any. While the window is idle the wait between polls doubles
+    from min_interval up to max_interval, and any asyncio task finishing
+    wakes the loop straight away, so changes made by that task are drawn
+    without waiting for the next poll.
+    """
+
+    _root: tkinter.Tk
+    _min_interval: float
+    _max_interval: float
+    _selector: TkSelector | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+    _waiter: asyncio.Future[None] | None = None
+    _stopped: bool = False
+    _wakeups: int = 0
+
+    def __init__(
+        self,
+        root: tkinter.Tk,
+        min_interval: float = 1 / 240,
+        max_interval: float = 1 / 20,
+    ) -> None:
+        """Initialize the TkEventLoop.
+
+        Args:
+            root:
+                The Tk root whose events to process.
+            min_interval:
+                Seconds to wait between polls while the window is busy, if
+                polling.
+            max_interval:
+                Longest number of seconds to wait between polls while idle,
+                if polling, which bounds the latency of input arriving while
+                idle.
+        """
+        self._root = root
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        """Return a new asyncio event loop that handles Tk events itself.
+
+        If Tk can't watch the loop's selector, returns a plain event loop,
+        and run() polls Tk instead.
+        """
+        selector = selectors.DefaultSelector()
+        if not hasattr(self._root.tk, "createfilehandler") or not hasattr(
+            selector, "fileno"
+        ):
+            selector.close()
+            return asyncio.new_event_loop()
+        self._selector = TkSelector(self._root, selector)
+        self._loop = asyncio.SelectorEventLoop(self._selector)
+        return self._loop
+
+    def wake(self) -> None:
+        """Process Tk events now instead of at the next poll."""
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def stop(self) -> None:
+        """Stop the loop after it next wakes."""
+        self._stopped = True
+        self.wake()
+
+    def get_wakeups(self) -> int:
+        """Return how many times the loop has processed Tk events."""
+        if self._selector is not None:
+            return self._selector.get_wakeups()
+        return self._wakeups
+
+    def process_events(self) -> bool:
+        """Handle every pending Tk event, returning whether there were any."""
+        return _process_events(self._root)
+
+    def _task_factory(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        coro: Coroutine[Any, Any, Any],
+        **kwargs: Any,
+    ) -> asyncio.Task[Any]:
+        """Create a task that wakes this loop when it finishes."""
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        task.add_done_callback(lambda _: self.wake())
+        return task
+
+    async def run(self) -> None:
+        """Process Tk events until stop() is called."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            # The loop's selector handles Tk events.
+            try:
+                while not self._stopped:
+                    self._waiter = loop.create_future()
+                    await self._waiter
+            finally:
+                self._waiter = None
+            return
+        previous_factory = loop.get_task_factory()
+        loop.set_task_factory(self._task_factory)
+        self._root.update()
+        interval = self._min_interval
+        try:
+            while not self._stopped:
+                self._wakeups += 1
+                if self.process_events():
+                    interval = self._min_interval
+                else:
+                    interval = min(interval * 2, self._max_interval)
+                self._waiter = loop.create_future()
+                handle = loop.call_later(interval, self.wake)
+                await self._waiter
+                handle.cancel()
+        finally:
+            self._waiter = None
+            loop.set_task_factory(previous_factory)
@@ -0,0 +1,129 @@
+"""Forecast a year of hourly usage from its history.
+
+Usage is modelled, for each hour of the day, as an effect for each weekday
+plus annual harmonics of the day of the year, so a household that uses more
+in winter is costed for a whole year of winter and summer, even when only
+part of a year is compared. The model is linear, so fitting a batch of
+histories is one batched least squares solve.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+import numpy.typing as npt
+
+HARMONICS = 2
+# Years of history to fit to, if there is that much.
+HISTORY_DAYS = 3 * 365
+# Harmonics are shrunk towards no seasonality as if by this many days of
+# flat usage, so a short history can't extrapolate wildly.
+_RIDGE_DAYS = 30
+MIN_DAYS = 28
+_DAYS_PER_YEAR = 365.25
+
+
+def design_matrix(
+    ordinals: npt.NDArray, harmonics: int = HARMONICS
+) -> npt.NDArray:
+    """Return the model's features for Gregorian ordinal days.
+
+    Returns:
+        An array of shape ordinals.shape + (7 + 2 * harmonics,), of one
+        indicator per weekday, then the cosine and sine of each harmonic.
+    """
+    features = np.zeros((*ordinals.shape, 7 + 2 * harmonics))
+    # Ordinal 1 was a Monday.
+    np.put_along_axis(features, ((ordinals - 1) % 7)[..., None], 1, axis=-1)
+    phase = 2 * np.pi * ordinals / _DAYS_PER_YEAR
+    for k in range(1, harmonics + 1):
+        features[..., 5 + 2 * k] = np.cos(k * phase)
+        features[..., 6 + 2 * k] = np.sin(k * phase)
+    return features
+
+
+def fit(
+    first_dates: list[date],
+    usage: npt.NDArray,
+    harmonics: int = HARMONICS,
+) -> npt.NDArray:
+    """Fit the model to a batch of hourly usage histories.
+
+    Args:
+        first_dates: The date of the first day of each history.
+        usage: Hourly usage of shape (histories, days, 24). Days with an
+            unknown hour, such as padding, are left out.
+        harmonics: The number of annual harmonics to fit.
+
+    Returns:
+        Coefficients of shape (histories, 7 + 2 * harmonics, 24).
+    """
+    ordinals = np.array([first.toordinal() for first in first_dates])[
+        :, None
+    ] + np.arange(usage.shape[1])
+    features = design_matrix(ordinals, harmonics)
+    complete = ~np.isnan(usage).any(axis=2)
+    weights = complete.astype(float)
+    weighted = np.swapaxes(features * weights[..., None], 1, 2)
+    gram = weighted @ features
+    moments = weighted @ np.where(complete[..., None], usage, 0)
+    # A weekday missing from a history gets a coefficient of 0, rather
+    # than a singular matrix.
+    penalty = np.diag([1e-9] * 7 + [_RIDGE_DAYS / 2] * (2 * harmonics))
+    return np.linalg.solve(gram + penalty, moments)
+
+
+def project(
+    coefficients: npt.NDArray, first_dates: list[date], days: int = 365
+) -> npt.NDArray:
+    """Return projected usage of shape (histories, days, 24) from dates."""
+    harmonics = (coefficients.shape[1] - 7) // 2
+    ordinals = np.array([first.toordinal() for first in first_dates])[
+        :, None
+    ] + np.arange(days)
+    projection = design_matrix(ordinals, harmonics) @ coefficients
+    return np.clip(projection, 0, None)
+
+
+def forecast_average_usage(
+    first_dates: list[date], usage: npt.NDArray
+) -> npt.NDArray:
+    """Forecast the year after each history, as average weekly usage.
+
+    The forecast is returned in the shape of Data.get_average_usage(),
+    scaled so that costing it as a week repeated 365 / 7 times costs the
+    forecast year exactly.
+
+    Args:
+        first_dates: The date of the first day of each history.
+        usage: Hourly usage of shape (histories, days, 24), NaN where
+            unknown.
+
+    Returns:
+        An array of shape (histories, 7, 24), NaN for histories with fewer
+        than MIN_DAYS complete days.
+    """
+    days = usage.shape[1]
+    coefficients = fit(first_dates, usage)
+    starts = [first + timedelta(days=days) for first in first_dates]
+    projection = project(coefficients, starts)
+    weekdays = (
+        np.array([start.toordinal() for start in starts])[:, None]
+        + np.arange(365)
+        - 1
+    ) % 7
+    # Sums each weekday's projected days, as a batched product.
+    totals = np.swapaxes(np.eye(7)[weekdays], 1, 2) @ projection
+    average = totals * (7 / 365)
+    enough = (~np.isnan(usage).any(axis=2)).sum(axis=1) >= MIN_DAYS
+    average[~enough] = np.nan
+    return average
+
+
+def history_start(start: date, end: date) -> date:
+    """Return the start of the history to fit for a window ending at end.
+
+    At least HISTORY_DAYS before end, or the window's start if earlier.
+    """
+    return min(start, end - timedelta(days=HISTORY_DAYS))
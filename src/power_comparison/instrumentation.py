@@ -0,0 +1,208 @@
+"""Time named spans of work, to find where time goes in slow operations.
+
+Timing is off unless enabled, by setting the POWER_COMPARISON_PROFILE
+environment variable to a file path, or "-" for stderr, or by passing
+--profile to the command line tools. While off, a span costs one global
+lookup. While on, every span's count and latency histogram is written as
+JSON when the process exits.
+"""
+
+from __future__ import annotations
+
+import atexit
+import bisect
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from contextlib import AbstractContextManager
+    from types import TracebackType
+
+P = ParamSpec("P")
+T = TypeVar("T")
+ENVIRONMENT_VARIABLE = "POWER_COMPARISON_PROFILE"
+
+# Upper bounds of the latency histogram's buckets, in milliseconds.
+_LATENCY_BUCKETS_MS = [2 ** (i / 4) / 10 for i in range(72)]
+
+
+class LatencyMetrics:
+    """Count and histogram the latency of named operations, thread safely."""
+
+    _counts: dict[str, list[int]]
+    _totals_ms: dict[str, float]
+    _max_ms: dict[str, float]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        """Initialize empty LatencyMetrics."""
+        self._counts = {}
+        self._totals_ms = {}
+        self._max_ms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, latency_ms: float) -> None:
+        """Record an operation's latency."""
+        bucket = bisect.bisect_left(_LATENCY_BUCKETS_MS, latency_ms)
+        with self._lock:
+            counts = self._counts.setdefault(
+                name, [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+            )
+            counts[bucket] += 1
+            self._totals_ms[name] = self._totals_ms.get(name, 0) + latency_ms
+            self._max_ms[name] = max(self._max_ms.get(name, 0), latency_ms)
+
+    def _percentile(self, name: str, fraction: float) -> float:
+        """Return the upper bound of the bucket holding a percentile.
+
+        The bound is capped at the largest latency recorded.
+        """
+        counts = self._counts[name]
+        target = fraction * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= target and count > 0:
+                return min(
+                    _LATENCY_BUCKETS_MS[min(i, len(_LATENCY_BUCKETS_MS) - 1)],
+                    self._max_ms[name],
+                )
+        return 0
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Return counts and latency statistics per name."""
+        with self._lock:
+            return {
+                name: {
+                    "count": sum(counts),
+                    "total_ms": self._totals_ms[name],
+                    "mean_ms": self._totals_ms[name] / sum(counts),
+                    "p50_ms": self._percentile(name, 0.5),
+                    "p90_ms": self._percentile(name, 0.9),
+                    "p99_ms": self._percentile(name, 0.99),
+                    "max_ms": self._max_ms[name],
+                }
+                for name, counts in sorted(self._counts.items())
+            }
+
+
+class _Span:
+    """Time the body of a with statement."""
+
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: LatencyMetrics, name: str) -> None:
+        """Initialize the _Span."""
+        self._metrics = metrics
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        """Start timing."""
+        self._start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Record the time taken."""
+        self._metrics.record(
+            self._name, 1000 * (time.perf_counter() - self._start)
+        )
+
+
+_metrics: LatencyMetrics | None = None
+_NULL_SPAN = nullcontext()
+
+
+def is_enabled() -> bool:
+    """Return whether spans are being timed."""
+    return _metrics is not None
+
+
+def enable(path: str = "-") -> None:
+    """Start timing spans, writing a summary as JSON when the process exits.
+
+    Args:
+        path: The file to write to, or "-" for stderr. "{pid}" is replaced
+            with the process ID, so processes don't overwrite each other.
+    """
+    global _metrics
+    if _metrics is not None:
+        return
+    _metrics = LatencyMetrics()
+    atexit.register(write_summary, path)
+
+
+def enable_from_environment() -> None:
+    """Enable timing if the environment variable is set."""
+    path = os.environ.get(ENVIRONMENT_VARIABLE)
+    if path:
+        enable(path)
+
+
+def summary() -> dict[str, dict[str, float]]:
+    """Return counts and latency statistics per span, empty if disabled."""
+    return {} if _metrics is None else _metrics.summary()
+
+
+def write_summary(path: str = "-") -> None:
+    """Write the summary as JSON to a file, or "-" for stderr."""
+    encoded = json.dumps(summary(), indent=2)
+    if path == "-":
+        print(encoded, file=sys.stderr)
+        return
+    with open(
+        path.replace("{pid}", str(os.getpid())), "w", encoding="utf-8"
+    ) as file:
+        file.write(encoded + "\n")
+
+
+def span(name: str) -> AbstractContextManager[None]:
+    """Return a context manager that times its body as name, if enabled."""
+    if _metrics is None:
+        return _NULL_SPAN
+    return _Span(_metrics, name)
+
+
+def timed(
+    name: str,
+) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """Time every call of the decorated function as name, if enabled.
+
+    Coroutine functions are timed until they return, including any time
+    spent waiting.
+    """
+
+    def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                if _metrics is None:
+                    return await func(*args, **kwargs)
+                with _Span(_metrics, name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if _metrics is None:
+                return func(*args, **kwargs)
+            with _Span(_metrics, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
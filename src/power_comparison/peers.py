@@ -0,0 +1,189 @@
+"""Place each user's usage and best plan cost among every other user's."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from datetime import date
+
+    import numpy.typing as npt
+
+    from power_comparison.data import Data, Profiles
+
+
+def _percentiles(sorted_values: npt.NDArray, values: npt.NDArray) -> Any:
+    """Return the percent of other values below each value, ties halved.
+
+    Args:
+        sorted_values: Every user's values, including the user's, sorted.
+        values: The user's values, each a member of sorted_values.
+    """
+    below = np.searchsorted(sorted_values, values, side="left")
+    equal = np.searchsorted(sorted_values, values, side="right") - below
+    others = len(sorted_values) - 1
+    if others == 0:
+        return np.full(np.shape(values), 50.0)
+    return 100 * (below + (equal - 1) / 2) / others
+
+
+class PeerGroup:
+    """Every user's usage and best plan cost, sorted for percentiles.
+
+    A PeerGroup is a snapshot of the users' data versions when it was
+    built. build() with it as previous returns a new group, recomputing
+    only users whose data has changed since. Looking up a user's
+    percentiles is a binary search of each sorted array.
+    """
+
+    usernames: list[str]
+    versions: npt.NDArray
+    usage: npt.NDArray
+    costs: npt.NDArray
+    _rows: dict[str, int]
+    _sorted_hourly: npt.NDArray
+    _sorted_yearly: npt.NDArray
+    _sorted_costs: npt.NDArray
+
+    def __init__(
+        self,
+        usernames: list[str],
+        versions: npt.NDArray,
+        usage: npt.NDArray,
+        costs: npt.NDArray,
+    ) -> None:
+        """Initialize the PeerGroup, sorting every user's values.
+
+        Args:
+            usernames: Every user's username.
+            versions: Each user's data version, of shape (users,).
+            usage: Each user's average usage of shape (users, 7, 24), NaN
+                for hours of weekdays without usage.
+            costs: Each user's best plan's yearly cost in dollars, of shape
+                (users,), NaN if their usage isn't complete.
+        """
+        self.usernames = usernames
+        self.versions = versions
+        self.usage = usage
+        self.costs = costs
+        self._rows = {username: i for i, username in enumerate(usernames)}
+        complete = ~np.isnan(costs)
+        self._sorted_hourly = np.sort(self._hourly(usage[complete]), axis=0)
+        self._sorted_yearly = np.sort(self._yearly(usage[complete]))
+        self._sorted_costs = np.sort(costs[complete])
+
+    @staticmethod
+    def _hourly(usage: npt.NDArray) -> npt.NDArray:
+        """Return average usage per hour of day, of shape (users, 24)."""
+        return usage.mean(axis=-2)
+
+    @staticmethod
+    def _yearly(usage: npt.NDArray) -> npt.NDArray:
+        """Return yearly usage in kWh from average weekly usage."""
+        return usage.sum(axis=(-2, -1)) * 365 / 7
+
+    def __len__(self) -> int:
+        """Return the number of users with complete usage."""
+        return len(self._sorted_costs)
+
+    @classmethod
+    def build(
+        cls,
+        data: Data,
+        profiles: Profiles,
+        profile_set: str,
+        start_date: date,
+        end_date: date,
+        previous: PeerGroup | None = None,
+        *,
+        fingerprint: str | None = None,
+    ) -> PeerGroup | None:
+        """Build a PeerGroup, reusing an earlier one's unchanged users.
+
+        Changed users' average usage is summed in one grouped scan of the
+        database, and costed against every plan in one contraction.
+
+        Args:
+            data: The database to read every user's usage from.
+            profiles: The profile sets.
+            profile_set: The profile set to find each user's best plan in.
+            start_date: The first date of usage, excluded, like
+                Data.get_average_usage().
+            end_date: The last date of usage, excluded.
+            previous: A group built with the same arguments, if any.
+            fingerprint: See Profiles.get_plan_costs().
+
+        Returns:
+            None if profile_set is not valid, else the PeerGroup, which is
+            previous itself if no user's data has changed.
+        """
+        current = data.get_data_versions()
+        usernames = list(current)
+        versions = np.array(list(current.values()), dtype=np.int64)
+        usage = np.full((len(usernames), 7, 24), np.nan)
+        costs = np.full(len(usernames), np.nan)
+        changed = np.ones(len(usernames), dtype=bool)
+        if previous is not None:
+            rows = np.array(
+                [previous._rows.get(username, -1) for username in usernames],
+                dtype=int,
+            )
+            kept = rows >= 0
+            kept[kept] = previous.versions[rows[kept]] == versions[kept]
+            if kept.all() and len(usernames) == len(previous.usernames):
+                return previous
+            usage[kept] = previous.usage[rows[kept]]
+            costs[kept] = previous.costs[rows[kept]]
+            changed = ~kept
+        changed_names = [
+            username
+            for username, is_changed in zip(usernames, changed)
+            if is_changed
+        ]
+        usage[changed] = data.get_users_average_usage(
+            changed_names, start_date, end_date
+        )
+        complete = changed & ~np.isnan(usage).any(axis=(1, 2))
+        plan_costs = profiles.get_plan_costs(
+            usage[complete], profile_set, fingerprint=fingerprint
+        )
+        if plan_costs is None:
+            return None
+        if plan_costs[1].shape[1] > 0:
+            costs[complete] = plan_costs[1].min(axis=1)
+        return cls(usernames, versions, usage, costs)
+
+    def get_percentiles(self, username: str) -> dict[str, Any] | None:
+        """Return where a user's usage and best plan cost place them.
+
+        Each percentile is the percent of other users with a lower value,
+        with ties counting half, so 50 is the median.
+
+        Returns:
+            None if the user's usage isn't complete, else their percentiles
+            as "hourly", one per hour of the day, "yearly_usage" and
+            "best_cost", their values under the same names with "_value",
+            and the number of users compared as "users".
+        """
+        row = self._rows.get(username)
+        if row is None or np.isnan(self.costs[row]):
+            return None
+        hourly = self._hourly(self.usage[row])
+        yearly = self._yearly(self.usage[row])
+        hourly_percentiles = [
+            float(_percentiles(self._sorted_hourly[:, hour], hourly[hour]))
+            for hour in range(24)
+        ]
+        return {
+            "users": len(self),
+            "hourly": hourly_percentiles,
+            "hourly_value": hourly.tolist(),
+            "yearly_usage": float(_percentiles(self._sorted_yearly, yearly)),
+            "yearly_usage_value": float(yearly),
+            "best_cost": float(
+                _percentiles(self._sorted_costs, self.costs[row])
+            ),
+            "best_cost_value": float(self.costs[row]),
+        }
@@ -0,0 +1,335 @@
+"""Define the PlanCatalog class."""
+
+from __future__ import annotations
+
+import csv
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from power_comparison.default_values_utility import DefaultValuesUtility as DVU
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+# A plan's name, daily charge, buy back rate and hourly charges of shape
+# (7, 24), all monetary values in cents.
+CatalogPlan = tuple[str, float, float, "npt.NDArray"]
+
+# Hourly charges are stored as 7 * 24 little endian doubles.
+_CHARGES_DTYPE = np.dtype("<f8")
+# Words in plan names that follow the retailer, as in "Contact-Low-Simple".
+_USER_TYPES = ("Low", "Standard")
+
+
+class PlanSelection:
+    """Which plans of a catalog to use, those matching every given field."""
+
+    retailer: str | None
+    region: str | None
+    on: date | None
+
+    def __init__(
+        self,
+        retailer: str | None = None,
+        region: str | None = None,
+        on: date | None = None,
+    ) -> None:
+        """Initialize the PlanSelection.
+
+        Args:
+            retailer: Only plans from this retailer.
+            region: Only plans for this region.
+            on: Only each plan's pricing in effect on this date, rather than
+                its latest pricing.
+        """
+        self.retailer = retailer
+        self.region = region
+        self.on = on
+
+    def __repr__(self) -> str:
+        """Return a representation that changes with the selection."""
+        return (
+            f"PlanSelection({self.retailer!r}, {self.region!r}, "
+            f"{self.on!r})"
+        )
+
+    def where(self) -> tuple[str, dict[str, Any]]:
+        """Return SQL conditions on plans, and their parameters."""
+        conditions = ["effective_date <= :on"]
+        parameters: dict[str, Any] = {
+            "on": (date.max if self.on is None else self.on).toordinal()
+        }
+        if self.retailer is not None:
+            conditions.append("retailer = :retailer")
+            parameters["retailer"] = self.retailer
+        if self.region is not None:
+            conditions.append("region = :region")
+            parameters["region"] = self.region
+        return " AND ".join(conditions), parameters
+
+
+def read_plan_csv(path: Path) -> dict[str, Any]:
+    """Read a plan from a profile CSV, as imported into a catalog.
+
+    A profile CSV is a header row, a row of 24 hourly charges for each
+    weekday, then labelled rows: "Daily Charge", and optionally "Buy Back",
+    "Retailer", "Region", "Effective", an ISO date, and "Type".
+
+    Returns:
+        The plan's fields, with charges of shape (7, 24). Fields without a
+        row are left out.
+
+    Raises:
+        ValueError if the file isn't in that format.
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        rows = [row for row in csv.reader(file) if len(row) > 0]
+    try:
+        charges = np.array(
+            [[float(value) for value in row[1:25]] for row in rows[1:8]]
+        )
+        labelled = {
+            row[0].strip().lower(): row[1].strip()
+            for row in rows[8:]
+            if len(row) >= 2
+        }
+        fields: dict[str, Any] = {
+            "charges": charges.reshape(7, 24),
+            "daily_charge": float(labelled["daily charge"]),
+            "buy_back": float(labelled.get("buy back", 0)),
+        }
+        if "effective" in labelled:
+            fields["effective_date"] = date.fromisoformat(
+                labelled["effective"]
+            )
+    except (ValueError, KeyError) as e:
+        msg = f"{path}: invalid profile"
+        raise ValueError(msg) from e
+    for label in ("retailer", "region", "type"):
+        if label in labelled:
+            fields[label] = labelled[label]
+    return fields
+
+
+class PlanCatalog:
+    """An indexed database of plans, from any number of profile sets.
+
+    Each plan has the retailer, region and type it is for, and the date its
+    pricing took effect, with its hourly charges packed into a BLOB. A plan
+    can have many pricings, one per effective date. Selecting a subset of
+    plans, and loading their charges, is one indexed query.
+    """
+
+    _lock: threading.Lock
+    connection: sqlite3.Connection
+
+    def __init__(self, db_filepath: str) -> None:
+        """Open a catalog, creating it if it doesn't exist.
+
+        A catalog is safe to share between threads, calls are serialized.
+        """
+        DVU.create_dirs(db_filepath)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(db_filepath, check_same_thread=False)
+        self.connection.executescript(
+            """CREATE TABLE IF NOT EXISTS
+            plans(
+                profile_set TEXT NOT NULL,
+                name TEXT NOT NULL,
+                effective_date INTEGER NOT NULL, -- Gregorian Ordinal day
+                retailer TEXT NOT NULL,
+                region TEXT NOT NULL,
+                plan_type TEXT NOT NULL,
+                daily_charge REAL NOT NULL, -- Cents
+                buy_back REAL NOT NULL, -- Cents per kWh exported
+                charges BLOB NOT NULL, -- Cents per kWh, see _CHARGES_DTYPE
+                PRIMARY KEY (profile_set, name, effective_date)
+            );
+            CREATE INDEX IF NOT EXISTS
+            plans_retailer ON plans (retailer, region, effective_date);
+            CREATE INDEX IF NOT EXISTS
+            plans_region ON plans (region, effective_date);
+            CREATE TABLE IF NOT EXISTS
+            catalog_version(
+                version INTEGER NOT NULL -- Bumped on every import
+            );"""
+        )
+
+    def get_version(self) -> int:
+        """Return a number that changes whenever plans are imported."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT version FROM catalog_version"
+            ).fetchone()
+        return 0 if row is None else row[0]
+
+    def import_profile_set(self, path: Path) -> int:
+        """Import, or update, every plan in a profile set directory.
+
+        Fields without a row in a plan's CSV are inferred: the retailer from
+        the plan's name, before "Low" or "Standard" if either is in it, the
+        region and effective date from a profile set name like
+        "Christchurch-Dec-2024", else the file's modification date, and the
+        type from whether the plan's charges ever change. See
+        read_plan_csv(). A plan dated by its file's modification date whose
+        latest pricing is unchanged keeps that pricing's date, so touching
+        or copying its file doesn't add a pricing.
+
+        Returns:
+            The number of plans imported.
+
+        Raises:
+            ValueError if a plan can't be read.
+        """
+        region, _, pricing = path.name.partition("-")
+        try:
+            set_date = datetime.strptime(pricing, "%b-%Y").date()
+        except ValueError:
+            set_date = None
+        rows = []
+        # Indexes of rows dated by their file's modification date.
+        undated = []
+        for data_path in sorted(path.glob("*.csv")):
+            fields = read_plan_csv(data_path)
+            words = data_path.stem.split("-")
+            retailer_words = next(
+                (
+                    i
+                    for i, word in enumerate(words)
+                    if word in _USER_TYPES and i > 0
+                ),
+                1,
+            )
+            effective_date = fields.get("effective_date", set_date)
+            if effective_date is None:
+                undated.append(len(rows))
+                effective_date = date.fromtimestamp(data_path.stat().st_mtime)
+            charges = fields["charges"]
+            rows.append(
+                (
+                    path.name,
+                    data_path.stem,
+                    effective_date.toordinal(),
+                    fields.get("retailer", "-".join(words[:retailer_words])),
+                    fields.get("region", region),
+                    fields.get(
+                        "type",
+                        "flat" if np.ptp(charges) == 0 else "time of use",
+                    ),
+                    fields["daily_charge"],
+                    fields["buy_back"],
+                    charges.astype(_CHARGES_DTYPE).tobytes(),
+                )
+            )
+        with self._lock, self.connection:
+            latest = {
+                row[0]: row
+                for row in self.connection.execute(
+                    """SELECT name, effective_date, retailer, region,
+                        plan_type, daily_charge, buy_back, charges
+                    FROM plans AS plan
+                    WHERE profile_set = ?
+                    AND effective_date = (
+                        SELECT MAX(effective_date)
+                        FROM plans
+                        WHERE profile_set = plan.profile_set
+                        AND name = plan.name
+                    )""",
+                    (path.name,),
+                )
+            }
+            for i in undated:
+                pricing = latest.get(rows[i][1])
+                if pricing is not None and pricing[2:] == rows[i][3:]:
+                    rows[i] = (*rows[i][:2], pricing[1], *rows[i][3:])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO plans VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if (
+                self.connection.execute(
+                    "UPDATE catalog_version SET version = version + 1"
+                ).rowcount
+                == 0
+            ):
+                self.connection.execute(
+                    "INSERT INTO catalog_version VALUES(1)"
+                )
+        return len(rows)
+
+    def import_profiles(self, profiles_dir: str) -> int:
+        """Import every profile set in a directory, returning plan count."""
+        return sum(
+            self.import_profile_set(path)
+            for path in sorted(Path(profiles_dir).iterdir())
+            if path.is_dir()
+        )
+
+    def get_profile_set_names(self, selection: PlanSelection) -> list[str]:
+        """Return the names of profile sets with any selected plan."""
+        where, parameters = selection.where()
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT DISTINCT profile_set FROM plans WHERE {where}",
+                parameters,
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def has_profile_set(
+        self, profile_set: str, selection: PlanSelection
+    ) -> bool:
+        """Return whether a profile set has any selected plan."""
+        where, parameters = selection.where()
+        with self._lock:
+            row = self.connection.execute(
+                f"""SELECT 1 FROM plans
+                WHERE profile_set = :profile_set AND {where}
+                LIMIT 1""",
+                {**parameters, "profile_set": profile_set},
+            ).fetchone()
+        return row is not None
+
+    def get_plans(
+        self, profile_set: str, selection: PlanSelection
+    ) -> list[CatalogPlan]:
+        """Return a profile set's selected plans, sorted by name.
+
+        Each plan has the pricing that took effect last, on or before the
+        selection's date.
+        """
+        where, parameters = selection.where()
+        with self._lock:
+            rows = self.connection.execute(
+                f"""SELECT name, daily_charge, buy_back, charges
+                FROM plans AS plan
+                WHERE profile_set = :profile_set
+                AND {where}
+                AND effective_date = (
+                    SELECT MAX(effective_date)
+                    FROM plans
+                    WHERE profile_set = plan.profile_set
+                    AND name = plan.name
+                    AND effective_date <= :on
+                )
+                ORDER BY name""",
+                {**parameters, "profile_set": profile_set},
+            ).fetchall()
+        return [
+            (
+                name,
+                daily_charge,
+                buy_back,
+                np.frombuffer(charges, dtype=_CHARGES_DTYPE).reshape(7, 24),
+            )
+            for name, daily_charge, buy_back, charges in rows
+        ]
+
+    def close(self) -> None:
+        """Close the catalog."""
+        with self._lock:
+            self.connection.close()
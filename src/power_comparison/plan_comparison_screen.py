@@ -2,17 +2,23 @@
 
 from __future__ import annotations
 
+import asyncio
+from datetime import date
 from typing import TYPE_CHECKING
 
 import customtkinter as ctk
 from CTkMessagebox import CTkMessagebox
-from customtkinter import StringVar
+from customtkinter import BooleanVar, StringVar
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
-from power_comparison.tkinter_figure import new_figure
+from power_comparison.tkinter_figure import BlitManager, new_figure
+from power_comparison.virtual_list import VirtualList
 
 if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.container import BarContainer
+
     from power_comparison.view import View
 
 
@@ -21,11 +27,20 @@ class PlanComparisonScreen:
 
     _app: View
     _selected_plan_set: ctk.CTkOptionMenu
-    _legend_frame: ctk.CTkScrollableFrame
+    _legend: VirtualList
     _figure: Figure
+    _axes: Axes
+    _time_axes: Axes
+    _bars: BarContainer | None = None
+    _x_limit: int = 0
     _canvas: FigureCanvasTkAgg
+    _blit_manager: BlitManager
     _start_date: StringVar
     _end_date: StringVar
+    _forecast: BooleanVar
+    _exclude_anomalies: BooleanVar
+    # The most plans drawn on the chart over time.
+    _TIME_PLANS = 5
 
     def __init__(self, app: View) -> None:
         """Create PlanComparisonScreen."""
@@ -42,7 +57,7 @@ class PlanComparisonScreen:
         self._app.config_grid(left_frame, [1, 2], [1])
         frame = ctk.CTkFrame(left_frame)
         frame.grid(row=0, column=0)
-        self._app.config_grid(frame, [1, 1, 1, 1], [1, 1])
+        self._app.config_grid(frame, [1, 1, 1, 1, 1, 1, 1], [1, 1])
         # Plan Selection
         ctk.CTkLabel(frame, text="Select group of plans:").grid(
             row=0, column=0, sticky="E"
@@ -66,9 +81,28 @@ class PlanComparisonScreen:
             row=1, column=1
         )
         ctk.CTkEntry(frame, textvariable=self._end_date).grid(row=2, column=1)
-        ctk.CTkButton(frame, text="Compare", command=self.update_plot).grid(
-            row=3, column=0, columnspan=2
-        )
+        self._forecast = BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            frame,
+            text="Forecast the next year",
+            variable=self._forecast,
+        ).grid(row=3, column=0, columnspan=2)
+        self._exclude_anomalies = BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            frame,
+            text="Leave out unusual days",
+            variable=self._exclude_anomalies,
+        ).grid(row=4, column=0, columnspan=2)
+        ctk.CTkButton(
+            frame,
+            text="Compare",
+            command=lambda: asyncio.create_task(self.update_plot()),
+        ).grid(row=5, column=0, columnspan=2)
+        ctk.CTkButton(
+            frame,
+            text="Compare each month",
+            command=lambda: asyncio.create_task(self.update_time_plot()),
+        ).grid(row=6, column=0, columnspan=2)
         self._app.set_padding(frame, 5, 5)
         # Graph
         graph_frame = ctk.CTkFrame(window_root)
@@ -76,20 +110,8 @@ class PlanComparisonScreen:
         self._app.config_grid(graph_frame, [1], [1])
         self.setup_plot(graph_frame)
         # Legend
-        self._legend_frame = ctk.CTkScrollableFrame(left_frame)
-        self._legend_frame.grid(row=1, column=0, sticky="NESW")
-        self._legend_frame.bind_all(
-            "<Button-4>",
-            lambda _: self._legend_frame._parent_canvas.yview(
-                "scroll", -1, "units"
-            ),
-        )
-        self._legend_frame.bind_all(
-            "<Button-5>",
-            lambda _: self._legend_frame._parent_canvas.yview(
-                "scroll", 1, "units"
-            ),
-        )
+        self._legend = VirtualList(left_frame)
+        self._legend.grid(row=1, column=0, sticky="NESW")
         # Back Button
         back_frame = ctk.CTkFrame(window_root)
         back_frame.grid(row=0, column=0, sticky="NW")
@@ -98,55 +120,142 @@ class PlanComparisonScreen:
         ).grid()
         self._app.set_padding(back_frame, 5, 5)
 
-    def update_plot(self) -> None:
+    async def update_plot(self) -> None:
         """Event handler for compare being clicked."""
-        result = self._app.get_controller().get_comparison_data(
-            self._selected_plan_set.get(),
-            self._start_date.get(),
-            self._end_date.get(),
-        )
+        controller = self._app.get_controller()
+        with self._app.busy():
+            try:
+                result = await controller.get_comparison_data_async(
+                    self._selected_plan_set.get(),
+                    self._start_date.get(),
+                    self._end_date.get(),
+                    self._forecast.get(),
+                    self._exclude_anomalies.get(),
+                )
+            except asyncio.CancelledError:
+                return
+        if not self._canvas.get_tk_widget().winfo_exists():
+            return
         if isinstance(result, tuple):
             CTkMessagebox(title=result[0], message=result[1], icon="cancel")
             return
-        self._figure.clear()
-        axes = self._figure.add_subplot()
-        y_axis = [str(i) for i in range(1, len(result) + 1)]
-        x_axis = [p[1] for p in result]
-        axes.set_title(
+        costs = [cost for _, cost in result]
+        self._axes.title.set_text(
             f"Comparison of power plans for {self._selected_plan_set.get()}"
         )
-        minor_x_ticks = range(0, int(x_axis[-1]), 100)
-        major_x_ticks = range(0, int(x_axis[-1]), 200)
-        axes.set_xlabel("Estimated cost of plan in a year ($)")
-        axes.set_xticks(major_x_ticks)
-        axes.tick_params(axis="x", labelrotation=45)
-        axes.set_xticks(minor_x_ticks, minor=True)
-        axes.grid(visible=True, which="both", axis="x")
-        axes.grid(which="minor", alpha=0.3)
-        axes.set_ylabel("Power Plan")
-        axes.yaxis.set_inverted(True)
-        axes.set_yticks(range(len(y_axis)), labels=y_axis)
-        axes.set_yticklabels(y_axis)
-        axes.barh(y_axis, x_axis)
-        self._canvas.draw()
+        # Only redraw the whole figure when the axes change, otherwise
+        # just the bars and title are redrawn.
+        redraw = self.update_axes(len(costs), max(costs))
+        for bar, cost in zip(self._bars, costs):
+            bar.set_width(cost)
+        if redraw:
+            self._canvas.draw_idle()
+        else:
+            self._blit_manager.update()
         self.update_legend(result)
 
+    async def update_time_plot(self) -> None:
+        """Event handler for compare each month being clicked."""
+        controller = self._app.get_controller()
+        with self._app.busy():
+            try:
+                result = await controller.get_comparison_over_time_data_async(
+                    self._selected_plan_set.get(),
+                    self._start_date.get(),
+                    self._end_date.get(),
+                )
+            except asyncio.CancelledError:
+                return
+        if not self._canvas.get_tk_widget().winfo_exists():
+            return
+        if isinstance(result, tuple):
+            CTkMessagebox(title=result[0], message=result[1], icon="cancel")
+            return
+        names = result["plans"]
+        costs = result["costs"]
+        month_dates = [
+            date.fromisoformat(month) for month in result["windows"]
+        ]
+        best = [min(range(len(names)), key=row.__getitem__) for row in costs]
+        # Draws the plans cheapest in the most months, then those cheapest
+        # on average, to compare them with.
+        totals = [
+            sum(row[plan] for row in costs) for plan in range(len(names))
+        ]
+        shown = sorted(set(best), key=lambda plan: -best.count(plan))
+        shown += [
+            plan
+            for plan in sorted(range(len(names)), key=totals.__getitem__)
+            if plan not in shown
+        ]
+        self._axes.set_visible(False)
+        self._blit_manager.set_artists([])
+        self._time_axes.clear()
+        self._time_axes.set_visible(True)
+        for plan in shown[: self._TIME_PLANS]:
+            self._time_axes.plot(
+                month_dates,
+                [row[plan] for row in costs],
+                marker="o",
+                label=names[plan],
+            )
+        self._time_axes.set_title(
+            f"Cheapest power plans each month for "
+            f"{self._selected_plan_set.get()}"
+        )
+        self._time_axes.set_ylabel("Estimated cost of plan in a year ($)")
+        self._time_axes.grid(visible=True, axis="y")
+        self._time_axes.legend()
+        self._time_axes.tick_params(axis="x", labelrotation=45)
+        self._canvas.draw_idle()
+        self._legend.set_rows(
+            [
+                (
+                    f"{month:%b %Y} {names[plan]}",
+                    f"${costs[i][plan]:.2f}",
+                )
+                for i, (month, plan) in enumerate(zip(month_dates, best))
+            ]
+        )
+
+    def update_axes(self, plan_count: int, max_cost: float) -> bool:
+        """Fit the axes and bars to the plans, returning if they changed."""
+        changed = not self._axes.get_visible()
+        self._axes.set_visible(True)
+        self._time_axes.set_visible(False)
+        if self._bars is None or len(self._bars) != plan_count:
+            if self._bars is not None:
+                self._bars.remove()
+            self._bars = self._axes.barh(
+                range(plan_count), [0] * plan_count, color="C0"
+            )
+            changed = True
+        if changed:
+            self._blit_manager.set_artists([self._axes.title, *self._bars])
+            ranks = [str(i) for i in range(1, plan_count + 1)]
+            self._axes.set_yticks(range(plan_count), labels=ranks)
+            self._axes.set_ylim(plan_count - 0.5, -0.5)
+        x_limit = (int(max_cost) // 200 + 1) * 200
+        if x_limit != self._x_limit:
+            self._x_limit = x_limit
+            self._axes.set_xlim(0, x_limit)
+            self._axes.set_xticks(range(0, x_limit + 1, 200))
+            self._axes.set_xticks(range(0, x_limit + 1, 100), minor=True)
+            changed = True
+        return changed
+
     def update_legend(self, info: list[tuple[str, float]]) -> None:
         """Update the legend with power plan information.
 
         Args:
             info: A list of power plan names, and estimated prices.
         """
-        for widget in self._legend_frame.winfo_children():
-            widget.destroy()
-        for i, (name, value) in enumerate(info):
-            ctk.CTkLabel(
-                self._legend_frame,
-                text=f"#{i + 1:<2} {name}",
-            ).grid(row=i, column=0, sticky="W")
-            ctk.CTkLabel(self._legend_frame, text=f"${value:.2f}").grid(
-                row=i, column=1, sticky="E", padx=5
-            )
+        self._legend.set_rows(
+            [
+                (f"#{i + 1:<2} {name}", f"${value:.2f}")
+                for i, (name, value) in enumerate(info)
+            ]
+        )
 
     def setup_plot(self, frame: ctk.CTkFrame) -> None:
         """Setup comparison plot."""
@@ -156,4 +265,14 @@ class PlanComparisonScreen:
             self._app.get_foreground_color(),
         )
         self._figure.subplots_adjust(left=0.2)
+        self._blit_manager = BlitManager(self._canvas)
+        self._axes = self._figure.add_subplot()
+        self._axes.set_xlabel("Estimated cost of plan in a year ($)")
+        self._axes.tick_params(axis="x", labelrotation=45)
+        self._axes.grid(visible=True, which="both", axis="x")
+        self._axes.grid(which="minor", alpha=0.3)
+        self._axes.set_ylabel("Power Plan")
+        self._axes.set_visible(False)
+        self._time_axes = self._figure.add_subplot()
+        self._time_axes.set_visible(False)
         self._canvas.get_tk_widget().grid(row=0, column=0, sticky="NESW")
@@ -0,0 +1,20 @@
+"""Shared styling for matplotlib figures, without depending on Tkinter."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def figure_style(bg_color: str, fg_color: str) -> dict[str, Any]:
+    """Return the matplotlib rcParams used to style figures."""
+    return {
+        "axes.spines.top": False,
+        "axes.spines.bottom": False,
+        "axes.spines.left": False,
+        "axes.spines.right": False,
+        "axes.facecolor": bg_color,
+        "text.color": fg_color,
+        "axes.labelcolor": fg_color,
+        "xtick.color": fg_color,
+        "ytick.color": fg_color,
+    }
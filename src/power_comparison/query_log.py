@@ -0,0 +1,150 @@
+"""Define the QueryLog class."""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = logging.getLogger(__name__)
+# Literals, as traced statements have their parameters filled in: strings,
+# blobs and numbers not part of a name.
+_LITERAL = re.compile(
+    r"[xX]?'(?:[^']|'')*'|(?<![\w.])\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b"
+)
+# Lists of parameters, which vary in length with the values passed.
+_PARAMETER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def _query_shape(statement: str) -> str:
+    """Return a statement with its literals replaced by parameters.
+
+    Statements that only differ in the values they were run with have the
+    same shape, and so the same query plan.
+    """
+    shape = _LITERAL.sub("?", " ".join(statement.split()))
+    return _PARAMETER_LIST.sub("?", shape)
+
+
+class QueryLog:
+    """Log every statement run on a connection with its duration.
+
+    Statements slower than a threshold are logged as warnings with their
+    query plan, to spot full scans and missing indexes. A statement's
+    duration runs from when SQLite starts it until the next statement
+    starts or finish() is called, so includes fetching its rows.
+    """
+
+    _PROGRESS_STEPS = 1000
+    _EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+    _connection: sqlite3.Connection
+    _slow_ms: float
+    _current: str | None = None
+    _start: float = 0
+    _steps: int = 0
+    _slow: list[tuple[str, float, int]]
+    _explained: set[str]
+
+    def __init__(
+        self, connection: sqlite3.Connection, slow_ms: float = 100
+    ) -> None:
+        """Start logging the connection's statements.
+
+        Args:
+            connection: The connection to log.
+            slow_ms: Statements taking at least this long have their query
+                plan logged.
+        """
+        self._connection = connection
+        self._slow_ms = slow_ms
+        self._slow = []
+        self._explained = set()
+        self._install()
+
+    def _install(self) -> None:
+        """Set the connection's callbacks."""
+        self._connection.set_trace_callback(self._on_statement)
+        self._connection.set_progress_handler(
+            self._on_progress, self._PROGRESS_STEPS
+        )
+
+    def _uninstall(self) -> None:
+        """Remove the connection's callbacks."""
+        self._connection.set_trace_callback(None)
+        self._connection.set_progress_handler(None, 0)
+
+    def _on_statement(self, statement: str) -> None:
+        """Finish timing the last statement, and start timing this one."""
+        now = time.perf_counter()
+        self._end_statement(now)
+        self._current = statement
+        self._start = now
+        self._steps = 0
+
+    def _on_progress(self) -> int:
+        """Count SQLite virtual machine steps, to hint at rows scanned."""
+        self._steps += self._PROGRESS_STEPS
+        return 0
+
+    def _end_statement(self, now: float) -> None:
+        """Log the current statement, if any."""
+        if self._current is None:
+            return
+        duration_ms = 1000 * (now - self._start)
+        logger.debug(
+            "%.3f ms, %d steps: %s",
+            duration_ms,
+            self._steps,
+            " ".join(self._current.split()),
+        )
+        if duration_ms >= self._slow_ms:
+            self._slow.append((self._current, duration_ms, self._steps))
+        self._current = None
+
+    def finish(self) -> None:
+        """Finish timing the last statement, and explain any slow ones.
+
+        Call once the connection's results have been fetched. Statements
+        can't be explained while another is running, so are explained here.
+        """
+        self._end_statement(time.perf_counter())
+        if len(self._slow) == 0:
+            return
+        slow, self._slow = self._slow, []
+        self._uninstall()
+        try:
+            for statement, duration_ms, steps in slow:
+                logger.warning(
+                    "Slow query, %.1f ms, %d steps: %s%s",
+                    duration_ms,
+                    steps,
+                    " ".join(statement.split()),
+                    self._explain(statement),
+                )
+        finally:
+            self._install()
+
+    def _explain(self, statement: str) -> str:
+        """Return the statement's query plan, indented for the log.
+
+        Each query shape, see _query_shape(), is only explained once, and
+        statements that can't be explained return an empty string.
+        """
+        shape = _query_shape(statement)
+        if (
+            not statement.lstrip().upper().startswith(self._EXPLAINABLE)
+            or shape in self._explained
+        ):
+            return ""
+        self._explained.add(shape)
+        try:
+            rows = self._connection.execute(
+                f"EXPLAIN QUERY PLAN {statement}"
+            ).fetchall()
+        except Exception as e:  # noqa: BLE001
+            return f"\n    Couldn't explain: {e}"
+        return "".join(f"\n    {row[-1]}" for row in rows)
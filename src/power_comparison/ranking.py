@@ -0,0 +1,65 @@
+"""Rank plans for every user in the database at once."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from power_comparison.data import Data, Profiles
+
+Ranking = tuple[str, str, float, float]
+
+
+def rank_all_users(
+    data: Data,
+    profiles: Profiles,
+    profile_set: str,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[Ranking] | None:
+    """Find every user's cheapest plan and store it in the database.
+
+    Every user's average usage is read in one scan and costed against every
+    plan in one contraction, so this is much faster than comparing plans
+    user by user.
+
+    Args:
+        data: The database to read usage from and write rankings to.
+        profiles: The profile sets.
+        profile_set: The profile set to rank plans from.
+        start_date:
+            Defaults to one year before end_date. The first date to include.
+        end_date:
+            Defaults to today. The last date to include.
+
+    Returns:
+        None if profile_set is not valid, else tuples of username, best plan,
+        its yearly cost, and its yearly savings against the user's median
+        plan, all monetary values in dollars. Users without a full week of
+        usage are left out.
+    """
+    if end_date is None:
+        end_date = date.today()
+    if start_date is None:
+        start_date = end_date - timedelta(days=365)
+    usernames, usages = data.get_all_average_usage(start_date, end_date)
+    plan_costs = profiles.get_plan_costs(usages, profile_set)
+    if plan_costs is None:
+        return None
+    names, costs = plan_costs
+    rankings: list[Ranking] = []
+    if len(usernames) != 0 and len(names) != 0:
+        best = np.argmin(costs, axis=1)
+        best_costs = np.take_along_axis(costs, best[:, None], axis=1)[:, 0]
+        savings = np.median(costs, axis=1) - best_costs
+        rankings = [
+            (username, names[plan], float(cost), float(saving))
+            for username, plan, cost, saving in zip(
+                usernames, best, best_costs, savings
+            )
+        ]
+    data.set_plan_rankings(profile_set, start_date, end_date, rankings)
+    return rankings
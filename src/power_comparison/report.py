@@ -0,0 +1,265 @@
+"""Render usage and plan comparison reports without a display."""
+
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar
+
+import matplotlib as mpl
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from power_comparison.data import Data, Profiles
+from power_comparison.plot_style import figure_style
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from datetime import date
+
+    from matplotlib.axes import Axes
+    from matplotlib.container import BarContainer
+
+    from power_comparison.plan_catalog import PlanSelection
+
+# The light theme's colors, as reports are usually printed or emailed.
+_BACKGROUND_COLOR = "#f5f5ed"
+_FOREGROUND_COLOR = "#262624"
+
+
+class ReportRenderer:
+    """Render reports, reusing one figure and its artists for all of them.
+
+    Creating a figure and its axes costs more than drawing them, so each
+    report only updates the bars, and the comparison's bars are only
+    recreated when the number of plans changes.
+    """
+
+    _figure: Figure
+    _usage_axes: Axes
+    _usage_bars: BarContainer
+    _comparison_axes: Axes
+    _comparison_bars: BarContainer | None = None
+
+    def __init__(self) -> None:
+        """Initialize the ReportRenderer, styling matplotlib to match."""
+        mpl.rcParams.update(figure_style(_BACKGROUND_COLOR, _FOREGROUND_COLOR))
+        self._figure = Figure(figsize=(8.27, 11.69))
+        self._figure.patch.set_facecolor(_BACKGROUND_COLOR)
+        FigureCanvasAgg(self._figure)
+        self._usage_axes, self._comparison_axes = self._figure.subplots(
+            2, 1, height_ratios=[1, 2]
+        )
+        self._figure.subplots_adjust(left=0.38, hspace=0.3)
+        self._usage_axes.set_xticks(range(24))
+        self._usage_axes.tick_params(axis="x", labelsize="small")
+        self._usage_axes.set_title("Average Power Usage Per Hour")
+        self._usage_axes.set_xlabel("Hour of day")
+        self._usage_axes.set_ylabel("Power Usage (KWh)")
+        self._usage_axes.grid(visible=True, which="both", axis="y")
+        self._usage_bars = self._usage_axes.bar(range(24), [0] * 24)
+        self._comparison_axes.set_title("Comparison of power plans")
+        self._comparison_axes.set_xlabel(
+            "Estimated cost of plan in a year ($)"
+        )
+        self._comparison_axes.tick_params(axis="x", labelrotation=45)
+        self._comparison_axes.grid(visible=True, which="both", axis="x")
+        self._comparison_axes.grid(which="minor", alpha=0.3)
+
+    def render(
+        self,
+        path: Path,
+        title: str,
+        usage: list[float],
+        comparison: list[tuple[str, float]],
+    ) -> None:
+        """Render a report to path, in the format given by its suffix.
+
+        Args:
+            path: The file to write.
+            title: The report's title.
+            usage: The average usage for each hour of the day.
+            comparison: Plan names and yearly costs, cheapest first.
+        """
+        self._figure.suptitle(title)
+        for bar, value in zip(self._usage_bars, usage):
+            bar.set_height(value)
+        self._usage_axes.relim()
+        self._usage_axes.autoscale_view()
+        plan_count = len(comparison)
+        if self._comparison_bars is None or (
+            len(self._comparison_bars) != plan_count
+        ):
+            if self._comparison_bars is not None:
+                self._comparison_bars.remove()
+            self._comparison_bars = self._comparison_axes.barh(
+                range(plan_count), [0] * plan_count, color="C0"
+            )
+            self._comparison_axes.set_ylim(plan_count - 0.5, -0.5)
+        self._comparison_axes.set_yticks(
+            range(plan_count), labels=[name for name, _ in comparison]
+        )
+        for bar, (_, cost) in zip(self._comparison_bars, comparison):
+            bar.set_width(cost)
+        x_limit = (int(max(cost for _, cost in comparison)) // 200 + 1) * 200
+        self._comparison_axes.set_xlim(0, x_limit)
+        self._comparison_axes.set_xticks(range(0, x_limit + 1, 200))
+        self._comparison_axes.set_xticks(
+            range(0, x_limit + 1, 100), minor=True
+        )
+        self._figure.savefig(path, facecolor=_BACKGROUND_COLOR)
+
+
+class ReportWorker:
+    """Render users' reports in a worker process.
+
+    Each process has one worker, with its own database connection and
+    renderer, set up by initialize() when the process starts.
+    """
+
+    _instance: ClassVar[ReportWorker | None] = None
+    _data: Data
+    _profiles: Profiles
+    _renderer: ReportRenderer
+    _profile_set: str
+    _window: tuple[date, date] | None
+    _output_dir: Path
+    _output_format: str
+
+    def __init__(
+        self,
+        db_filepath: str | None,
+        profiles_dir: str | None,
+        catalog_filepath: str | None,
+        selection: PlanSelection | None,
+        profile_set: str,
+        window: tuple[date, date] | None,
+        output_dir: str,
+        output_format: str,
+    ) -> None:
+        """Initialize the ReportWorker. See render_reports() for arguments."""
+        # render_reports() has already initialized the database.
+        self._data = Data(db_filepath, initialize=False)
+        self._profiles = Profiles(
+            profiles_dir,
+            catalog_filepath=catalog_filepath,
+            selection=selection,
+        )
+        self._renderer = ReportRenderer()
+        self._profile_set = profile_set
+        self._window = window
+        self._output_dir = Path(output_dir)
+        self._output_format = output_format
+
+    @classmethod
+    def initialize(cls, *args: object) -> None:
+        """Create this process's worker, passing args to it."""
+        cls._instance = cls(*args)
+
+    @classmethod
+    def render_user(cls, username: str) -> tuple[str, str | None]:
+        """Render a user's report with this process's worker.
+
+        Returns:
+            The username, and the report's path, or None if the user
+            doesn't exist or has no data in the window.
+        """
+        if cls._instance is None:
+            msg = "ReportWorker: initialize not called"
+            raise ValueError(msg)
+        return username, cls._instance._render(username)
+
+    def _render(self, username: str) -> str | None:
+        """Render a user's report, returning its path, or None if no data."""
+        if not self._data.select_user(username):
+            return None
+        if self._window is None:
+            end = self._data.get_last_date()
+            if end is None:
+                return None
+            start = end - timedelta(days=365)
+        else:
+            start, end = self._window
+        usage = self._data.get_usage_per_hour(start, end)
+        average_usage = self._data.get_average_usage(start, end)
+        if usage is None or average_usage is None:
+            return None
+        hourly_usage = (
+            self._data.get_hourly_usage(start, end)
+            if self._profiles.has_spot_plans(self._profile_set)
+            else None
+        )
+        comparison = self._profiles.generate_plan_comparison(
+            average_usage, self._profile_set, hourly_usage
+        )
+        if comparison is None or len(comparison) == 0:
+            return None
+        path = self._output_dir / (
+            re.sub(r"[^\w.@-]", "_", username) + "." + self._output_format
+        )
+        self._renderer.render(
+            path,
+            f"{username}: {start.isoformat()} to {end.isoformat()}",
+            usage,
+            comparison,
+        )
+        return str(path)
+
+
+def render_reports(
+    usernames: list[str],
+    profile_set: str,
+    output_dir: str,
+    *,
+    db_filepath: str | None = None,
+    profiles_dir: str | None = None,
+    catalog_filepath: str | None = None,
+    selection: PlanSelection | None = None,
+    window: tuple[date, date] | None = None,
+    output_format: str = "pdf",
+    workers: int | None = None,
+) -> Iterator[tuple[str, str | None]]:
+    """Render users' reports across a pool of processes.
+
+    Args:
+        usernames: The users to render reports for.
+        profile_set: The profile set to compare plans from.
+        output_dir: The directory to write reports to, one per user.
+        db_filepath: Defaults to the user's data directory.
+        profiles_dir: Defaults to the profiles shipped with the app.
+        catalog_filepath: If given, read plans from this plan catalog.
+        selection: Which of the catalog's plans to use, see Profiles.
+        window: The dates to report on. Defaults to the year up to each
+            user's last date.
+        output_format: A format matplotlib can save, e.g. "pdf" or "png".
+        workers: Defaults to the number of processors.
+
+    Yields:
+        Each username, in order, and its report's path, or None if the user
+        doesn't exist or has no data in the window.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    # Migrates the database once, rather than in every worker at once.
+    Data(db_filepath).close()
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=ReportWorker.initialize,
+        initargs=(
+            db_filepath,
+            profiles_dir,
+            catalog_filepath,
+            selection,
+            profile_set,
+            window,
+            output_dir,
+            output_format,
+        ),
+    ) as executor:
+        chunksize = max(1, len(usernames) // (4 * workers))
+        yield from executor.map(
+            ReportWorker.render_user, usernames, chunksize=chunksize
+        )
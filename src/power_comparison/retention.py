@@ -0,0 +1,74 @@
+"""Keep the usage database's size bounded as it ages."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from power_comparison.data import Data
+
+
+class RetentionPolicy:
+    """Keep recent usage hourly, roll up older usage, and compact the file.
+
+    Rolled up usage is summed per month, weekday and hour, so plan
+    comparisons over old windows still work, at month granularity.
+    """
+
+    _keep_years: int | None
+    _vacuum_pages: int
+
+    def __init__(
+        self, keep_years: int | None = None, vacuum_pages: int = 4096
+    ) -> None:
+        """Initialize the RetentionPolicy.
+
+        Args:
+            keep_years: Years of hourly usage to keep. Defaults to keeping
+                all of it, only compacting.
+            vacuum_pages: The most free pages to return to the filesystem
+                each time the policy is applied.
+        """
+        if keep_years is not None and keep_years < 1:
+            msg = "RetentionPolicy: keep_years must be at least 1"
+            raise ValueError(msg)
+        self._keep_years = keep_years
+        self._vacuum_pages = vacuum_pages
+
+    def get_cutoff(self, today: date | None = None) -> date | None:
+        """Return the first date kept hourly, or None if all are kept."""
+        if self._keep_years is None:
+            return None
+        if today is None:
+            today = date.today()
+        return date(today.year - self._keep_years, today.month, 1)
+
+    def apply(
+        self,
+        data: Data,
+        today: date | None = None,
+        *,
+        background: bool = False,
+    ) -> int:
+        """Roll up usage older than the cutoff, then compact the database.
+
+        Safe to call from a background thread, as Data serializes calls.
+
+        Args:
+            data: The database to apply the policy to.
+            today: The date to keep years of usage up to, defaults to today.
+            background: Defaults to False. Whether other connections may be
+                using the database, as with the sync daemon. Compacting
+                holds the write lock they would wait on, so then the
+                database is only compacted if usage was rolled up, and
+                never converted by a full VACUUM, see Data.compact().
+
+        Returns:
+            The number of hourly rows rolled up.
+        """
+        cutoff = self.get_cutoff(today)
+        rows = 0 if cutoff is None else data.rollup_usage(cutoff)
+        if not background or rows > 0:
+            data.compact(self._vacuum_pages, convert=not background)
+        return rows
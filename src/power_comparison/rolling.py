@@ -0,0 +1,21 @@
+"""Split ranges of usage into windows to compare plans over."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+
+def month_windows(start: date, end: date) -> list[tuple[date, date]]:
+    """Split the days between two dates into calendar months.
+
+    Like Data.get_average_usage(), windows exclude both their dates, so the
+    window for a month is from the day before its first day until the first
+    day of the next month. The first and last windows are cut to the range.
+    """
+    windows = []
+    first = start + timedelta(days=1)
+    while first < end:
+        next_month = (first.replace(day=1) + timedelta(days=32)).replace(day=1)
+        windows.append((first - timedelta(days=1), min(next_month, end)))
+        first = next_month
+    return windows
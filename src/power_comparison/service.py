@@ -0,0 +1,391 @@
+"""Serve usage data and plan comparisons as a JSON HTTP API."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+
+from power_comparison import instrumentation
+from power_comparison.cache import ResultCache
+from power_comparison.controller import Controller
+from power_comparison.data import Data, Profiles
+from power_comparison.instrumentation import LatencyMetrics
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable
+
+
+class ControllerPool:
+    """A pool of controllers, each with its own database connection.
+
+    Every controller shares one Profiles, so plan sets are parsed once, one
+    ResultCache, and one executor for background work. Only the first
+    connection migrates the database.
+    """
+
+    _controllers: asyncio.Queue[Controller]
+    _data: list[Data]
+    _executor: ThreadPoolExecutor
+
+    def __init__(
+        self,
+        size: int,
+        db_filepath: str | None,
+        profiles: Profiles,
+        slow_query_ms: float | None = None,
+    ) -> None:
+        """Initialize the pool, opening size connections.
+
+        See Data for slow_query_ms.
+        """
+        cache = ResultCache()
+        self._controllers = asyncio.Queue()
+        self._data = []
+        self._executor = Controller.create_executor()
+        for i in range(size):
+            data = Data(
+                db_filepath, slow_query_ms=slow_query_ms, initialize=i == 0
+            )
+            self._data.append(data)
+            self._controllers.put_nowait(
+                Controller(data, profiles, cache, executor=self._executor)
+            )
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Controller]:
+        """Borrow a controller, waiting for one to be free."""
+        controller = await self._controllers.get()
+        try:
+            yield controller
+        finally:
+            self._controllers.put_nowait(controller)
+
+    def close(self) -> None:
+        """Close every controller and connection."""
+        while not self._controllers.empty():
+            self._controllers.get_nowait().close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for data in self._data:
+            data.close()
+
+
+class Service:
+    """The HTTP API's request handlers."""
+
+    _pool: ControllerPool
+    _executor: ThreadPoolExecutor
+    _metrics: LatencyMetrics
+
+    def __init__(self, pool: ControllerPool, threads: int) -> None:
+        """Initialize the Service."""
+        self._pool = pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="service"
+        )
+        self._metrics = LatencyMetrics()
+
+    def build_app(self) -> web.Application:
+        """Return the aiohttp application."""
+        app = web.Application(middlewares=[self._metrics_middleware])
+        app.add_routes(
+            [
+                web.get("/profile-sets", self.profile_sets),
+                web.get("/users", self.users),
+                web.get("/users/{user}/usage", self.usage),
+                web.get("/users/{user}/comparison", self.comparison),
+                web.get("/users/{user}/peers", self.peers),
+                web.get("/metrics", self.metrics),
+                web.get("/metrics/spans", self.spans),
+            ]
+        )
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    async def _cleanup(self, _: web.Application) -> None:
+        """Release the pool and threads."""
+        self._executor.shutdown(wait=True)
+        self._pool.close()
+
+    @web.middleware
+    async def _metrics_middleware(
+        self,
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        """Record every request's latency under its route."""
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            route = request.match_info.route.resource
+            name = "unmatched" if route is None else route.canonical
+            self._metrics.record(name, 1000 * (time.perf_counter() - start))
+
+    async def _run(
+        self, username: str | None, func: Callable[[Controller], Any]
+    ) -> Any:
+        """Run func with a pooled controller in a thread.
+
+        Raises:
+            web.HTTPNotFound if username is given and doesn't exist.
+        """
+
+        def run(controller: Controller) -> Any:
+            if username is not None and not controller.select_user(username):
+                raise web.HTTPNotFound(text=f"Unknown user: {username}")
+            return func(controller)
+
+        async with self._pool.acquire() as controller:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, run, controller
+            )
+
+    @staticmethod
+    def _get_dates(
+        request: web.Request, controller: Controller
+    ) -> tuple[date, date]:
+        """Return the request's start and end dates.
+
+        They default to the year up to the user's last date.
+
+        Raises:
+            web.HTTPBadRequest if a date isn't an ISO date.
+        """
+        try:
+            end = (
+                date.fromisoformat(request.query["end"])
+                if "end" in request.query
+                else controller.get_last_date()
+            )
+            start = (
+                date.fromisoformat(request.query["start"])
+                if "start" in request.query
+                else end - timedelta(days=365)
+            )
+        except ValueError as e:
+            raise web.HTTPBadRequest(text="Dates must be YYYY-MM-DD") from e
+        return start, end
+
+    @staticmethod
+    def _error(result: tuple[str, str]) -> web.HTTPException:
+        """Return an HTTP error for a controller's error title and message."""
+        if result[0] == "No Data":
+            return web.HTTPNotFound(text=result[1])
+        return web.HTTPBadRequest(text=result[1])
+
+    async def profile_sets(self, _: web.Request) -> web.Response:
+        """Return the names of the profile sets."""
+        names = await self._run(
+            None, lambda controller: controller.get_profile_set_names()
+        )
+        return web.json_response({"profile_sets": names})
+
+    async def users(self, _: web.Request) -> web.Response:
+        """Return every user's username."""
+        usernames = await self._run(
+            None, lambda controller: controller.get_usernames()
+        )
+        return web.json_response({"users": usernames})
+
+    async def usage(self, request: web.Request) -> web.Response:
+        """Return a user's average usage per hour between two dates."""
+
+        def query(controller: Controller) -> dict[str, Any]:
+            start, end = self._get_dates(request, controller)
+            result = controller.get_usage_for_range(start, end)
+            if isinstance(result, tuple):
+                raise self._error(result)
+            return {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "usage": result,
+            }
+
+        user = request.match_info["user"]
+        result = await self._run(user, query)
+        return web.json_response({"user": user, **result})
+
+    async def comparison(self, request: web.Request) -> web.Response:
+        """Return the plans in a profile set ranked by a user's yearly cost."""
+        if "profile_set" not in request.query:
+            raise web.HTTPBadRequest(text="profile_set is required")
+        try:
+            top = int(request.query["top"]) if "top" in request.query else None
+        except ValueError as e:
+            raise web.HTTPBadRequest(text="top must be an integer") from e
+
+        forecast = request.query.get("forecast", "") in ("1", "true")
+        exclude_anomalies = request.query.get("exclude_anomalies", "") in (
+            "1",
+            "true",
+        )
+
+        def query(controller: Controller) -> dict[str, Any]:
+            start, end = self._get_dates(request, controller)
+            result = controller.compare_plans(
+                request.query["profile_set"],
+                start,
+                end,
+                forecast,
+                exclude_anomalies,
+            )
+            if isinstance(result, tuple):
+                raise self._error(result)
+            return {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "plans": [
+                    {"plan": plan, "cost": cost} for plan, cost in result[:top]
+                ],
+            }
+
+        user = request.match_info["user"]
+        result = await self._run(user, query)
+        return web.json_response(
+            {
+                "user": user,
+                "profile_set": request.query["profile_set"],
+                **result,
+            }
+        )
+
+    async def peers(self, request: web.Request) -> web.Response:
+        """Return a user's usage and best plan cost percentiles."""
+        if "profile_set" not in request.query:
+            raise web.HTTPBadRequest(text="profile_set is required")
+
+        def query(controller: Controller) -> dict[str, Any]:
+            start, end = self._get_dates(request, controller)
+            result = controller.compare_with_peers(
+                request.query["profile_set"], start, end
+            )
+            if isinstance(result, tuple):
+                raise self._error(result)
+            return {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                **result,
+            }
+
+        user = request.match_info["user"]
+        result = await self._run(user, query)
+        return web.json_response(
+            {
+                "user": user,
+                "profile_set": request.query["profile_set"],
+                **result,
+            }
+        )
+
+    async def metrics(self, _: web.Request) -> web.Response:
+        """Return request counts and latencies per route for this worker."""
+        return web.json_response(self._metrics.summary())
+
+    async def spans(self, _: web.Request) -> web.Response:
+        """Return timing spans for this worker, empty unless profiling."""
+        return web.json_response(instrumentation.summary())
+
+
+def create_app(
+    db_filepath: str | None = None,
+    profiles_dir: str | None = None,
+    pool_size: int = 8,
+    slow_query_ms: float | None = None,
+) -> web.Application:
+    """Return the service's aiohttp application."""
+    pool = ControllerPool(
+        pool_size, db_filepath, Profiles(profiles_dir), slow_query_ms
+    )
+    return Service(pool, pool_size).build_app()
+
+
+def _run_worker(args: argparse.Namespace) -> None:
+    """Serve requests in this process."""
+    if args.profile is not None:
+        instrumentation.enable(args.profile)
+    else:
+        instrumentation.enable_from_environment()
+    if args.slow_query_ms is not None:
+        logging.basicConfig(
+            level=logging.WARNING,
+            format="%(asctime)s %(levelname)s %(message)s",
+        )
+    web.run_app(
+        create_app(
+            args.db, args.profiles_dir, args.pool_size, args.slow_query_ms
+        ),
+        host=args.host,
+        port=args.port,
+        reuse_port=args.workers > 1,
+        print=None if args.workers > 1 else print,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for the HTTP service."""
+    parser = argparse.ArgumentParser(
+        prog="power-comparison-service", description=__doc__
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", help="path to the usage database")
+    parser.add_argument(
+        "--profiles-dir", help="path to the directory of profile sets"
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=8,
+        help="database connections per worker (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes sharing the port, which needs SO_REUSEPORT "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="time spans of work and write them as JSON to FILE on exit, "
+        "or - for stderr, with one worker. See /metrics/spans otherwise",
+    )
+    parser.add_argument(
+        "--slow-query-ms",
+        type=float,
+        metavar="MS",
+        help="log SQL statements taking at least MS milliseconds, with "
+        "their query plans, to stderr",
+    )
+    args = parser.parse_args(argv)
+    if args.workers == 1:
+        _run_worker(args)
+        return
+    print(
+        f"Serving on http://{args.host}:{args.port} with {args.workers} workers"
+    )
+    workers = [
+        multiprocessing.Process(target=_run_worker, args=(args,))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Simulate rooftop solar and home batteries, and cost plans on the result."""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+    from datetime import date
+
+    from power_comparison.data import Profiles
+
+SELF_CONSUMPTION = "self-consumption"
+GRID_CHARGE = "grid-charge"
+POLICIES = (SELF_CONSUMPTION, GRID_CHARGE)
+
+# The day of the year in the middle of each month.
+_MID_MONTH_DAYS = np.array(
+    [15, 46, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349]
+)
+
+
+class Battery:
+    """A home battery's size, power and efficiency."""
+
+    capacity_kwh: float
+    power_kw: float
+    round_trip_efficiency: float
+
+    def __init__(
+        self,
+        capacity_kwh: float,
+        power_kw: float,
+        round_trip_efficiency: float = 0.9,
+    ) -> None:
+        """Initialize the Battery.
+
+        Args:
+            capacity_kwh: The most energy it can store.
+            power_kw: The fastest it can charge or discharge.
+            round_trip_efficiency: The fraction of energy charged that can
+                be discharged again. Losses are split between the two.
+        """
+        self.capacity_kwh = capacity_kwh
+        self.power_kw = power_kw
+        self.round_trip_efficiency = round_trip_efficiency
+
+
+def solar_profile(
+    latitude: float = -43.5,
+    clearness: float = 0.7,
+    performance_ratio: float = 0.8,
+) -> npt.NDArray:
+    """Return the generation of 1 kW of panels on a typical day per month.
+
+    Generation follows the sun's elevation for panels lying flat, scaled
+    by how clear the sky is on average and the system's losses. The
+    default latitude is Christchurch's.
+
+    Returns:
+        An array of shape (12, 24) of kWh generated per kW of panels in
+        each hour of a typical day of each month.
+    """
+    declination = np.radians(23.44) * np.sin(
+        2 * np.pi * (284 + _MID_MONTH_DAYS) / 365
+    )
+    hour_angle = np.radians(15 * (np.arange(24) + 0.5 - 12))
+    latitude_radians = math.radians(latitude)
+    sin_elevation = math.sin(latitude_radians) * np.sin(declination)[
+        :, None
+    ] + math.cos(latitude_radians) * np.cos(declination)[:, None] * np.cos(
+        hour_angle
+    )
+    return clearness * performance_ratio * np.clip(sin_elevation, 0, None)
+
+
+def load_solar_profile(path: str) -> npt.NDArray:
+    """Load a solar profile from a CSV of 12 rows, one per month, of 24 kWh.
+
+    Raises:
+        ValueError if the file isn't 12 rows of 24 numbers.
+    """
+    profile = np.loadtxt(path, dtype=float, delimiter=",", ndmin=2)
+    if profile.shape != (12, 24):
+        msg = f"{path}: expected 12 rows of 24 hourly values"
+        raise ValueError(msg)
+    return profile
+
+
+def solar_generation(
+    profile: npt.NDArray, first_date: date, days: int, capacity_kw: float
+) -> npt.NDArray:
+    """Return hourly generation of shape (days, 24) from first_date."""
+    months = (np.datetime64(first_date, "D") + np.arange(days)).astype(
+        "datetime64[M]"
+    ).astype(int) % 12
+    return capacity_kw * profile[months]
+
+
+def simulate(
+    load: npt.NDArray,
+    solar: npt.NDArray,
+    batteries: list[Battery],
+    policy: str = SELF_CONSUMPTION,
+    charge_hours: Collection[int] = (),
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """Dispatch batteries against net load, returning grid flows per hour.
+
+    Every battery and day is simulated at once, stepping through the hours
+    of the day, with the first day starting empty and every other day
+    starting with the charge the day before it ended with. As days are
+    stepped together, each pass starts days with the previous pass's
+    ending charge, and days whose starting charge changed are stepped
+    again until none do. Charge carried over n days takes n passes, each
+    only stepping the days that changed.
+
+    Under SELF_CONSUMPTION, batteries charge from surplus solar and
+    discharge to meet load. Under GRID_CHARGE, they also charge to full
+    from the grid during charge_hours, without discharging.
+
+    Args:
+        load: Hourly usage in kWh of shape (days, 24), without gaps.
+        solar: Hourly generation in kWh of the same shape.
+        batteries: The batteries to simulate. A battery with no capacity
+            simulates solar alone.
+        policy: SELF_CONSUMPTION or GRID_CHARGE.
+        charge_hours: Hours of the day to charge from the grid in.
+
+    Returns:
+        Imports and exports in kWh, each of shape (batteries, days, 24).
+    """
+    if policy not in POLICIES:
+        msg = f"Unknown dispatch policy: {policy}"
+        raise ValueError(msg)
+    capacity = np.array([b.capacity_kwh for b in batteries])[:, None]
+    power = np.array([b.power_kw for b in batteries])[:, None]
+    efficiency = np.sqrt(
+        np.array([b.round_trip_efficiency for b in batteries])
+    )[:, None]
+    net = load - solar
+    shape = (len(batteries), len(net), 24)
+    imports = np.empty(shape)
+    exports = np.empty(shape)
+    start = np.zeros(shape[:2])
+    end = np.zeros(shape[:2])
+    days = np.arange(len(net))
+    while len(days) > 0:
+        charge_state = start[:, days]
+        for hour in range(24):
+            day_net = net[days, hour]
+            headroom = np.minimum(
+                power, (capacity - charge_state) / efficiency
+            )
+            if policy == GRID_CHARGE and hour in charge_hours:
+                charge = headroom
+                discharge = 0.0
+            else:
+                charge = np.minimum(np.clip(-day_net, 0, None), headroom)
+                discharge = np.minimum(
+                    np.clip(day_net, 0, None),
+                    np.minimum(power, charge_state * efficiency),
+                )
+            charge_state = (
+                charge_state + charge * efficiency - discharge / efficiency
+            )
+            grid = day_net + charge - discharge
+            imports[:, days, hour] = np.clip(grid, 0, None)
+            exports[:, days, hour] = np.clip(-grid, 0, None)
+        end[:, days] = charge_state
+        changed = (start[:, 1:] != end[:, :-1]).any(axis=0)
+        start[:, 1:] = end[:, :-1]
+        days = np.flatnonzero(changed) + 1
+    return imports, exports
+
+
+def cost_plans(
+    profiles: Profiles,
+    profile_set: str,
+    weekdays: npt.NDArray,
+    imports: npt.NDArray,
+    exports: npt.NDArray,
+) -> tuple[list[str], npt.NDArray] | None:
+    """Return every plan's yearly cost for simulated grid flows.
+
+    Imports are costed like usage, from their average for every hour of
+    every weekday, and exports are credited at each plan's buy back rate.
+
+    Args:
+        profiles: The profiles to cost with.
+        profile_set: The profile set to cost.
+        weekdays: The weekday of each simulated day, of shape (days,).
+        imports: Imports in kWh of shape (batteries, days, 24).
+        exports: Exports in kWh of the same shape.
+
+    Returns:
+        None if the profile set isn't valid or a weekday wasn't simulated,
+        else a list of plan names and an array of yearly costs in dollars
+        of shape (batteries, plans).
+    """
+    counts = np.bincount(weekdays, minlength=7)
+    if np.any(counts == 0):
+        return None
+    average_imports = np.empty((len(imports), 7, 24))
+    for weekday in range(7):
+        average_imports[:, weekday] = imports[:, weekdays == weekday].mean(
+            axis=1
+        )
+    plan_costs = profiles.get_plan_costs(average_imports, profile_set)
+    buy_back_rates = profiles.get_buy_back_rates(profile_set)
+    if plan_costs is None or buy_back_rates is None:
+        return None
+    names, costs = plan_costs
+    rates = np.array([buy_back_rates[name] for name in names])
+    daily_exports = exports.sum(axis=(1, 2)) / len(weekdays)
+    return names, costs - np.outer(daily_exports, rates) * (365 / 100)
+
+
+def simulate_plans(
+    profiles: Profiles,
+    profile_set: str,
+    first_date: date,
+    usage_matrix: npt.NDArray,
+    solar: npt.NDArray,
+    batteries: list[Battery],
+    policy: str = SELF_CONSUMPTION,
+    charge_hours: Collection[int] = (),
+) -> tuple[list[str], npt.NDArray] | None:
+    """Simulate batteries on a user's usage, and cost every plan for each.
+
+    Days with any unknown hour are left out.
+
+    Args:
+        profiles: The profiles to cost with.
+        profile_set: The profile set to cost.
+        first_date: The date of the first row of usage_matrix.
+        usage_matrix: Hourly usage of shape (days, 24), NaN where
+            unknown, as returned by Data.get_usage_matrix().
+        solar: Hourly generation of the same shape, see solar_generation().
+        batteries: The batteries to simulate.
+        policy: See simulate().
+        charge_hours: See simulate().
+
+    Returns:
+        None if the profile set isn't valid or there aren't enough complete
+        days, else a list of plan names and an array of yearly costs in
+        dollars of shape (batteries, plans).
+    """
+    complete = ~np.isnan(usage_matrix).any(axis=1)
+    weekdays = (
+        np.datetime64(first_date, "D") + np.flatnonzero(complete)
+    ).astype(int) % 7
+    # 1970-01-01 was a Thursday, so shift to Monday being 0.
+    weekdays = (weekdays + 3) % 7
+    imports, exports = simulate(
+        usage_matrix[complete],
+        solar[complete],
+        batteries,
+        policy,
+        charge_hours,
+    )
+    return cost_plans(profiles, profile_set, weekdays, imports, exports)
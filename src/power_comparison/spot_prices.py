@@ -0,0 +1,117 @@
+"""Load hourly spot price histories as memory mapped arrays."""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from power_comparison.default_values_utility import DefaultValuesUtility as DVU
+
+# Prices are indexed by hours since the start of this date.
+EPOCH = date(2000, 1, 1)
+_EPOCH_HOUR = EPOCH.toordinal() * 24
+
+
+def hour_ordinal(day: date, hour: int = 0) -> int:
+    """Return the index of an hour in every PriceSeries."""
+    return day.toordinal() * 24 + hour - _EPOCH_HOUR
+
+
+class PriceSeries:
+    """An hourly price history, memory mapped from a cache of its CSV.
+
+    The CSV has a row per hour, or finer, of an ISO timestamp and a price
+    in cents per kWh. Prices within the same hour are averaged. The cache
+    is a .npy array of every hour since EPOCH, NaN where the price isn't
+    known, so aligning with usage is a slice rather than a search. It is
+    rebuilt when the CSV is newer. Caches are kept in the user's data
+    directory, as the CSV's directory may be read only, and changing it
+    would change its profile set's fingerprint.
+    """
+
+    _prices: npt.NDArray
+
+    def __init__(
+        self, csv_path: str | Path, cache_dir: str | Path | None = None
+    ) -> None:
+        """Load a price history, building its cache if it is stale.
+
+        Args:
+            csv_path: The price history CSV.
+            cache_dir: Defaults to the user's data directory.
+
+        Raises:
+            ValueError if the CSV has a row that can't be parsed.
+        """
+        csv_path = Path(csv_path)
+        if cache_dir is None:
+            cache_dir = DVU.get_spot_price_cache_dir()
+        # Named for the CSV's path, so histories with the same name in
+        # different profile sets don't share a cache.
+        path_digest = hashlib.sha1(
+            str(csv_path.resolve()).encode(), usedforsecurity=False
+        ).hexdigest()[:16]
+        cache_path = Path(cache_dir) / f"{csv_path.stem}-{path_digest}.npy"
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        if (
+            not cache_path.exists()
+            or cache_path.stat().st_mtime_ns < csv_path.stat().st_mtime_ns
+        ):
+            self._build_cache(csv_path, cache_path)
+        self._prices = np.load(cache_path, mmap_mode="r")
+
+    @staticmethod
+    def _build_cache(csv_path: Path, cache_path: Path) -> None:
+        """Convert a price history CSV to a .npy array of hourly prices."""
+        hours = []
+        prices = []
+        with csv_path.open(newline="", encoding="utf-8") as file:
+            for line, row in enumerate(csv.reader(file), 1):
+                if len(row) == 0 or row[0].strip().lower() == "timestamp":
+                    continue
+                try:
+                    when = datetime.fromisoformat(row[0].strip())
+                    prices.append(float(row[1]))
+                except (ValueError, IndexError) as e:
+                    msg = f"{csv_path}:{line}: invalid price row"
+                    raise ValueError(msg) from e
+                hours.append(hour_ordinal(when.date(), when.hour))
+        hours_np = np.array(hours, dtype=np.int64)
+        known = hours_np >= 0
+        hours_np = hours_np[known]
+        length = int(hours_np.max()) + 1 if len(hours_np) > 0 else 0
+        totals = np.bincount(
+            hours_np,
+            weights=np.array(prices, dtype=float)[known],
+            minlength=length,
+        )
+        counts = np.bincount(hours_np, minlength=length)
+        with np.errstate(invalid="ignore"):
+            hourly = totals / counts
+        # Written then renamed, so other processes never map a partial file.
+        temporary_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with temporary_path.open("wb") as file:
+            np.save(file, hourly)
+        temporary_path.replace(cache_path)
+
+    def get_range(self, first_day: date, days: int) -> npt.NDArray:
+        """Return prices for whole days, of shape (days, 24).
+
+        Only the mapped pages in the range are read. Hours outside the
+        history are NaN.
+        """
+        start = hour_ordinal(first_day)
+        end = start + days * 24
+        prices = np.full(days * 24, np.nan)
+        known_start = min(max(start, 0), len(self._prices))
+        known_end = min(max(end, 0), len(self._prices))
+        prices[known_start - start : known_end - start] = self._prices[
+            known_start:known_end
+        ]
+        return prices.reshape(days, 24)
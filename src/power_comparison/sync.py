@@ -0,0 +1,293 @@
+"""Keep every known user's usage data up to date without the GUI."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from power_comparison import instrumentation
+from power_comparison.controller import Controller
+from power_comparison.data import Data, Profiles
+from power_comparison.default_values_utility import DefaultValuesUtility as DVU
+from power_comparison.retention import RetentionPolicy
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+
+class SyncLockError(Exception):
+    """Error to indicate another sync daemon already holds the lock."""
+
+
+class SyncLock:
+    """An inter-process lock held by the running sync daemon.
+
+    The lock is an exclusive transaction on a small SQLite database, so the
+    operating system releases it if the daemon dies without cleaning up.
+    """
+
+    _path: str
+    _connection: sqlite3.Connection | None = None
+
+    def __init__(self, path: str) -> None:
+        """Initialize the lock without acquiring it."""
+        self._path = path
+
+    def acquire(self) -> None:
+        """Acquire the lock.
+
+        Raises:
+            SyncLockError when another process holds the lock.
+        """
+        DVU.create_dirs(self._path)
+        connection = sqlite3.connect(
+            self._path, timeout=0, isolation_level=None
+        )
+        try:
+            connection.execute("BEGIN EXCLUSIVE")
+        except sqlite3.OperationalError as e:
+            connection.close()
+            msg = f"Sync lock {self._path} is held by another process"
+            raise SyncLockError(msg) from e
+        self._connection = connection
+
+    def release(self) -> None:
+        """Release the lock if it is held."""
+        if self._connection is None:
+            return
+        self._connection.rollback()
+        self._connection.close()
+        self._connection = None
+
+    def __enter__(self) -> SyncLock:
+        """Acquire the lock."""
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Release the lock."""
+        self.release()
+
+
+class SyncDaemon:
+    """Periodically download new usage data for every known user."""
+
+    _controller: Controller
+    _data: Data
+    _accounts_path: str
+    _interval: float
+    _jitter: float
+    _retention: RetentionPolicy | None
+
+    def __init__(
+        self,
+        controller: Controller,
+        data: Data,
+        accounts_path: str,
+        interval: float,
+        jitter: float,
+        retention: RetentionPolicy | None = None,
+    ) -> None:
+        """Initialize the SyncDaemon.
+
+        Args:
+            controller:
+                The controller used to connect and download data.
+            data:
+                The data object the controller writes to.
+            accounts_path:
+                Path to a JSON list of objects with "connector",
+                "username", and "password" keys.
+            interval:
+                Seconds between syncs.
+            jitter:
+                Fraction of interval to randomly add or subtract from each
+                wait, so many daemons don't all hit the utility at once.
+            retention:
+                Applied in a background thread after every sync, if given,
+                only compacting the database when usage was rolled up.
+        """
+        self._controller = controller
+        self._data = data
+        self._accounts_path = accounts_path
+        self._interval = interval
+        self._jitter = jitter
+        self._retention = retention
+
+    def load_accounts(self) -> list[tuple[str, str, str]]:
+        """Return a list of connector names, usernames, and passwords."""
+        path = Path(self._accounts_path)
+        if not path.exists():
+            logger.warning("No accounts file found at %s", path)
+            return []
+        with path.open(encoding="utf-8") as file:
+            accounts = json.load(file)
+        return [
+            (account["connector"], account["username"], account["password"])
+            for account in accounts
+        ]
+
+    async def sync_account(
+        self, connector_name: str, username: str, password: str
+    ) -> bool:
+        """Download new data for one account, returning success."""
+        error = await self._controller.try_connect(
+            connector_name, username, password
+        )
+        if error is not None:
+            logger.error("%s: %s: %s", username, error[0], error[1])
+            return False
+        finished = False
+
+        def finished_callback() -> None:
+            nonlocal finished
+            finished = True
+
+        await self._controller.data_download_call(finished_callback)
+        if not finished:
+            logger.error("%s: Downloading data timed out", username)
+            return False
+        logger.info(
+            "%s: Synced up to %s", username, self._controller.get_last_date()
+        )
+        return True
+
+    async def sync_all(self) -> int:
+        """Sync every account, returning how many succeeded.
+
+        Errors syncing an account are logged, and the next account synced.
+        """
+        accounts = self.load_accounts()
+        known = {username for _, username, _ in accounts}
+        for username in self._data.get_usernames():
+            if username not in known:
+                logger.info("%s: No credentials, skipping", username)
+        synced = 0
+        for connector_name, username, password in accounts:
+            # One account failing, for example with a network error or a
+            # locked database, mustn't stop the others from syncing.
+            try:
+                succeeded = await self.sync_account(
+                    connector_name, username, password
+                )
+            except Exception:  # noqa: BLE001
+                logger.exception("%s: Syncing failed", username)
+                continue
+            if succeeded:
+                synced += 1
+        return synced
+
+    def next_delay(self) -> float:
+        """Return a jittered number of seconds to wait until the next sync."""
+        return self._interval * (
+            1 + random.uniform(-self._jitter, self._jitter)
+        )
+
+    async def run(self, *, once: bool = False) -> None:
+        """Sync all accounts, then repeat on schedule unless `once`."""
+        while True:
+            synced = await self.sync_all()
+            logger.info("Synced %d account(s)", synced)
+            if self._retention is not None:
+                rows = await asyncio.to_thread(
+                    self._retention.apply, self._data, background=True
+                )
+                logger.info("Rolled up %d hourly row(s)", rows)
+            if once:
+                return
+            delay = self.next_delay()
+            logger.info("Next sync in %.0f seconds", delay)
+            await asyncio.sleep(delay)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for the sync daemon."""
+    parser = argparse.ArgumentParser(
+        prog="power-comparison-sync",
+        description="Download new usage data for every known user.",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="sync once and exit, instead of running on a schedule",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=6,
+        help="hours between syncs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.1,
+        help="fraction of the interval to randomly vary each wait by "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--accounts",
+        default=DVU.get_sync_accounts_path(),
+        help="JSON file of accounts to sync (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--db", help="path to the usage database (default: the user's)"
+    )
+    parser.add_argument(
+        "--keep-years",
+        type=int,
+        help="years of hourly usage to keep, rolling up older usage into "
+        "monthly averages (default: keep all)",
+    )
+    parser.add_argument(
+        "--no-compact",
+        action="store_true",
+        help="don't roll up usage older than --keep-years, or compact the "
+        "database when it is, after each sync",
+    )
+    args = parser.parse_args(argv)
+    instrumentation.enable_from_environment()
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    lock = SyncLock(DVU.get_sync_lock_path())
+    try:
+        lock.acquire()
+    except SyncLockError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+    data = Data(args.db)
+    controller = Controller(data, Profiles())
+    daemon = SyncDaemon(
+        controller,
+        data,
+        args.accounts,
+        args.interval * 60 * 60,
+        args.jitter,
+        None if args.no_compact else RetentionPolicy(args.keep_years),
+    )
+    try:
+        asyncio.run(daemon.run(once=args.once))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.close()
+        data.close()
+        lock.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Define the TimelineTiles class."""
+
+from __future__ import annotations
+
+import math
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from power_comparison.cache import ResultCache
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import date
+
+    import numpy.typing as npt
+
+Tile = tuple["npt.NDArray", "npt.NDArray"]
+
+
+class TimelineTiles:
+    """Decimate hourly usage to a screen's width, caching tiles per zoom.
+
+    Hours are counted from midnight on the first date. At zoom level n each
+    bucket covers 2**n hours and holds their minimum and maximum, so peaks
+    stay visible however far out the timeline is zoomed. Buckets are fetched
+    and cached in tiles, so panning only fetches the tiles scrolled into
+    view, and returning to a zoom level fetches nothing.
+    """
+
+    _TILE_BUCKETS = 512
+    _fetch: Callable[[date, date], npt.NDArray | None]
+    _first_date: date
+    _last_date: date
+    _tiles: ResultCache
+
+    def __init__(
+        self,
+        fetch: Callable[[date, date], npt.NDArray | None],
+        first_date: date,
+        last_date: date,
+        max_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        """Initialize TimelineTiles.
+
+        Args:
+            fetch: Returns the hourly usage between two dates, both included,
+                as an array of shape (days, 24), or None if there is none.
+            first_date: The first date with usage.
+            last_date: The last date with usage.
+            max_bytes: The most memory cached tiles may use.
+        """
+        self._fetch = fetch
+        self._first_date = first_date
+        self._last_date = last_date
+        self._tiles = ResultCache(max_entries=4096, max_bytes=max_bytes)
+
+    @staticmethod
+    def get_level(hours: float, width: int) -> int:
+        """Return the lowest zoom level showing hours in width buckets."""
+        return max(0, math.ceil(math.log2(max(hours, 1) / max(width, 1))))
+
+    def get_tile(self, level: int, index: int) -> Tile:
+        """Return a tile's bucket minimums and maximums.
+
+        Buckets without any usage are NaN.
+        """
+        key = (level, index)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile
+        bucket_hours = 2**level
+        hours = self._TILE_BUCKETS * bucket_hours
+        first_hour = index * hours
+        first_day = first_hour // 24
+        last_day = min(
+            (first_hour + hours - 1) // 24,
+            (self._last_date - self._first_date).days,
+        )
+        values = np.full(hours, np.nan)
+        if first_hour >= 0 and first_day <= last_day:
+            matrix = self._fetch(
+                self._first_date + timedelta(days=first_day),
+                self._first_date + timedelta(days=last_day),
+            )
+            if matrix is not None:
+                flat = matrix.ravel()[first_hour - 24 * first_day :][:hours]
+                values[: len(flat)] = flat
+        buckets = values.reshape(self._TILE_BUCKETS, bucket_hours)
+        # fmin and fmax ignore NaN, without warning about empty buckets.
+        tile = (
+            np.fmin.reduce(buckets, axis=1),
+            np.fmax.reduce(buckets, axis=1),
+        )
+        self._tiles.put(key, tile, 2 * tile[0].nbytes)
+        return tile
+
+    def get_range(
+        self, start_hour: float, end_hour: float, width: int
+    ) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Return usage between two hours decimated to about width buckets.
+
+        A bucket either side of the range is included, so lines drawn from
+        the buckets run off the edges of the view.
+
+        Returns:
+            Arrays of each bucket's first hour, minimum, and maximum.
+        """
+        level = self.get_level(end_hour - start_hour, width)
+        bucket_hours = 2**level
+        first = math.floor(start_hour / bucket_hours) - 1
+        last = math.ceil(end_hour / bucket_hours) + 1
+        tiles = range(
+            first // self._TILE_BUCKETS, (last - 1) // self._TILE_BUCKETS + 1
+        )
+        lows, highs = zip(*(self.get_tile(level, index) for index in tiles))
+        offset = first - tiles[0] * self._TILE_BUCKETS
+        visible = slice(offset, offset + last - first)
+        return (
+            np.arange(first, last) * bucket_hours,
+            np.concatenate(lows)[visible],
+            np.concatenate(highs)[visible],
+        )
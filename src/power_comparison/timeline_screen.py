@@ -0,0 +1,196 @@
+"""Define the usage timeline screen."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import customtkinter as ctk
+import matplotlib.dates as mdates
+import numpy as np
+from CTkMessagebox import CTkMessagebox
+
+from power_comparison.tkinter_figure import new_figure
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.backend_bases import MouseEvent, ResizeEvent
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.lines import Line2D
+
+    from power_comparison.view import View
+
+
+class TimelineScreen:
+    """Define the zoomable usage timeline screen.
+
+    Scrolling zooms around the cursor and dragging pans. Only the visible
+    range is fetched, decimated to the plot's width in pixels.
+    """
+
+    _SPANS = {
+        "Day": timedelta(days=1),
+        "Week": timedelta(weeks=1),
+        "Month": timedelta(days=30),
+        "Year": timedelta(days=365),
+    }
+    _ZOOM_FACTOR = 1.25
+    _MIN_SPAN = timedelta(hours=6)
+    _app: View
+    _axes: Axes
+    _line: Line2D
+    _canvas: FigureCanvasTkAgg
+    _span: ctk.CTkSegmentedButton
+    _bounds: tuple[datetime, datetime] | None = None
+    _view: tuple[datetime, datetime]
+    _drag: tuple[float, tuple[datetime, datetime]] | None = None
+
+    def __init__(self, app: View) -> None:
+        """Create TimelineScreen."""
+        self._app = app
+        self.tk_init()
+
+    def tk_init(self) -> None:
+        """Initialize Tkinter for this screen."""
+        self._app.set_title("Power Comparison: Usage Timeline")
+        window_root = self._app.new_frame()
+        self._app.config_grid(window_root, [1], [1, 4])
+        frame = ctk.CTkFrame(window_root)
+        frame.grid(row=0, column=0)
+        self._app.config_grid(frame, [1, 1], [1])
+        ctk.CTkLabel(frame, text="Show the last:").grid(row=0, column=0)
+        self._span = ctk.CTkSegmentedButton(
+            frame, values=[*self._SPANS, "All"], command=self.show_span
+        )
+        self._span.grid(row=1, column=0)
+        self._app.set_padding(frame, 5, 5)
+        # Graph
+        graph_frame = ctk.CTkFrame(window_root)
+        graph_frame.grid(row=0, column=1, sticky="NESW")
+        self._app.config_grid(graph_frame, [1], [1])
+        self.setup_plot(graph_frame)
+        # Back Button
+        back_frame = ctk.CTkFrame(window_root)
+        back_frame.grid(row=0, column=0, sticky="NW")
+        ctk.CTkButton(
+            back_frame, text="Back", command=self._app.launch_main_screen
+        ).grid()
+        self._app.set_padding(back_frame, 5, 5)
+        self._bounds = self._app.get_controller().get_timeline_range()
+        if self._bounds is None:
+            CTkMessagebox(
+                title="No Data",
+                message="Error no data was found for this range.",
+                icon="cancel",
+            )
+            return
+        self._span.set("Month")
+        self.show_span("Month")
+
+    def show_span(self, span: str) -> None:
+        """Show a span of time ending at the last usage."""
+        if self._bounds is None:
+            return
+        start, end = self._bounds
+        if span in self._SPANS:
+            start = end - self._SPANS[span]
+        self.set_view(start, end)
+
+    def set_view(self, start: datetime, end: datetime) -> None:
+        """Show the usage between two times, kept within the usage."""
+        if self._bounds is None:
+            return
+        first, last = self._bounds
+        span = min(max(end - start, self._MIN_SPAN), last - first)
+        start = min(max(start, first), last - span)
+        self._view = (start, start + span)
+        self._axes.set_xlim(*self._view)
+        self._canvas.draw_idle()
+        asyncio.create_task(self.update_plot())
+
+    async def update_plot(self) -> None:
+        """Fetch and draw the usage in view."""
+        try:
+            result = await self._app.get_controller().get_timeline_async(
+                *self._view, max(1, int(self._axes.bbox.width))
+            )
+        except asyncio.CancelledError:
+            return
+        if not self._canvas.get_tk_widget().winfo_exists():
+            return
+        # An error is a title and message, where a result is arrays.
+        if isinstance(result[0], str):
+            CTkMessagebox(title=result[0], message=result[1], icon="cancel")
+            return
+        starts, low, high = result
+        # Draw each bucket as a vertical stroke from its minimum to its
+        # maximum, so the decimated line keeps the original's envelope.
+        self._line.set_data(
+            np.repeat(starts, 2), np.column_stack((low, high)).ravel()
+        )
+        top = np.nanmax(high) if np.isfinite(high).any() else 1
+        self._axes.set_ylim(0, top * 1.05)
+        self._canvas.draw_idle()
+
+    def on_scroll(self, event: MouseEvent) -> None:
+        """Zoom in or out around the cursor."""
+        if event.inaxes is not self._axes or event.xdata is None:
+            return
+        anchor = mdates.num2date(event.xdata).replace(tzinfo=None)
+        factor = (
+            1 / self._ZOOM_FACTOR
+            if event.button == "up"
+            else self._ZOOM_FACTOR
+        )
+        start, end = self._view
+        self.set_view(
+            anchor - (anchor - start) * factor,
+            anchor + (end - anchor) * factor,
+        )
+
+    def on_press(self, event: MouseEvent) -> None:
+        """Start panning."""
+        if event.inaxes is self._axes and event.button == 1:
+            self._drag = (event.x, self._view)
+
+    def on_motion(self, event: MouseEvent) -> None:
+        """Pan with the cursor."""
+        if self._drag is None:
+            return
+        x, (start, end) = self._drag
+        shift = (end - start) * ((x - event.x) / self._axes.bbox.width)
+        self.set_view(start + shift, end + shift)
+
+    def on_release(self, _: MouseEvent) -> None:
+        """Stop panning."""
+        self._drag = None
+
+    def on_resize(self, _: ResizeEvent) -> None:
+        """Fetch the usage in view again, decimated to the new width."""
+        if self._bounds is not None:
+            self.set_view(*self._view)
+
+    def setup_plot(self, frame: ctk.CTkFrame) -> None:
+        """Setup timeline plot."""
+        figure, self._canvas = new_figure(
+            frame,
+            self._app.get_background_color(),
+            self._app.get_foreground_color(),
+        )
+        self._axes = figure.add_subplot()
+        locator = mdates.AutoDateLocator()
+        self._axes.xaxis.set_major_locator(locator)
+        self._axes.xaxis.set_major_formatter(
+            mdates.ConciseDateFormatter(locator)
+        )
+        self._axes.set_title("Power Usage")
+        self._axes.set_ylabel("Power Usage (KWh)")
+        self._axes.grid(visible=True, which="both", axis="y")
+        (self._line,) = self._axes.plot([], [], linewidth=1)
+        self._canvas.mpl_connect("scroll_event", self.on_scroll)
+        self._canvas.mpl_connect("button_press_event", self.on_press)
+        self._canvas.mpl_connect("motion_notify_event", self.on_motion)
+        self._canvas.mpl_connect("button_release_event", self.on_release)
+        self._canvas.mpl_connect("resize_event", self.on_resize)
+        self._canvas.get_tk_widget().grid(row=0, column=0, sticky="NESW")
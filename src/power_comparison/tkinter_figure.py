@@ -1,10 +1,32 @@
 """Shared code for Tkinter matplotlib figures."""
 
-import customtkinter as ctk
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
 import matplotlib as mpl
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+from power_comparison.instrumentation import span, timed
+from power_comparison.plot_style import figure_style
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import customtkinter as ctk
+    from matplotlib.artist import Artist
+    from matplotlib.backend_bases import DrawEvent
+
+
+class _TimedCanvas(FigureCanvasTkAgg):
+    """A canvas that times its draws as spans, if enabled."""
+
+    @timed("figure.draw")
+    def draw(self) -> None:
+        """Draw the figure."""
+        super().draw()
+
 
 def new_figure(
     frame: ctk.CTkFrame, bg_color: str, fg_color: str
@@ -12,14 +34,54 @@ def new_figure(
     """Return a new configured figure."""
     figure = Figure()
     figure.patch.set_facecolor(bg_color)
-    mpl.rcParams["axes.spines.top"] = False
-    mpl.rcParams["axes.spines.bottom"] = False
-    mpl.rcParams["axes.spines.left"] = False
-    mpl.rcParams["axes.spines.right"] = False
-    mpl.rcParams["axes.facecolor"] = bg_color
-    mpl.rcParams["text.color"] = fg_color
-    mpl.rcParams["axes.labelcolor"] = fg_color
-    mpl.rcParams["xtick.color"] = fg_color
-    mpl.rcParams["ytick.color"] = fg_color
-    canvas = FigureCanvasTkAgg(figure, frame)
+    style = figure_style(bg_color, fg_color)
+    if any(mpl.rcParams[key] != value for key, value in style.items()):
+        mpl.rcParams.update(style)
+    canvas = _TimedCanvas(figure, frame)
     return figure, canvas
+
+
+class BlitManager:
+    """Redraw a figure's animated artists without redrawing the rest of it.
+
+    The background is captured whenever the whole canvas is drawn, for
+    example after a resize, and the animated artists are drawn over it.
+    """
+
+    _canvas: FigureCanvasTkAgg
+    _artists: list[Artist]
+    _background: Any = None
+
+    def __init__(self, canvas: FigureCanvasTkAgg) -> None:
+        """Initialize the BlitManager."""
+        self._canvas = canvas
+        self._artists = []
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def set_artists(self, artists: Iterable[Artist]) -> None:
+        """Set the artists to redraw on update."""
+        self._artists = list(artists)
+        for artist in self._artists:
+            artist.set_animated(True)
+
+    def _on_draw(self, _: DrawEvent) -> None:
+        """Capture the new background and draw the animated artists."""
+        self._background = self._canvas.copy_from_bbox(
+            self._canvas.figure.bbox
+        )
+        self._draw_artists()
+
+    def _draw_artists(self) -> None:
+        """Draw the animated artists onto the canvas."""
+        for artist in self._artists:
+            self._canvas.figure.draw_artist(artist)
+
+    def update(self) -> None:
+        """Redraw only the animated artists."""
+        if self._background is None:
+            self._canvas.draw_idle()
+            return
+        with span("figure.blit"):
+            self._canvas.restore_region(self._background)
+            self._draw_artists()
+            self._canvas.blit(self._canvas.figure.bbox)
@@ -0,0 +1,180 @@
+"""Define the UsageIndex class."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+# Running sums are stored as little endian doubles.
+_SUMS_DTYPE = np.dtype("<f8")
+_WEEKDAYS = np.arange(7)
+
+
+class UsageIndex:
+    """Running totals and counts of a user's hourly usage.
+
+    The row for each day holds the total and count of every hour's usage on
+    that day and every earlier day of the same weekday. A weekday's sums up
+    to any date are then the row of its last occurrence, so the average for
+    every hour of every weekday in a window, however long, is the
+    difference of two lookups of seven rows.
+    """
+
+    first_date: date
+    version: int
+    totals: npt.NDArray
+    counts: npt.NDArray
+
+    def __init__(
+        self,
+        first_date: date,
+        version: int,
+        totals: npt.NDArray,
+        counts: npt.NDArray,
+    ) -> None:
+        """Initialize the UsageIndex from running sums.
+
+        Args:
+            first_date: The date of the first row.
+            version: The user's data version the sums are of.
+            totals: Running totals of shape (days, 24).
+            counts: Running counts of shape (days, 24).
+        """
+        self.first_date = first_date
+        self.version = version
+        self.totals = totals
+        self.counts = counts
+
+    @classmethod
+    def from_usage_matrix(
+        cls, first_date: date, version: int, usage_matrix: npt.NDArray
+    ) -> Self:
+        """Index hourly usage, as returned by Data.get_usage_matrix()."""
+        known = ~np.isnan(usage_matrix)
+        totals = np.where(known, usage_matrix, 0)
+        counts = known.astype(float)
+        for weekday in range(7):
+            np.cumsum(totals[weekday::7], axis=0, out=totals[weekday::7])
+            np.cumsum(counts[weekday::7], axis=0, out=counts[weekday::7])
+        return cls(first_date, version, totals, counts)
+
+    @classmethod
+    def from_bytes(
+        cls, first_date: date, version: int, totals: bytes, counts: bytes
+    ) -> Self:
+        """Load an index saved with to_bytes()."""
+        return cls(
+            first_date,
+            version,
+            np.frombuffer(totals, dtype=_SUMS_DTYPE).reshape(-1, 24),
+            np.frombuffer(counts, dtype=_SUMS_DTYPE).reshape(-1, 24),
+        )
+
+    def to_bytes(self) -> tuple[bytes, bytes]:
+        """Return the totals and counts, packed for saving."""
+        return (
+            self.totals.astype(_SUMS_DTYPE).tobytes(),
+            self.counts.astype(_SUMS_DTYPE).tobytes(),
+        )
+
+    @property
+    def end_date(self) -> date:
+        """Return the day after the last row."""
+        return date.fromordinal(self.first_date.toordinal() + len(self.totals))
+
+    def extend(
+        self, first_date: date, version: int, usage_matrix: npt.NDArray
+    ) -> Self:
+        """Return the index with later days of usage added.
+
+        Only the new days are summed, onto each weekday's last row.
+
+        Args:
+            first_date: The date of usage_matrix's first row, on or after
+                end_date.
+            version: The user's data version with the new days.
+            usage_matrix: Hourly usage of shape (days, 24), NaN where
+                unknown.
+        """
+        gap = (first_date - self.end_date).days
+        if gap < 0:
+            msg = "UsageIndex: days must be after the indexed days"
+            raise ValueError(msg)
+        known = ~np.isnan(usage_matrix)
+        days = np.zeros((gap + len(usage_matrix), 24))
+        totals = np.concatenate((self.totals, days))
+        counts = np.concatenate((self.counts, days))
+        new = len(self.totals)
+        totals[new + gap :] = np.where(known, usage_matrix, 0)
+        counts[new + gap :] = known
+        for row in range(new, min(new + 7, len(totals))):
+            np.cumsum(totals[row::7], axis=0, out=totals[row::7])
+            np.cumsum(counts[row::7], axis=0, out=counts[row::7])
+            if row >= 7:
+                totals[row::7] += totals[row - 7]
+                counts[row::7] += counts[row - 7]
+        return type(self)(self.first_date, version, totals, counts)
+
+    def _sums_through(
+        self, ordinals: npt.NDArray
+    ) -> tuple[npt.NDArray, npt.NDArray]:
+        """Return each weekday's running sums up to and including dates.
+
+        Args:
+            ordinals: Gregorian ordinal days of shape (n,).
+
+        Returns:
+            Totals and counts of shape (n, 7, 24).
+        """
+        last = np.minimum(
+            ordinals - self.first_date.toordinal(), len(self) - 1
+        )[:, None]
+        # The last row on or before each date for each weekday, where the
+        # first row's weekday is that of first_date.
+        rows = last - (last + self.first_date.weekday() - _WEEKDAYS) % 7
+        before = (rows < 0)[..., None]
+        rows = rows.clip(0)
+        return (
+            np.where(before, 0, self.totals[rows]),
+            np.where(before, 0, self.counts[rows]),
+        )
+
+    def window_sums(
+        self, windows: list[tuple[date, date]]
+    ) -> tuple[npt.NDArray, npt.NDArray]:
+        """Return the total and count of usage in windows.
+
+        Args:
+            windows: Pairs of dates, excluded, like Data.get_average_usage().
+
+        Returns:
+            Totals and counts of shape (windows, 7, 24).
+        """
+        if len(windows) == 0:
+            return np.zeros((0, 7, 24)), np.zeros((0, 7, 24))
+        starts = np.array([start.toordinal() for start, _ in windows])
+        ends = np.array([end.toordinal() for _, end in windows]) - 1
+        ends = np.maximum(starts, ends)
+        end_totals, end_counts = self._sums_through(ends)
+        start_totals, start_counts = self._sums_through(starts)
+        return end_totals - start_totals, end_counts - start_counts
+
+    def window_averages(self, windows: list[tuple[date, date]]) -> npt.NDArray:
+        """Return average usage for every hour of every weekday in windows.
+
+        Returns:
+            An array of shape (windows, 7, 24), NaN for hours of weekdays
+            without usage in a window.
+        """
+        totals, counts = self.window_sums(windows)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts
+
+    def __len__(self) -> int:
+        """Return the number of days indexed."""
+        return len(self.totals)
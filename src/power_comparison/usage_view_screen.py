@@ -1,6 +1,7 @@
 """Define the usage view screen."""
 from __future__ import annotations
 
+import asyncio
 from typing import TYPE_CHECKING
 
 import customtkinter as ctk
@@ -56,9 +57,11 @@ class UsageViewScreen:
             row=0, column=1
         )
         ctk.CTkEntry(frame, textvariable=self._end_date).grid(row=1, column=1)
-        ctk.CTkButton(frame, text="Plot", command=self.update_plot).grid(
-            row=2, column=0, columnspan=2
-        )
+        ctk.CTkButton(
+            frame,
+            text="Plot",
+            command=lambda: asyncio.create_task(self.update_plot()),
+        ).grid(row=2, column=0, columnspan=2)
         self._app.set_padding(frame, 5, 5)
         # Graph
         graph_frame = ctk.CTkFrame(window_root)
@@ -72,11 +75,18 @@ class UsageViewScreen:
         ).grid()
         self._app.set_padding(back_frame, 5, 5)
 
-    def update_plot(self) -> None:
+    async def update_plot(self) -> None:
         """Update usage data plot."""
-        usage_data = self._app.get_controller().get_usage_data(
-            self._start_date.get(), self._end_date.get()
-        )
+        controller = self._app.get_controller()
+        with self._app.busy():
+            try:
+                usage_data = await controller.get_usage_data_async(
+                    self._start_date.get(), self._end_date.get()
+                )
+            except asyncio.CancelledError:
+                return
+        if not self._canvas.get_tk_widget().winfo_exists():
+            return
         if isinstance(usage_data, tuple):
             CTkMessagebox(
                 title=usage_data[0], message=usage_data[1], icon="cancel"
@@ -104,4 +114,4 @@ class UsageViewScreen:
         self._axes.grid(visible=True, which="both", axis="y")
         self._plot = self._axes.bar(x_axis, 24 * [0])
         self._canvas.get_tk_widget().grid(row=0, column=0)
-        self.update_plot()
+        asyncio.create_task(self.update_plot())
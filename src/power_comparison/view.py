@@ -2,17 +2,18 @@
 from __future__ import annotations
 
 import asyncio
+from contextlib import contextmanager
 from tkinter import PhotoImage
 from typing import TYPE_CHECKING
 
 import customtkinter as ctk
-from CTkMessagebox import CTkMessagebox
 from PIL import Image
 
-from power_comparison.plan_comparison_screen import PlanComparisonScreen
-from power_comparison.usage_view_screen import UsageViewScreen
+from power_comparison.event_loop import TkEventLoop
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+
     from power_comparison.controller import Controller
 
 
@@ -20,8 +21,10 @@ class View:
     """A graphical application to interact with your power usage statistics."""
 
     _root: ctk.CTk
+    _event_loop: TkEventLoop
     _controller: Controller
     _close: bool = False
+    _busy: int = 0
     _theme: str
 
     def __init__(self, controller: Controller) -> None:
@@ -38,21 +41,29 @@ class View:
         self._root.iconphoto(True, icon)
         self._theme = ctk.get_appearance_mode()
         self._theme_text = ctk.StringVar()
+        self._event_loop = TkEventLoop(self._root)
         self.launch_login_screen()
-        asyncio.get_event_loop().run_until_complete(self.exec(1 / 20))
+        loop = self._event_loop.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self.exec())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
 
     def close_view(self) -> None:
         """Close view."""
         self._close = True
+        self._event_loop.stop()
 
-    async def exec(self, interval: float) -> None:
+    async def exec(self) -> None:
         """Execute view."""
-        while True:
-            if self._close:
-                self._root.destroy()
-                break
-            self._root.update()
-            await asyncio.sleep(interval)
+        await self._event_loop.run()
+        self._root.destroy()
+
+    def wake(self) -> None:
+        """Redraw the view now rather than at the next poll."""
+        self._event_loop.wake()
 
     def config_grid(
         self, frame: ctk.CTkFrame, rows: list[int], columns: list[int]
@@ -90,6 +101,18 @@ class View:
         for child in frame.winfo_children():
             child.grid(padx=padx, pady=pady)
 
+    @contextmanager
+    def busy(self) -> Iterator[None]:
+        """Show a busy cursor while any busy context is active."""
+        self._busy += 1
+        self._root.configure(cursor="watch")
+        try:
+            yield
+        finally:
+            self._busy -= 1
+            if self._busy == 0 and not self._close:
+                self._root.configure(cursor="")
+
     def get_controller(self) -> Controller:
         """Return the controller."""
         return self._controller
@@ -152,10 +175,23 @@ class View:
 
     def launch_usage_view_screen(self) -> None:
         """Launch usage view screen."""
+        # Imported here as matplotlib is slow to import.
+        from power_comparison.usage_view_screen import UsageViewScreen
+
         UsageViewScreen(self)
 
+    def launch_timeline_screen(self) -> None:
+        """Launch usage timeline screen."""
+        from power_comparison.timeline_screen import TimelineScreen
+
+        TimelineScreen(self)
+
     def launch_plan_comparison_screen(self) -> None:
         """Launch plan comparison screen."""
+        from power_comparison.plan_comparison_screen import (
+            PlanComparisonScreen,
+        )
+
         PlanComparisonScreen(self)
 
 
@@ -220,9 +256,14 @@ class LoginScreen:
             self._password.get(),
         )
         if result is not None:
+            from CTkMessagebox import CTkMessagebox
+
             CTkMessagebox(title=result[0], message=result[1], icon="cancel")
             self._next_button.configure(state="normal")
             return
+        if self._app.get_controller().is_data_fresh():
+            self._app.launch_main_screen()
+            return
         self._app.launch_data_download()
 
 
@@ -255,6 +296,7 @@ class DataDownloadScreen:
     def update_message(self, message: str) -> None:
         """Update message for user feedback on download."""
         self._message.set(message)
+        self._app.wake()
 
 
 class MainScreen:
@@ -273,19 +315,24 @@ class MainScreen:
         window_root = self._app.new_frame()
         frame = ctk.CTkFrame(window_root)
         frame.grid()
-        self._app.config_grid(frame, [1, 1], [1, 1])
+        self._app.config_grid(frame, [1, 1], [1, 1, 1])
         ctk.CTkButton(
             frame,
             text="Usage Data",
             command=self._app.launch_usage_view_screen,
         ).grid(row=0, column=0)
+        ctk.CTkButton(
+            frame,
+            text="Usage Timeline",
+            command=self._app.launch_timeline_screen,
+        ).grid(row=0, column=1)
         ctk.CTkButton(
             frame,
             text="Plan Comparison",
             command=self._app.launch_plan_comparison_screen,
-        ).grid(row=0, column=1)
+        ).grid(row=0, column=2)
         ctk.CTkButton(frame, text="Exit", command=self._app.close_view).grid(
-            row=1, column=1
+            row=1, column=2
         )
         ctk.CTkButton(
             frame, text="Logout", command=self._app.launch_login_screen
@@ -0,0 +1,120 @@
+"""Define a scrollable list that only creates widgets for visible rows."""
+
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, Any
+
+import customtkinter as ctk
+
+if TYPE_CHECKING:
+    import tkinter
+
+
+class VirtualList(ctk.CTkFrame):
+    """A scrollable list of rows with a left and right aligned column.
+
+    Only enough label pairs to fill the visible height are created. Scrolling
+    changes their text instead of moving widgets, so setting or scrolling
+    thousands of rows costs the same as a screenful.
+    """
+
+    _ROW_HEIGHT = 28
+    _rows: list[tuple[str, str]]
+    _labels: list[tuple[ctk.CTkLabel, ctk.CTkLabel]]
+    _first: int = 0
+    _body: ctk.CTkFrame
+    _scrollbar: ctk.CTkScrollbar
+
+    def __init__(self, master: Any, **kwargs: Any) -> None:
+        """Create VirtualList."""
+        super().__init__(master, **kwargs)
+        self._rows = []
+        self._labels = []
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self._body = ctk.CTkFrame(self, fg_color="transparent")
+        self._body.grid(row=0, column=0, sticky="NESW")
+        self._body.columnconfigure(0, weight=1)
+        self._body.grid_propagate(False)
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=0, column=1, sticky="NS")
+        self._body.bind("<Configure>", self._on_configure)
+        self._bind_scroll(self._body)
+
+    def set_rows(self, rows: list[tuple[str, str]]) -> None:
+        """Replace the rows, and scroll back to the top.
+
+        Args:
+            rows: A list of left and right column texts.
+        """
+        self._rows = rows
+        self._first = 0
+        self._refresh()
+
+    def scroll(self, rows: int) -> None:
+        """Scroll by a number of rows, negative to scroll up."""
+        self._scroll_to(self._first + rows)
+
+    def _scroll_to(self, first: int) -> None:
+        """Show rows starting at first, clamped to the available rows."""
+        first = max(0, min(first, len(self._rows) - len(self._labels)))
+        if first != self._first:
+            self._first = first
+            self._refresh()
+
+    def _bind_scroll(self, widget: tkinter.Misc) -> None:
+        """Scroll the list when the mouse wheel is used over widget."""
+        widget.bind("<Button-4>", lambda _: self.scroll(-1), add="+")
+        widget.bind("<Button-5>", lambda _: self.scroll(1), add="+")
+        widget.bind("<MouseWheel>", self._on_mouse_wheel, add="+")
+
+    def _on_mouse_wheel(self, event: tkinter.Event) -> None:
+        """Scroll for a Windows or macOS mouse wheel event."""
+        delta = event.delta // 120 if sys.platform == "win32" else event.delta
+        self.scroll(-delta)
+
+    def _on_scrollbar(self, *args: Any) -> None:
+        """Scroll for a scrollbar command."""
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self._rows)))
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]))
+
+    def _on_configure(self, event: tkinter.Event) -> None:
+        """Create or destroy label pairs to fill the new height."""
+        visible = max(1, event.height // self._ROW_HEIGHT)
+        while len(self._labels) < visible:
+            row = len(self._labels)
+            labels = (
+                ctk.CTkLabel(self._body, height=self._ROW_HEIGHT, text=""),
+                ctk.CTkLabel(self._body, height=self._ROW_HEIGHT, text=""),
+            )
+            labels[0].grid(row=row, column=0, sticky="W")
+            labels[1].grid(row=row, column=1, sticky="E", padx=5)
+            for label in labels:
+                self._bind_scroll(label)
+            self._labels.append(labels)
+        while len(self._labels) > visible:
+            for label in self._labels.pop():
+                label.destroy()
+        self._scroll_to(self._first)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Show the visible rows' text and update the scrollbar."""
+        for i, (left, right) in enumerate(self._labels):
+            index = self._first + i
+            if index < len(self._rows):
+                left.configure(text=self._rows[index][0])
+                right.configure(text=self._rows[index][1])
+            else:
+                left.configure(text="")
+                right.configure(text="")
+        if len(self._rows) == 0:
+            self._scrollbar.set(0, 1)
+            return
+        self._scrollbar.set(
+            self._first / len(self._rows),
+            min(1, (self._first + len(self._labels)) / len(self._rows)),
+        )
@@ -0,0 +1,145 @@
+"""Tests for detecting anomalous days of usage."""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+from power_comparison.anomalies import (
+    FLATLINE,
+    METER_ERROR,
+    SPIKE,
+    UsageStatistics,
+    detect_anomalies,
+)
+from power_comparison.data import Data
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_FIRST_ORDINAL = date(2024, 1, 1).toordinal()
+
+
+def _usage(rng: np.random.Generator, days: int) -> npt.NDArray:
+    """Return random hourly usage with some unknown hours."""
+    usage = rng.uniform(0.2, 1.5, (days, 24))
+    usage[rng.random((days, 24)) < 0.05] = np.nan
+    return usage
+
+
+def _assert_statistics_equal(
+    actual: UsageStatistics, expected: UsageStatistics
+) -> None:
+    """Assert two sets of statistics are equal, up to rounding."""
+    np.testing.assert_array_equal(actual.count, expected.count)
+    np.testing.assert_allclose(actual.mean, expected.mean, atol=1e-12)
+    np.testing.assert_allclose(actual.m2, expected.m2, atol=1e-9)
+
+
+def test_merged_equals_statistics_of_all_days() -> None:
+    """Merging batches gives the statistics of every day at once."""
+    rng = np.random.default_rng(0)
+    ordinals = _FIRST_ORDINAL + np.arange(100)
+    usage = _usage(rng, 100)
+    usage[3, 4] = -1  # A meter error, which is left out.
+    statistics = UsageStatistics.empty()
+    for batch in np.split(np.arange(100), [1, 30, 31, 75]):
+        statistics = statistics.merged(
+            UsageStatistics.from_usage(ordinals[batch], usage[batch])
+        )
+    expected = UsageStatistics.from_usage(ordinals, usage)
+    _assert_statistics_equal(statistics, expected)
+    weekdays = (ordinals - 1) % 7
+    valid = np.where(usage >= 0, usage, np.nan)
+    np.testing.assert_allclose(
+        statistics.m2[weekdays[0]] / (statistics.count[weekdays[0]] - 1),
+        np.nanvar(valid[weekdays == weekdays[0]], axis=0, ddof=1),
+    )
+
+
+def test_removed_undoes_merged() -> None:
+    """Removing a merged batch restores the statistics before it."""
+    rng = np.random.default_rng(1)
+    ordinals = _FIRST_ORDINAL + np.arange(80)
+    usage = _usage(rng, 80)
+    before = UsageStatistics.from_usage(ordinals[:50], usage[:50])
+    batch = UsageStatistics.from_usage(ordinals[50:], usage[50:])
+    _assert_statistics_equal(before.merged(batch).removed(batch), before)
+    _assert_statistics_equal(
+        batch.merged(before).removed(batch).removed(before),
+        UsageStatistics.empty(),
+    )
+
+
+def test_detect_anomalies() -> None:
+    """Every spike and meter error is found, with each flatline day."""
+    rng = np.random.default_rng(2)
+    ordinals = _FIRST_ORDINAL + np.arange(400)
+    usage = rng.uniform(0.2, 1.5, (400, 24))
+    usage[390, 3] = 8
+    usage[390, 19] = 9
+    usage[391] = 0.5
+    usage[392, 7] = -2
+    usage[392, 8] = 60
+    statistics = UsageStatistics.from_usage(ordinals, usage)
+    anomalies = detect_anomalies(statistics, ordinals, usage)
+    found = [
+        (ordinal - _FIRST_ORDINAL, kind, hour, value)
+        for ordinal, kind, hour, value, _ in anomalies
+    ]
+    assert found == [
+        (390, SPIKE, 3, 8),
+        (390, SPIKE, 19, 9),
+        (391, FLATLINE, None, 0.5),
+        (392, METER_ERROR, 7, -2),
+        (392, METER_ERROR, 8, 60),
+    ]
+
+
+def test_anomalies_are_kept_per_hour(tmp_path: Path) -> None:
+    """Old databases are migrated, and a day keeps every hour's anomaly."""
+    db_filepath = str(tmp_path / "usage.db")
+    connection = sqlite3.connect(db_filepath)
+    connection.execute(
+        """CREATE TABLE anomalies(
+            user_id INTEGER NOT NULL,
+            date INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            hour INTEGER,
+            value REAL NOT NULL,
+            score REAL,
+            PRIMARY KEY (user_id, date, kind)
+        )"""
+    )
+    connection.execute(
+        "INSERT INTO anomalies VALUES(1, ?, ?, 5, 9, 7)",
+        (_FIRST_ORDINAL, SPIKE),
+    )
+    connection.commit()
+    connection.close()
+
+    data = Data(db_filepath)
+    try:
+        data.initialize_user("user")
+        first = date.fromordinal(_FIRST_ORDINAL)
+        window = (first - timedelta(days=1), first + timedelta(days=400))
+        assert data.get_anomalies(*window) == [(first, SPIKE, 5, 9, 7)]
+        usage = np.random.default_rng(3).uniform(0.2, 1.5, (300, 24))
+        usage[290, [2, 20]] = -1
+        days = [
+            (first + timedelta(days=day), list(values))
+            for day, values in enumerate(usage)
+        ]
+        data.ingest_data(days)
+        errors = [
+            (day, hour)
+            for day, kind, hour, *_ in data.get_anomalies(*window)
+            if kind == METER_ERROR
+        ]
+        assert errors == [(days[290][0], 2), (days[290][0], 20)]
+    finally:
+        data.close()
@@ -0,0 +1,62 @@
+"""Tests for driving Tk from an asyncio event loop, without a display."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import tkinter
+
+from power_comparison.event_loop import TkEventLoop
+
+
+def test_selector_loop_waits_in_tk() -> None:
+    """Idle loops sleep, and threads, sockets and Tk callbacks wake them."""
+    # A Tcl interpreter has Tk's event loop, without needing a display.
+    root = tkinter.Tcl()
+    event_loop = TkEventLoop(root)
+    loop = event_loop.new_event_loop()
+
+    async def main() -> None:
+        runner = asyncio.create_task(event_loop.run())
+        await asyncio.sleep(0.05)
+        wakeups = event_loop.get_wakeups()
+        await asyncio.sleep(0.5)
+        assert event_loop.get_wakeups() - wakeups <= 3
+
+        woken = loop.create_future()
+        threading.Timer(
+            0.05, loop.call_soon_threadsafe, (woken.set_result, None)
+        ).start()
+        await asyncio.wait_for(woken, 1)
+
+        async def echo(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            writer.write(await reader.readline())
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(echo, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"ping\n")
+        assert await asyncio.wait_for(reader.readline(), 1) == b"ping\n"
+        writer.close()
+        server.close()
+
+        handled = loop.create_future()
+
+        async def handler() -> None:
+            handled.set_result(time.perf_counter())
+
+        scheduled = time.perf_counter()
+        root.after(50, lambda: asyncio.create_task(handler()))
+        assert await asyncio.wait_for(handled, 1) - scheduled < 0.2
+        event_loop.stop()
+        await runner
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
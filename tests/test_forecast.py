@@ -0,0 +1,47 @@
+"""Tests for forecasting usage from its history."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from power_comparison.forecast import _RIDGE_DAYS, design_matrix, fit
+
+
+def test_fit_matches_each_history_alone() -> None:
+    """A batch fit equals ridge regression on each history's whole days."""
+    rng = np.random.default_rng(0)
+    first_dates = [date(2022, 3, 1), date(2023, 7, 15)]
+    usage = rng.uniform(0.2, 1.5, (2, 400, 24))
+    usage[0, :100] = np.nan  # Padding, as compare --forecast batches do.
+    usage[1, rng.random(400) < 0.1, 5] = np.nan
+    coefficients = fit(first_dates, usage)
+    for first_date, history, actual in zip(first_dates, usage, coefficients):
+        complete = ~np.isnan(history).any(axis=1)
+        ordinals = first_date.toordinal() + np.flatnonzero(complete)
+        features = design_matrix(ordinals)
+        penalty = np.diag([0] * 7 + [_RIDGE_DAYS / 2] * 4)
+        expected = np.linalg.solve(
+            features.T @ features + penalty, features.T @ history[complete]
+        )
+        np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+
+def test_fit_recovers_seasonal_usage() -> None:
+    """Weekday effects and a yearly cycle are recovered from three years."""
+    first_date = date(2021, 1, 1)
+    days = 3 * 365
+    ordinals = first_date.toordinal() + np.arange(days)
+    expected = np.zeros((11, 24))
+    expected[:7] = np.linspace(0.5, 1.1, 7)[:, None]
+    expected[7] = 0.3
+    usage = design_matrix(ordinals) @ expected
+    coefficients = fit([first_date], usage[None])[0]
+    # The ridge penalty shrinks the harmonics slightly.
+    np.testing.assert_allclose(coefficients, expected, atol=0.02)
+    assert fit([first_date + timedelta(days=1)], usage[None]).shape == (
+        1,
+        11,
+        24,
+    )
@@ -0,0 +1,53 @@
+"""Tests for importing profile sets into a plan catalog."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from power_comparison.plan_catalog import PlanCatalog
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_DAY = 24 * 60 * 60
+
+
+def _write_plan(path: Path, charge: float) -> None:
+    """Write a plan with one charge for every hour as a profile CSV."""
+    lines = ["Day," + ",".join(f"{hour:02}" for hour in range(24))]
+    lines += [
+        day + "," + ",".join([str(charge)] * 24)
+        for day in ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+    ]
+    lines.append("Daily Charge,100")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _set_mtime(path: Path, days: int) -> None:
+    """Set a file's modification time to some days after the epoch."""
+    os.utime(path, (days * _DAY, days * _DAY))
+
+
+def test_reimporting_unchanged_plan_keeps_its_pricing(tmp_path: Path) -> None:
+    """Only changed charges add a pricing dated by the file's mtime."""
+    (tmp_path / "Set").mkdir()
+    plan = tmp_path / "Set" / "Plan.csv"
+    _write_plan(plan, 20)
+    _set_mtime(plan, 20000)
+    catalog = PlanCatalog(str(tmp_path / "catalog.db"))
+    try:
+        catalog.import_profile_set(tmp_path / "Set")
+        _set_mtime(plan, 20010)
+        catalog.import_profile_set(tmp_path / "Set")
+        dates = "SELECT effective_date FROM plans ORDER BY effective_date"
+        (first,) = catalog.connection.execute(dates).fetchall()
+        _write_plan(plan, 25)
+        _set_mtime(plan, 20020)
+        catalog.import_profile_set(tmp_path / "Set")
+        assert catalog.connection.execute(dates).fetchall() == [
+            first,
+            (first[0] + 20,),
+        ]
+    finally:
+        catalog.close()
@@ -0,0 +1,72 @@
+"""Tests for reading and costing profile sets."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from power_comparison.data import Profiles
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _write_plan(
+    path: Path, charges: np.ndarray, daily_charge: float = 100
+) -> None:
+    """Write a plan's hourly charges of shape (7, 24) as a profile CSV."""
+    lines = ["Day," + ",".join(f"{hour:02}" for hour in range(24))]
+    lines += [
+        day + "," + ",".join(str(value) for value in row)
+        for day, row in zip(_DAYS, charges)
+    ]
+    lines.append(f"Daily Charge,{daily_charge}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_fingerprint_follows_directory(tmp_path: Path) -> None:
+    """Fingerprints change when files are added, or after invalidate()."""
+    (tmp_path / "Set").mkdir()
+    plan = tmp_path / "Set" / "Plan.csv"
+    _write_plan(plan, np.full((7, 24), 20.0))
+    profiles = Profiles(str(tmp_path))
+    first = profiles.get_profile_set_fingerprint("Set")
+    assert first is not None
+    assert profiles.get_profile_set_fingerprint("Set") == first
+    assert profiles.get_profile_set_fingerprint("Missing") is None
+    _write_plan(tmp_path / "Set" / "Other.csv", np.full((7, 24), 30.0))
+    added = profiles.get_profile_set_fingerprint("Set")
+    assert added != first
+    # Editing a file in place leaves its directory unmodified.
+    stat = plan.stat()
+    os.utime(plan, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert profiles.get_profile_set_fingerprint("Set") == added
+    profiles.invalidate()
+    assert profiles.get_profile_set_fingerprint("Set") != added
+
+
+def test_rank_plans_matches_full_comparison(tmp_path: Path) -> None:
+    """Ranking gives every usage's cheapest plans, as comparing all does."""
+    rng = np.random.default_rng(0)
+    (tmp_path / "Set").mkdir()
+    for plan in range(300):
+        charges = np.repeat(rng.uniform(10, 40, (7, 6)), 4, axis=1)
+        if plan % 3 == 0:
+            charges = np.full((7, 24), rng.uniform(10, 40))
+        _write_plan(
+            tmp_path / "Set" / f"Plan-{plan:03}.csv",
+            charges,
+            rng.uniform(50, 200),
+        )
+    profiles = Profiles(str(tmp_path))
+    usages = rng.uniform(0, 3, (20, 7, 24))
+    compared = profiles.generate_plan_comparisons(usages, "Set")
+    assert compared is not None
+    for top in (1, 10, 300, 400):
+        ranked = profiles.rank_plans(usages, "Set", top)
+        assert ranked == [comparison[:top] for comparison in compared]
+    assert profiles.rank_plans(usages, "Missing", 10) is None
@@ -0,0 +1,46 @@
+"""Tests for logging slow SQL statements."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from typing import TYPE_CHECKING
+
+from power_comparison.query_log import QueryLog
+
+if TYPE_CHECKING:
+    import pytest
+
+
+def test_each_query_shape_explained_once(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Statements differing only in values share one query plan."""
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE usage(user_id INTEGER, name TEXT)")
+    query_log = QueryLog(connection, slow_ms=0)
+    padding = " AND user_id IS NOT NULL" * 12
+    with caplog.at_level(logging.WARNING, "power_comparison.query_log"):
+        for user_ids in ((1,), (2, 3), (4, 5, 6)):
+            placeholders = ", ".join("?" * len(user_ids))
+            connection.execute(
+                f"SELECT * FROM usage WHERE user_id IN ({placeholders})"
+                + padding,
+                user_ids,
+            ).fetchall()
+            query_log.finish()
+        # The same as the first query for well past its first 12 words.
+        connection.execute(
+            "SELECT * FROM usage WHERE user_id = 1" + padding + " OR name = ?",
+            ("x y",),
+        ).fetchall()
+        query_log.finish()
+    explained = [
+        record.getMessage()
+        for record in caplog.records
+        if "\n" in record.getMessage()
+    ]
+    assert len(caplog.records) == 4
+    assert len(explained) == 2
+    assert "name = 'x y'" in explained[1]
+    connection.close()
@@ -0,0 +1,58 @@
+"""Tests for the solar and battery simulation."""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+from power_comparison.simulation import Battery, simulate
+
+
+def _simulate_sequentially(
+    load: npt.NDArray, solar: npt.NDArray, battery: Battery
+) -> npt.NDArray:
+    """Return imports of one battery, stepping through every hour in turn."""
+    efficiency = math.sqrt(battery.round_trip_efficiency)
+    charge_state = 0.0
+    imports = np.empty(load.shape)
+    for day in range(len(load)):
+        for hour in range(24):
+            net = load[day, hour] - solar[day, hour]
+            charge = min(
+                max(-net, 0),
+                battery.power_kw,
+                (battery.capacity_kwh - charge_state) / efficiency,
+            )
+            discharge = min(
+                max(net, 0), battery.power_kw, charge_state * efficiency
+            )
+            charge_state += charge * efficiency - discharge / efficiency
+            imports[day, hour] = max(net + charge - discharge, 0)
+    return imports
+
+
+def test_simulate_carries_charge_across_days() -> None:
+    """A large battery's charge carries over many days, but not wraps."""
+    rng = np.random.default_rng(0)
+    days = 120
+    load = rng.uniform(0.2, 1.5, (days, 24))
+    solar = np.zeros((days, 24))
+    sunny = rng.random(days) < 0.3
+    solar[sunny, 8:17] = rng.uniform(2, 6, (sunny.sum(), 9))
+    batteries = [Battery(100, 5), Battery(13.5, 5), Battery(0, 0)]
+    imports, _ = simulate(load, solar, batteries)
+    for battery, battery_imports in zip(batteries, imports):
+        np.testing.assert_allclose(
+            battery_imports, _simulate_sequentially(load, solar, battery)
+        )
+
+
+def test_simulate_starts_empty() -> None:
+    """The first day starts empty, even if the last day ends full."""
+    load = np.full((30, 24), 0.5)
+    solar = np.zeros((30, 24))
+    solar[-1] = 10
+    imports, _ = simulate(load, solar, [Battery(100, 5)])
+    assert imports[0, 0].sum() == 12
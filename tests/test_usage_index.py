@@ -0,0 +1,116 @@
+"""Tests for the usage index's running sums."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+import numpy.typing as npt
+
+from power_comparison.usage_index import UsageIndex
+
+
+def _usage_matrix(rng: np.random.Generator, days: int) -> npt.NDArray:
+    """Return random hourly usage with some unknown hours and days."""
+    usage = rng.uniform(0, 2, (days, 24))
+    usage[rng.random((days, 24)) < 0.05] = np.nan
+    usage[rng.random(days) < 0.1] = np.nan
+    return usage
+
+
+def _brute_force_averages(
+    first_date: date, usage_matrix: npt.NDArray, start: date, end: date
+) -> npt.NDArray:
+    """Average every hour of every weekday of days between start and end."""
+    totals = np.zeros((7, 24))
+    counts = np.zeros((7, 24))
+    for row, values in enumerate(usage_matrix):
+        day = first_date + timedelta(days=row)
+        if start < day < end:
+            known = ~np.isnan(values)
+            totals[day.weekday()] += np.where(known, values, 0)
+            counts[day.weekday()] += known
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / counts
+
+
+def _random_windows(
+    rng: np.random.Generator, first_date: date, days: int
+) -> list[tuple[date, date]]:
+    """Return windows overlapping the days, and ones wholly outside."""
+    windows = []
+    for _ in range(200):
+        start = first_date + timedelta(days=int(rng.integers(-20, days + 20)))
+        end = start + timedelta(days=int(rng.integers(0, days)))
+        windows.append((start, end))
+    return windows
+
+
+def _assert_matches_brute_force(
+    index: UsageIndex,
+    first_date: date,
+    usage_matrix: npt.NDArray,
+    windows: list[tuple[date, date]],
+) -> None:
+    """Assert the index's window averages equal the brute force ones."""
+    averages = index.window_averages(windows)
+    for window, average in zip(windows, averages):
+        np.testing.assert_allclose(
+            average,
+            _brute_force_averages(first_date, usage_matrix, *window),
+            err_msg=str(window),
+        )
+
+
+def test_window_averages() -> None:
+    """Window averages equal averaging each window's days directly."""
+    rng = np.random.default_rng(0)
+    # A Wednesday, so the first row's weekday isn't Monday.
+    first_date = date(2024, 1, 3)
+    usage_matrix = _usage_matrix(rng, 100)
+    index = UsageIndex.from_usage_matrix(first_date, 1, usage_matrix)
+    _assert_matches_brute_force(
+        index,
+        first_date,
+        usage_matrix,
+        _random_windows(rng, first_date, len(usage_matrix)),
+    )
+
+
+def test_extend_with_gap() -> None:
+    """An index extended after a gap matches one built of every day."""
+    rng = np.random.default_rng(1)
+    first_date = date(2024, 1, 5)
+    usage_matrix = _usage_matrix(rng, 40)
+    gap = 10
+    later = _usage_matrix(rng, 30)
+    index = UsageIndex.from_usage_matrix(first_date, 1, usage_matrix).extend(
+        first_date + timedelta(days=len(usage_matrix) + gap), 2, later
+    )
+    every_day = np.concatenate(
+        (usage_matrix, np.full((gap, 24), np.nan), later)
+    )
+    assert index.version == 2
+    assert len(index) == len(every_day)
+    _assert_matches_brute_force(
+        index,
+        first_date,
+        every_day,
+        _random_windows(rng, first_date, len(every_day)),
+    )
+    rebuilt = UsageIndex.from_usage_matrix(first_date, 2, every_day)
+    np.testing.assert_allclose(index.totals, rebuilt.totals)
+    np.testing.assert_array_equal(index.counts, rebuilt.counts)
+
+
+def test_bytes_round_trip() -> None:
+    """An index loaded from its bytes has the same sums."""
+    rng = np.random.default_rng(2)
+    index = UsageIndex.from_usage_matrix(
+        date(2024, 1, 1), 3, _usage_matrix(rng, 20)
+    )
+    loaded = UsageIndex.from_bytes(
+        index.first_date, index.version, *index.to_bytes()
+    )
+    np.testing.assert_array_equal(loaded.totals, index.totals)
+    np.testing.assert_array_equal(loaded.counts, index.counts)